@@ -1,4 +1,5 @@
 import sqlite3
+from db_migrations import apply_migrations
 
 # Connect to SQLite DB (creates file if not exists)
 conn = sqlite3.connect("KYC_DataBase.db")
@@ -100,5 +101,8 @@ CREATE TABLE IF NOT EXISTS KycRefreshData (
 """)
 
 conn.commit()
+
+# Add the columns, triggers and indexes maintained by db_migrations
+apply_migrations(conn)
 conn.close()
 print("KYC DataBase created successfully.")
@@ -1,19 +1,128 @@
 import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
 from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import RequestsTransport
 from azure.ai.documentintelligence import DocumentIntelligenceClient
+from azure.ai.documentintelligence.models import AnalyzeResult
 import tempfile
+import time
+import asyncio
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
+from extraction_cache import AnalysisCache, file_hash, serialize_analyze_result
+import pipeline_metrics
 
 os.environ["AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT"] = "https://azuredocintelli-poc.cognitiveservices.azure.com/"
 os.environ["AZURE_DOCUMENT_INTELLIGENCE_KEY"] = "AZURE_OPENAI_KEY"
 
-def extract_data_from_pdf(pdf_path, output_folder="extracted_data"):
+MODEL_ID = "prebuilt-read"
+
+# Default HTTP settings of the shared extraction session
+DEFAULT_POOL_SIZE = 16
+DEFAULT_CONNECTION_TIMEOUT = 30
+DEFAULT_READ_TIMEOUT = 300
+
+class ExtractionSession:
+    """
+    Long-lived Azure AI Document Intelligence client shared by all extractions
+    
+    Holds one DocumentIntelligenceClient and the HTTP connection pool behind it, so
+    documents reuse open TLS connections instead of building a new client each time.
+    The client is thread-safe and can be shared by concurrent extractions.
+    
+    Args:
+        endpoint: Service endpoint (defaults to AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT)
+        key: API key (defaults to AZURE_DOCUMENT_INTELLIGENCE_KEY)
+        pool_size: Maximum number of pooled HTTP connections, should be >= the number of documents in flight
+        connection_timeout: Seconds to wait for a connection to be established
+        read_timeout: Seconds to wait for a response
+        client: Existing DocumentIntelligenceClient (or a compatible fake) to use instead of creating one
+    """
+    def __init__(self, endpoint=None, key=None, pool_size=DEFAULT_POOL_SIZE,
+                 connection_timeout=DEFAULT_CONNECTION_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT, client=None):
+        self.pool_size = pool_size
+        self.connection_timeout = connection_timeout
+        self.read_timeout = read_timeout
+        self._http_session = None
+        self.client = client or self._create_client(endpoint, key)
+    
+    def _create_client(self, endpoint, key):
+        # Azure Document Intelligence settings
+        endpoint = endpoint or os.environ.get("AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT")
+        key = key or os.environ.get("AZURE_DOCUMENT_INTELLIGENCE_KEY")
+        
+        if not endpoint or not key:
+            raise ValueError("Please set AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT and AZURE_DOCUMENT_INTELLIGENCE_KEY environment variables")
+        
+        # One requests session with a sized connection pool, kept for the life of the session
+        self._http_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self._http_session.mount("https://", adapter)
+        transport = RequestsTransport(
+            session=self._http_session,
+            session_owner=False,
+            connection_timeout=self.connection_timeout,
+            read_timeout=self.read_timeout,
+        )
+        
+        return DocumentIntelligenceClient(
+            endpoint=endpoint, 
+            credential=AzureKeyCredential(key),
+            transport=transport
+        )
+    
+    def analyze(self, document):
+        """Submit a document (bytes or a binary file object) and wait for the analyze result"""
+        # Create analyze request - using the prebuilt-read model
+        poller = self.client.begin_analyze_document(MODEL_ID, document)
+        return poller.result()
+    
+    def close(self):
+        self.client.close()
+        if self._http_session is not None:
+            self._http_session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+def get_default_session():
+    """Return the process-wide extraction session, creating it on first use"""
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = ExtractionSession()
+        return _default_session
+
+# Analyze result caches, one per cache database path
+_caches = {}
+
+def get_analysis_cache(output_folder="extracted_data"):
+    """Return the persistent analyze result cache stored in the output folder"""
+    cache_path = os.path.join(output_folder, "analysis_cache.db")
+    if cache_path not in _caches:
+        Path(output_folder).mkdir(exist_ok=True)
+        _caches[cache_path] = AnalysisCache(cache_path)
+    return _caches[cache_path]
+
+def extract_data_from_pdf(pdf_path, output_folder="extracted_data", use_cache=True, session=None, stream_upload=True):
     """
     Extract data from both searchable and scanned PDF files using Azure AI Document Intelligence
     
     Args:
         pdf_path: Path to the PDF file
         output_folder: Folder to save extracted text
+        use_cache: Reuse the stored analyze result when the same document was already processed
+        session: ExtractionSession to use (defaults to the shared session)
+        stream_upload: Stream the file to the service instead of reading it into memory first
         
     Returns:
         Dictionary containing the extracted content and analysis results
@@ -21,34 +130,63 @@ def extract_data_from_pdf(pdf_path, output_folder="extracted_data"):
     # Create output directory if it doesn't exist
     Path(output_folder).mkdir(exist_ok=True)
     
-    # Azure Document Intelligence settings
-    endpoint = os.environ.get("AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT")
-    key = os.environ.get("AZURE_DOCUMENT_INTELLIGENCE_KEY")
-    
-    if not endpoint or not key:
-        raise ValueError("Please set AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT and AZURE_DOCUMENT_INTELLIGENCE_KEY environment variables")
-    
-    # Initialize client
-    document_intelligence_client = DocumentIntelligenceClient(
-        endpoint=endpoint, 
-        credential=AzureKeyCredential(key)
-    )
-    
     print(f"Processing PDF: {pdf_path}")
     
-    # Read the document
-    with open(pdf_path, "rb") as f:
-        document_bytes = f.read()
-    
-    # Create analyze request - using the prebuilt-read model
-    # Pass the document bytes directly
-    poller = document_intelligence_client.begin_analyze_document(
-        "prebuilt-read",  # Changed model ID
-        document_bytes
-    )
+    # Documents are cached by the SHA-256 of their bytes and the model ID
+    cache = get_analysis_cache(output_folder) if use_cache else None
+    doc_hash = file_hash(pdf_path) if cache else None
+    cached_payload = cache.get(doc_hash, MODEL_ID) if cache else None
+    if cached_payload is not None:
+        print(f"Using cached analysis for: {pdf_path}")
+        result = AnalyzeResult(cached_payload)
+    else:
+        session = session or get_default_session()
+        # Upload and poller time count as remote time of the pipeline stage running the extraction
+        with open(pdf_path, "rb") as f, pipeline_metrics.remote_call():
+            if stream_upload:
+                # Pass the open file so the request body is streamed from disk
+                result = session.analyze(f)
+            else:
+                # Read the document and pass the bytes directly
+                result = session.analyze(f.read())
+        pipeline_metrics.add(bytes_processed=os.path.getsize(pdf_path))
+        if cache:
+            cache.put(doc_hash, MODEL_ID, serialize_analyze_result(result))
     
-    result = poller.result()
+    return build_extracted_data(pdf_path, result, output_folder)
+
+def build_table(table):
+    """
+    Build the grid of cell contents of a DocumentTable in a single pass
     
+    Returns:
+        Tuple of (table_data, spans). table_data is a list of rows sized from the table's declared
+        row and column counts. spans lists the cells that span several rows or columns; their
+        content is stored in the top-left cell of the merged area.
+    """
+    table_data = [[""] * table.column_count for _ in range(table.row_count)]
+    spans = []
+    for cell in table.cells:
+        table_data[cell.row_index][cell.column_index] = cell.content
+        row_span = cell.row_span or 1
+        column_span = cell.column_span or 1
+        if row_span > 1 or column_span > 1:
+            spans.append({
+                'row_index': cell.row_index,
+                'column_index': cell.column_index,
+                'row_span': row_span,
+                'column_span': column_span,
+            })
+    return table_data, spans
+
+def table_to_dataframe(table_data, header=True):
+    """Convert a table from extracted_data['tables'] to a DataFrame, using the first row as column names if header is set"""
+    if header and len(table_data) > 1:
+        return pd.DataFrame(table_data[1:], columns=table_data[0])
+    return pd.DataFrame(table_data)
+
+def build_extracted_data(pdf_path, result, output_folder="extracted_data"):
+    """Save the extracted text and convert an analyze result into the extracted_data dictionary"""
     # Save extracted content
     file_name = os.path.basename(pdf_path).split('.')[0]
     output_text_path = os.path.join(output_folder, f"{file_name}_extracted_text.txt")
@@ -63,26 +201,17 @@ def extract_data_from_pdf(pdf_path, output_folder="extracted_data"):
     extracted_data = {
         'content': content,
         'tables': [],
+        'table_spans': [],
         'key_value_pairs': [],
         'paragraphs': []
     }
     
     # Extract tables if available
     if result.tables:
-        for i, table in enumerate(result.tables):
-            table_data = []
-            for cell in table.cells:
-                row_idx = cell.row_index
-                col_idx = cell.column_index
-                # Ensure the table is large enough
-                while len(table_data) <= row_idx:
-                    table_data.append([])
-                row = table_data[row_idx]
-                while len(row) <= col_idx:
-                    row.append("")
-                row[col_idx] = cell.content
-            
+        for table in result.tables:
+            table_data, spans = build_table(table)
             extracted_data['tables'].append(table_data)
+            extracted_data['table_spans'].append(spans)
     
     # Extract key-value pairs if available
     if result.key_value_pairs:
@@ -105,16 +234,139 @@ def extract_data_from_pdf(pdf_path, output_folder="extracted_data"):
     return extracted_data
 
 # Example usage
-def process_multiple_pdfs(pdf_folder, output_folder="extracted_data"):
-    """Process multiple PDFs from a folder"""
+def process_multiple_pdfs(pdf_folder, output_folder="extracted_data", session=None):
+    """Process multiple PDFs from a folder, reusing one extraction session"""
+    session = session or get_default_session()
     results = {}
     for file in os.listdir(pdf_folder):
         if file.lower().endswith('.pdf'):
             pdf_path = os.path.join(pdf_folder, file)
             print(f"Processing: {file}")
-            results[file] = extract_data_from_pdf(pdf_path, output_folder)
+            results[file] = extract_data_from_pdf(pdf_path, output_folder, session=session)
     return results
 
+def iter_pdf_files(pdf_folder):
+    """Yield the PDF file names in a folder without building a list"""
+    with os.scandir(pdf_folder) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith('.pdf'):
+                yield entry.name
+
+def iter_extracted_pdfs(pdf_folder, output_folder="extracted_data", max_in_flight=8, session=None, use_cache=True, errors=None):
+    """
+    Yield (file name, extracted data) for each PDF in a folder as soon as it is processed
+    
+    At most max_in_flight documents are submitted at a time and a result is only held until the
+    caller consumes it, so memory stays constant however large the folder is.
+    
+    Args:
+        pdf_folder: Folder containing the PDF files
+        output_folder: Folder to save extracted text
+        max_in_flight: Maximum number of documents being analyzed at the same time
+        session: ExtractionSession shared by all requests (defaults to the shared session)
+        use_cache: Reuse stored analyze results for documents that were already processed
+        errors: Optional dictionary that receives file name -> error message for failed documents
+    """
+    session = session or get_default_session()
+    # Create the cache up front so worker threads share one instance
+    if use_cache:
+        get_analysis_cache(output_folder)
+    
+    pdf_files = iter_pdf_files(pdf_folder)
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        pending = {}
+        while True:
+            # Keep up to max_in_flight documents submitted
+            for file in pdf_files:
+                future = executor.submit(extract_data_from_pdf, os.path.join(pdf_folder, file), output_folder, use_cache, session)
+                pending[future] = file
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                break
+            
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file = pending.pop(future)
+                # A failing document is recorded and does not abort the batch
+                try:
+                    extracted_data = future.result()
+                except Exception as e:
+                    if errors is not None:
+                        errors[file] = str(e)
+                    print(f"Failed: {file}: {e}")
+                    continue
+                yield file, extracted_data
+
+async def aiter_extracted_pdfs(pdf_folder, output_folder="extracted_data", max_in_flight=8, session=None, use_cache=True, errors=None):
+    """
+    Async variant of iter_extracted_pdfs for use from an asyncio event loop
+    
+    Each document is extracted in a worker thread, so the event loop is never blocked.
+    Takes the same arguments as iter_extracted_pdfs. A consumer that stops early should close
+    the generator (contextlib.aclosing), so the documents still in flight are cancelled.
+    """
+    session = session or get_default_session()
+    if use_cache:
+        get_analysis_cache(output_folder)
+    
+    pdf_files = iter_pdf_files(pdf_folder)
+    pending = {}
+    try:
+        while True:
+            for file in pdf_files:
+                task = asyncio.create_task(asyncio.to_thread(
+                    extract_data_from_pdf, os.path.join(pdf_folder, file), output_folder, use_cache, session
+                ))
+                pending[task] = file
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                break
+            
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                file = pending.pop(task)
+                try:
+                    extracted_data = task.result()
+                except Exception as e:
+                    if errors is not None:
+                        errors[file] = str(e)
+                    print(f"Failed: {file}: {e}")
+                    continue
+                yield file, extracted_data
+    finally:
+        # The consumer stopped early (break, exception or cancellation): drop the documents still in flight
+        for task in pending:
+            task.cancel()
+
+def process_multiple_pdfs_concurrently(pdf_folder, output_folder="extracted_data", max_in_flight=8, session=None, use_cache=True):
+    """
+    Process multiple PDFs from a folder with up to max_in_flight analyze requests running at once
+    
+    Args:
+        pdf_folder: Folder containing the PDF files
+        output_folder: Folder to save extracted text
+        max_in_flight: Maximum number of documents being analyzed at the same time
+        session: ExtractionSession shared by all requests (defaults to the shared session)
+        use_cache: Reuse stored analyze results for documents that were already processed
+        
+    Returns:
+        Tuple of (results, errors). results maps file name to extracted data and errors maps
+        file name to the error message of each document that failed.
+    """
+    results = {}
+    errors = {}
+    start_time = time.perf_counter()
+    for file, extracted_data in iter_extracted_pdfs(pdf_folder, output_folder, max_in_flight, session, use_cache, errors):
+        results[file] = extracted_data
+    
+    elapsed = time.perf_counter() - start_time
+    total = len(results) + len(errors)
+    throughput = total / elapsed * 60 if elapsed > 0 else 0.0
+    print(f"Processed {total} documents ({len(errors)} failed) in {elapsed:.1f}s: {throughput:.1f} documents/minute")
+    return results, errors
+
 # # Only run example usage if the script is executed directly
 # if __name__ == "__main__":
 #     # process multiple PDFs in a folder
@@ -123,4 +375,8 @@ def process_multiple_pdfs(pdf_folder, output_folder="extracted_data"):
 #     # Optionally print summary of results
 #     for filename, data in results.items():
 #         print(f"  {filename}: Extracted {len(data.get('content', ''))} characters.")
+#
+#     # Or stream the results, handling each document as soon as it is processed
+#     for filename, data in iter_extracted_pdfs("Data"):
+#         print(f"  {filename}: Extracted {len(data.get('content', ''))} characters.")
 
@@ -1,5 +1,5 @@
 from crewai import Agent
-from tools import Pdf_Extraction_tool, Insert_Data_tool, Profile_Search_tool, Match_KYC_Data_tool
+from tools import Pdf_Extraction_tool, Profile_Search_tool, Match_KYC_Data_tool, Validator_tool, Name_Screening_tool
 
 
 ## Researcher Agent
@@ -16,9 +16,8 @@ researher_agent = Agent(
         "Knowledgeable about KYC processes and requirements."
         "Inserts extracted data from PDF into the KYC database."
         "Extract text using a custom pdf extraction tool and provide it to the KYC_Analyst_Agent for further processing."
-    )
+    ),
     tools=[Pdf_Extraction_tool],
-    tools=[Insert_Data_tool],
     allow_delegation=True,
 )
 KYC_analyst_agent = Agent(
@@ -38,7 +37,7 @@ KYC_analyst_agent = Agent(
         "if the data is matched, it updates the KYC database with the new data."
         "Provide the data to the Screener Agent for further processing."
     ),
-    tools=[Validator_tool],
+    tools=[Profile_Search_tool, Match_KYC_Data_tool, Validator_tool],
     allow_delegation=True,
 )
 Screener_agent = Agent(
@@ -56,7 +55,7 @@ Screener_agent = Agent(
         "Matches the data against the screening list by calling a custom fuzzy search match tool"
         "if deemed material, prompts the KYC ops user to review via Outreach Agent."
     ),
-    tools=[],
+    tools=[Name_Screening_tool],
     allow_delegation=True,
 )
 Outreach_agent = Agent(
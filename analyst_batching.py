@@ -0,0 +1,168 @@
+import json
+import re
+
+import kyc_matcher
+
+# Default maximum size of one batched prompt, in estimated tokens
+DEFAULT_TOKEN_BUDGET = 6000
+
+# Average number of characters per token used to estimate prompt sizes
+CHARS_PER_TOKEN = 4
+
+DECISIONS = {"match", "mismatch"}
+
+BATCH_INSTRUCTIONS = """You are reviewing KYC refresh cases. For each case below, decide for every listed field whether the
+value in the client document and the value on file describe the same fact ("match") or not ("mismatch").
+Unmapped document entries have no field on file; decide "mismatch" only if one contradicts the profile.
+
+Answer with JSON only, in exactly this form, with one result per case and one decision per field:
+{"results": [{"case_id": "<case id>", "fields": [{"field": "<field>", "decision": "match" or "mismatch", "explanation": "<one sentence>"}]}]}
+
+Cases:
+"""
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def case_question(case_id, report):
+    """
+    Returns the question for the LLM about a case's kyc_matcher report: its ambiguous fields and unmapped
+    document entries, or None when the deterministic match left nothing to decide.
+    """
+    fields = [
+        {'field': result['field'], 'document_value': result['document_value'],
+         'database_value': result['database_value'], 'note': result['reason']}
+        for result in report['ambiguous']
+    ]
+    fields += [{'field': pair['key'], 'document_value': pair['value'], 'database_value': None, 'note': "Unmapped"}
+               for pair in report['unmapped']]
+    if not fields:
+        return None
+    return {'case_id': str(case_id), 'fields': fields}
+
+
+def build_prompt(questions):
+    return BATCH_INSTRUCTIONS + "\n".join(json.dumps(question, default=str) for question in questions)
+
+
+def pack_questions(questions, token_budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Groups questions into batches whose prompt fits the token budget.
+    A question that does not fit on its own gets a batch of its own.
+
+    Returns:
+        List of lists of questions
+    """
+    batches = []
+    batch = []
+    batch_tokens = estimate_tokens(BATCH_INSTRUCTIONS)
+    for question in questions:
+        tokens = estimate_tokens(json.dumps(question, default=str)) + 1
+        if batch and batch_tokens + tokens > token_budget:
+            batches.append(batch)
+            batch = []
+            batch_tokens = estimate_tokens(BATCH_INSTRUCTIONS)
+        batch.append(question)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def parse_response(response, questions):
+    """
+    Splits a batched response into per-case decisions and validates them: a case is accepted only if
+    every asked field has a 'match' or 'mismatch' decision.
+
+    Returns:
+        Tuple of (dictionary of case_id -> {field: {'decision', 'explanation'}}, list of questions not answered validly)
+    """
+    try:
+        results = json.loads(_CODE_FENCE.sub("", str(response).strip()))["results"]
+        answers = {str(result["case_id"]): result["fields"] for result in results}
+    except (ValueError, KeyError, TypeError):
+        return {}, list(questions)
+
+    decisions = {}
+    failed = []
+    for question in questions:
+        try:
+            fields = {
+                answer["field"]: {'decision': answer["decision"], 'explanation': answer.get("explanation")}
+                for answer in answers[question['case_id']]
+            }
+        except (KeyError, TypeError):
+            failed.append(question)
+            continue
+        asked = [field['field'] for field in question['fields']]
+        if all(field in fields and fields[field]['decision'] in DECISIONS for field in asked):
+            decisions[question['case_id']] = {field: fields[field] for field in asked}
+        else:
+            failed.append(question)
+    return decisions, failed
+
+
+def answers_every_question(questions):
+    """Returns a validator accepting a response only if it answers every one of the questions validly."""
+    return lambda response: not parse_response(response, questions)[1]
+
+
+def resolve_questions(questions, ask, token_budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Answers questions with as few LLM calls as the token budget allows. Cases missing or invalid in a batched
+    answer are asked again one at a time.
+
+    Args:
+        questions: Questions from case_question
+        ask: Function called with a prompt and a validator of its response (see answers_every_question),
+            sending the prompt to the LLM and returning the response text
+        token_budget: Maximum estimated tokens per prompt
+
+    Returns:
+        Dictionary of case_id -> {field: {'decision', 'explanation'}}, or {'error': message} for a case the
+        LLM did not answer validly even on its own
+    """
+    decisions = {}
+    for batch in pack_questions(questions, token_budget):
+        batch_decisions, failed = parse_response(ask(build_prompt(batch), answers_every_question(batch)), batch)
+        decisions.update(batch_decisions)
+        for question in failed if len(batch) > 1 else []:
+            response = ask(build_prompt([question]), answers_every_question([question]))
+            single_decisions, _ = parse_response(response, [question])
+            decisions.update(single_decisions)
+    for question in questions:
+        decisions.setdefault(question['case_id'], {'error': "No valid answer from the LLM"})
+    return decisions
+
+
+def analyze_cases(conn, cases, ask, token_budget=DEFAULT_TOKEN_BUDGET):
+    """
+    Batch mode of the KYC Analyst: matches many cases' documents with their onboarding records
+    deterministically, then resolves only the ambiguous residue with batched LLM prompts.
+
+    Args:
+        conn: Connection to the KYC database
+        cases: List of (case_id, client_identifier, key_value_pairs)
+        ask: Function sending a prompt to the LLM and returning the response text (see resolve_questions)
+
+    Returns:
+        Dictionary of case_id -> match report (see kyc_matcher.match_extracted_data) with 'llm_decisions'
+        added, or None for a client without onboarding records
+    """
+    reports = {}
+    questions = []
+    for case_id, client_identifier, key_value_pairs in cases:
+        report = kyc_matcher.match_client_document(conn, client_identifier, key_value_pairs)
+        reports[str(case_id)] = report
+        question = case_question(case_id, report) if report is not None else None
+        if question is not None:
+            questions.append(question)
+    decisions = resolve_questions(questions, ask, token_budget)
+    for case_id, report in reports.items():
+        if report is not None:
+            report['llm_decisions'] = decisions.get(case_id, {})
+    return reports
@@ -0,0 +1,147 @@
+import itertools
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from dashboard_data import db_name
+from db_migrations import apply_migrations
+from name_screening import DEFAULT_MIN_SCORE, SCREENING_LIST_PATH, get_screening_index, normalize_name, screening_names
+
+# KycRefreshData columns holding the screened entity and member names
+NAME_COLUMNS = ["entity_legal_name", "member_legal_name", "member_first_name", "member_middle_name", "member_last_name"]
+
+# Number of distinct names screened per worker task
+CHUNK_SIZE = 2000
+
+INSERT_HIT_QUERY = (
+    "INSERT INTO ScreeningHits (refresh_id, client_identifier, field, screened_name, entry_id, entry_name, "
+    "list_type, score, list_version, screened_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def load_parties(conn):
+    """
+    Reads every screened name of KycRefreshData in one pass.
+
+    Returns:
+        List of (refresh id, client_identifier, field, name)
+    """
+    parties = []
+    cursor = conn.execute(f"SELECT id, client_identifier, {', '.join(NAME_COLUMNS)} FROM KycRefreshData")
+    for row in cursor:
+        for field, name in screening_names(dict(zip(NAME_COLUMNS, row[2:]))):
+            parties.append((row[0], row[1], field, name))
+    return parties
+
+
+# Screening index of a worker process, handed over by the parent
+_worker_index = None
+
+
+def _init_worker(index):
+    # Forked workers inherit the parent's index; spawned workers receive a pickled copy once
+    global _worker_index
+    _worker_index = index
+
+
+def _screen_chunk(names, min_score, index=None):
+    index = index or _worker_index
+    return [index.search(name, min_score) for name in names]
+
+
+def screen_names(names, list_path=SCREENING_LIST_PATH, min_score=DEFAULT_MIN_SCORE, workers=None, chunk_size=CHUNK_SIZE,
+                 index=None):
+    """
+    Screens many names against the screening list in parallel worker processes.
+
+    Names that normalize to the same tokens (case, accents, legal form, word order) are screened once.
+
+    Args:
+        names: Iterable of names
+        list_path: Screening list CSV
+        min_score: Minimum score of a reported hit
+        workers: Number of worker processes (default: CPU count); 1 screens in this process
+        chunk_size: Number of distinct names per worker task
+        index: Screening index to use instead of the index of list_path
+
+    Returns:
+        Dictionary of name -> list of hits
+    """
+    # Every worker screens with this index, so all results come from the same list version
+    if index is None:
+        index = get_screening_index(list_path)
+
+    groups = {}
+    for name in set(names):
+        groups.setdefault(normalize_name(name), []).append(name)
+    representatives = [group[0] for group in groups.values()]
+    chunks = [representatives[i:i + chunk_size] for i in range(0, len(representatives), chunk_size)]
+
+    if workers == 1:
+        chunk_hits = (_screen_chunk(chunk, min_score, index) for chunk in chunks)
+        return _expand_results(groups, chunks, chunk_hits)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(index,)) as pool:
+        chunk_hits = pool.map(_screen_chunk, chunks, itertools.repeat(min_score))
+        return _expand_results(groups, chunks, chunk_hits)
+
+
+def _expand_results(groups, chunks, chunk_hits):
+    results = {}
+    for chunk, hits_list in zip(chunks, chunk_hits):
+        for representative, hits in zip(chunk, hits_list):
+            for name in groups[normalize_name(representative)]:
+                results[name] = hits
+    return results
+
+
+def write_hits(conn, parties, results, list_version):
+    """
+    Replaces the stored screening hits with the hits of a full re-screen, in one transaction.
+
+    Returns:
+        Number of hits written
+    """
+    today = datetime.now().date().isoformat()
+    rows = [
+        (refresh_id, client_identifier, field, name, hit['entry_id'], hit['name'], hit['list_type'], hit['score'],
+         list_version, today)
+        for refresh_id, client_identifier, field, name in parties
+        for hit in results.get(name, ())
+    ]
+    with conn:
+        conn.execute("DELETE FROM ScreeningHits")
+        conn.executemany(INSERT_HIT_QUERY, rows)
+    return len(rows)
+
+
+def rescreen_refresh_data(db_path=db_name, list_path=SCREENING_LIST_PATH, min_score=DEFAULT_MIN_SCORE, workers=None):
+    """
+    Re-screens the whole KycRefreshData population against a new version of the screening list.
+
+    Returns:
+        Tuple of (number of screened names, number of hits)
+    """
+    start_time = time.perf_counter()
+    index = get_screening_index(list_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        apply_migrations(conn)
+        parties = load_parties(conn)
+        results = screen_names((name for _, _, _, name in parties), list_path, min_score, workers, index=index)
+        # The recorded version is the hash of the list the index was built from
+        hit_count = write_hits(conn, parties, results, index.version)
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - start_time
+    print(f"Screened {len(parties)} names in {elapsed:.1f}s ({len(parties) / elapsed:.0f} names/sec), {hit_count} hit(s)")
+    return len(parties), hit_count
+
+
+if __name__ == "__main__":
+    rescreen_refresh_data(
+        sys.argv[1] if len(sys.argv) > 1 else db_name,
+        sys.argv[2] if len(sys.argv) > 2 else SCREENING_LIST_PATH,
+    )
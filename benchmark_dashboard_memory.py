@@ -0,0 +1,96 @@
+"""
+Measures the memory the in-memory dashboards (gui3.py, gui3withCss.py) hold for their rows on a
+synthetic KycRefreshData table: the former load, a dictionary of every column per row turned into
+a DataFrame of strings, against dashboard_data.fetch_dashboard_frame, which reads only the
+dashboard columns into typed columns. Without pandas, only the row fetches are compared.
+
+Usage: python benchmark_dashboard_memory.py [rows]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import tracemalloc
+
+import dashboard_data
+import db_access
+from synthetic_data import generate_dataset
+
+# The typed load must hold less than this fraction of the memory of the former load
+MAX_RETAINED_RATIO = 0.5
+
+
+def former_frame(conn):
+    """The former gui3.py load: every column of every row as a dictionary, then a DataFrame with string columns"""
+    import pandas as pd
+
+    df = pd.DataFrame(db_access.fetch_table(dashboard_data.table_name, conn))
+    df['KycRefresh_created_date'] = pd.to_datetime(df['KycRefresh_created_date'], errors='coerce')
+    df['case_sla_date'] = pd.to_datetime(df['case_sla_date'], errors='coerce')
+    for col in ['document_name', 'refresh_status', 'case_status_display', 'entity_legal_name', 'outreach_agent_status']:
+        df[col] = df[col].astype(str)
+    return df
+
+
+def projected_rows(conn):
+    """The dashboard columns of every row as plain tuples, as read_sql_query reads them before building the columns"""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    return cursor.execute(dashboard_data.DASHBOARD_QUERY).fetchall()
+
+
+def measure(load, conn):
+    """Return the memory in bytes held by the result of load(conn), and the peak traced memory while loading"""
+    tracemalloc.start()
+    try:
+        result = load(conn)
+        retained, peak = tracemalloc.get_traced_memory()
+        return {'rows': len(result), 'retained': retained, 'peak': peak}
+    finally:
+        tracemalloc.stop()
+
+
+def compare_dashboard_memory(rows=500_000):
+    """
+    Compare the memory of the former and the typed dashboard loads on a generated table
+
+    Returns:
+        Dictionary of load name to its row count, retained and peak memory in bytes
+    """
+    try:
+        import pandas  # noqa: F401
+        loads = {
+            'former_frame': former_frame,
+            'typed_frame': lambda conn: dashboard_data.fetch_dashboard_frame(conn=conn),
+        }
+    except ImportError:
+        loads = {}
+    loads.update({
+        'dict_rows': lambda conn: db_access.fetch_table(dashboard_data.table_name, conn),
+        'projected_rows': projected_rows,
+    })
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        generate_dataset(temp_dir, rows, document_count=1, screening_list_size=0)
+        conn = sqlite3.connect(os.path.join(temp_dir, "KYC_DataBase.db"))
+        conn.row_factory = sqlite3.Row
+        try:
+            return {name: measure(load, conn) for name, load in loads.items()}
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    measurements = compare_dashboard_memory(rows)
+    mb = 1024 * 1024
+    for name, measured in measurements.items():
+        print(f"{name + ':':<16} {measured['rows']} rows, {measured['retained'] / mb:.1f} MB held, {measured['peak'] / mb:.1f} MB peak")
+    if 'typed_frame' in measurements:
+        former, typed = measurements['former_frame'], measurements['typed_frame']
+    else:
+        print("pandas is not installed: DataFrame loads not measured")
+        former, typed = measurements['dict_rows'], measurements['projected_rows']
+    if typed['retained'] > former['retained'] * MAX_RETAINED_RATIO:
+        print("FAIL: the typed load holds more than half the memory of the former load")
+        sys.exit(1)
@@ -0,0 +1,98 @@
+"""
+Benchmarks the name screening index on a synthetic sanctions/PEP list.
+
+Builds a list of random person and company names, then screens perturbed copies of
+list entries (typos, reordered tokens, diacritics, legal suffixes) and reports build
+time, per-query latency and how often the original entry is found.
+
+Usage: python benchmark_screening.py [list size] [number of queries]
+"""
+import random
+import statistics
+import sys
+import time
+
+from name_screening import ScreeningIndex
+
+SYLLABLES = [
+    "al", "an", "ar", "ba", "be", "bo", "ca", "da", "de", "di", "el", "en", "fa", "fe", "ga", "ha",
+    "he", "ia", "in", "ka", "ko", "la", "le", "li", "lo", "ma", "me", "mi", "mo", "na", "ne", "ni",
+    "no", "ol", "or", "pa", "ra", "re", "ri", "ro", "sa", "se", "si", "so", "ta", "te", "ti", "to",
+    "va", "ve", "vi", "ya", "za", "zo",
+]
+COMPANY_WORDS = ["Trading", "Holdings", "Capital", "Shipping", "Energy", "Global", "Import", "Export", "Group", "Logistics"]
+LEGAL_FORMS = ["Ltd", "LLC", "GmbH", "S.A.", "PLC", "Inc", "Limited", "Corp"]
+ACCENTS = {"a": "á", "e": "é", "i": "í", "o": "ö", "u": "ü", "n": "ñ"}
+
+
+def random_word(rng, min_syllables=2, max_syllables=4):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(min_syllables, max_syllables))).capitalize()
+
+
+def random_name(rng):
+    """Returns a random person name or company name."""
+    if rng.random() < 0.6:
+        return " ".join(random_word(rng) for _ in range(rng.randint(2, 3)))
+    return f"{random_word(rng)} {rng.choice(COMPANY_WORDS)} {rng.choice(LEGAL_FORMS)}"
+
+
+def perturb(rng, name):
+    """Returns a variant of a name with the kind of differences screening has to tolerate."""
+    tokens = name.split()
+    choice = rng.randrange(4)
+    if choice == 0:
+        # Typo: substitute one character of the longest token
+        position = max(range(len(tokens)), key=lambda i: len(tokens[i]))
+        token = tokens[position]
+        i = rng.randrange(1, len(token))
+        tokens[position] = token[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + token[i + 1:]
+    elif choice == 1:
+        rng.shuffle(tokens)
+    elif choice == 2:
+        tokens = ["".join(ACCENTS.get(c, c) for c in token) for token in tokens]
+    else:
+        tokens = [token for token in tokens if token not in LEGAL_FORMS] + [rng.choice(LEGAL_FORMS).upper()]
+    return " ".join(tokens)
+
+
+def run_benchmark(list_size=1_000_000, query_count=1000, seed=7):
+    """
+    Returns a dictionary with the build time, query latency percentiles (ms) and recall
+    """
+    rng = random.Random(seed)
+    names = [random_name(rng) for _ in range(list_size)]
+
+    start_time = time.perf_counter()
+    index = ScreeningIndex()
+    for position, name in enumerate(names):
+        index.add(f"E{position}", name, "sanctions" if position % 3 else "pep")
+    build_seconds = time.perf_counter() - start_time
+
+    latencies = []
+    found = 0
+    for _ in range(query_count):
+        position = rng.randrange(list_size)
+        query = perturb(rng, names[position])
+        start_time = time.perf_counter()
+        hits = index.search(query)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+        if any(hit['entry_id'] == f"E{position}" for hit in hits):
+            found += 1
+
+    latencies.sort()
+    return {
+        'list_size': list_size,
+        'queries': query_count,
+        'build_seconds': round(build_seconds, 2),
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        'max_ms': round(latencies[-1], 3),
+        'recall': round(found / query_count, 4),
+    }
+
+
+if __name__ == "__main__":
+    list_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    for key, value in run_benchmark(list_size, query_count).items():
+        print(f"{key}: {value}")
@@ -0,0 +1,287 @@
+"""
+End-to-end benchmark of the KYC refresh data paths on a synthetic dataset (see synthetic_data).
+
+Times the onboarding CSV load, the dashboard filter/page query, the client detail lookup, name
+screening, document matching and the full crew pipeline with a stub OCR client and a stub LLM,
+and writes the results to a JSON file. Comparing the results of two versions reports the
+measurements that got worse by more than REGRESSION_TOLERANCE.
+
+Usage:
+    python benchmark_suite.py [rows: 1k, 100k, 1m or a number] [results file]
+    python benchmark_suite.py compare [baseline results file] [results file]
+"""
+import asyncio
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import analyst_batching
+import dashboard_data
+import kyc_matcher
+from crew_runner import CaseGraph, CaseTask, CrewRunner
+from db_migrations import CHECKED_FILTERS, apply_migrations
+from name_screening import ScreeningIndex, screen_record
+from synthetic_data import SCALES, generate_dataset
+
+# Version of the results format; results of different versions are not compared
+RESULTS_VERSION = 1
+
+# Number of timed dashboard queries, client lookups, screened records and matched documents
+QUERY_COUNT = 200
+
+# Number of cases run through the stub pipeline
+PIPELINE_CASES = 50
+
+# Seconds the stub OCR client and the stub LLM take per call
+STUB_OCR_LATENCY = 0.05
+STUB_LLM_LATENCY = 0.05
+
+# Relative change of a measurement reported as a regression
+REGRESSION_TOLERANCE = 0.2
+
+# Duration changes smaller than this many milliseconds are timing noise, not regressions
+NOISE_FLOOR_MS = 1.0
+
+# Measurements where more is better; every other *_ms and *_seconds measurement is a duration
+THROUGHPUT_MEASURES = {"rows_per_second", "cases_per_second"}
+
+
+def latency_summary(latencies):
+    """Returns the count and the p50, p95 and max of latencies in seconds, in milliseconds."""
+    latencies = sorted(latencies)
+    return {
+        'count': len(latencies),
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p95_ms': round(latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+    }
+
+
+def time_calls(function, arguments):
+    """Calls function once per argument tuple and returns the latency summary of the calls."""
+    latencies = []
+    for args in arguments:
+        start_time = time.perf_counter()
+        function(*args)
+        latencies.append(time.perf_counter() - start_time)
+    return latency_summary(latencies)
+
+
+def stub_ask(prompt, validate=None):
+    """Stub LLM for analyst_batching: decides 'match' for every field of every case in the prompt."""
+    time.sleep(STUB_LLM_LATENCY)
+    questions = [json.loads(line) for line in prompt[len(analyst_batching.BATCH_INSTRUCTIONS):].splitlines() if line]
+    return json.dumps({"results": [
+        {"case_id": question['case_id'],
+         "fields": [{"field": field['field'], "decision": "match", "explanation": "Stub"} for field in question['fields']]}
+        for question in questions
+    ]})
+
+
+def bench_csv_ingest(dataset):
+    loader = importlib.import_module("insert_onboarding_data 1")
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = loader.load_onboarding_csv(dataset['csv_path'], dataset['db_path'])
+    elapsed = time.perf_counter() - start_time
+    with sqlite3.connect(dataset['db_path']) as conn:
+        # Dashboard indexes are built once the data is loaded, as on a migrated database
+        apply_migrations(conn)
+    return {'rows': rows, 'seconds': round(elapsed, 3), 'rows_per_second': round(rows / elapsed) if elapsed else 0}
+
+
+def bench_dashboard_query(dataset, rng):
+    filter_sets = [{}] + list(CHECKED_FILTERS.values())
+    arguments = [(rng.choice(filter_sets), rng.randint(1, 20), 5, dataset['db_path']) for _ in range(QUERY_COUNT)]
+    return time_calls(dashboard_data.fetch_dashboard_page, arguments)
+
+
+def bench_client_detail(dataset, rng):
+    case_ids = [f"CASE-{rng.randint(1, dataset['clients']):08d}" for _ in range(QUERY_COUNT)]
+    return time_calls(dashboard_data.fetch_case, [(case_id, dataset['db_path']) for case_id in case_ids])
+
+
+def bench_screening(dataset, rng):
+    start_time = time.perf_counter()
+    index = ScreeningIndex.from_csv(dataset['list_path'])
+    build_seconds = time.perf_counter() - start_time
+    with sqlite3.connect(dataset['db_path']) as conn:
+        conn.row_factory = sqlite3.Row
+        ids = [rng.randint(1, dataset['rows']) for _ in range(QUERY_COUNT)]
+        records = [dict(conn.execute("SELECT * FROM KycRefreshData WHERE id = ?", (row_id,)).fetchone()) for row_id in ids]
+    return dict(time_calls(screen_record, [(index, record) for record in records]),
+                list_size=len(index), build_seconds=round(build_seconds, 3))
+
+
+def bench_matching(dataset):
+    documents = dataset['documents'][:QUERY_COUNT]
+    with sqlite3.connect(dataset['db_path']) as conn:
+        arguments = [(conn, document['client_identifier'], document['key_value_pairs']) for document in documents]
+        return time_calls(kyc_matcher.match_client_document, arguments)
+
+
+def pipeline_graph(dataset, output_folder):
+    """
+    Returns the crew graph of the KYC refresh (research -> analysis || screening -> outreach) with the
+    agents replaced by the code they call: the extraction with a stub OCR client, kyc_matcher and
+    analyst_batching with a stub LLM, the screening index, and a stub LLM call for the outreach.
+    """
+    extraction = importlib.import_module("Extract_text_from_PDF 1")
+    from fake_document_client import FakeDocumentIntelligenceClient
+
+    session = extraction.ExtractionSession(client=FakeDocumentIntelligenceClient(latency=STUB_OCR_LATENCY))
+    index = ScreeningIndex.from_csv(dataset['list_path'])
+
+    def research(case, upstream):
+        extracted = extraction.extract_data_from_pdf(case['path'], output_folder, use_cache=False, session=session)
+        return extracted['key_value_pairs']
+
+    def analysis(case, upstream):
+        with sqlite3.connect(dataset['db_path']) as conn:
+            reports = analyst_batching.analyze_cases(conn, [(case['case_id'], case['client_identifier'], upstream['research'])], stub_ask)
+        return reports[case['case_id']]
+
+    def screening(case, upstream):
+        record = {kyc_matcher.field_for_key(pair['key']): pair['value'] for pair in upstream['research']}
+        return screen_record(index, record)
+
+    def outreach(case, upstream):
+        time.sleep(STUB_LLM_LATENCY)
+        return {'review': bool(upstream['analysis']['mismatches'] or upstream['screening'])}
+
+    return CaseGraph([
+        CaseTask("research", research),
+        CaseTask("analysis", analysis, depends_on=["research"]),
+        CaseTask("screening", screening, depends_on=["research"]),
+        CaseTask("outreach", outreach, depends_on=["analysis", "screening"]),
+    ])
+
+
+def bench_pipeline(dataset, output_folder):
+    cases = [
+        {'id': position, 'case_id': document['case_id'], 'client_identifier': document['client_identifier'], 'path': document['path']}
+        for position, document in enumerate(dataset['documents'][:PIPELINE_CASES])
+    ]
+    runner = CrewRunner(pipeline_graph(dataset, output_folder))
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = asyncio.run(runner.run_cases(cases))
+    elapsed = time.perf_counter() - start_time
+    return {
+        'cases': len(cases),
+        'failed': sum(1 for _, _, error in results if error is not None),
+        'seconds': round(elapsed, 3),
+        'cases_per_second': round(len(cases) / elapsed, 3) if elapsed else 0,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(rows=SCALES["1k"], seed=7, folder=None):
+    """
+    Generates a dataset of the given size and runs every benchmark on it. A benchmark that fails
+    (for example on a missing dependency) records its error and the others still run.
+
+    Returns:
+        Results dictionary: version, environment and benchmark name -> measurements
+    """
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        folder = folder or temp_dir
+        start_time = time.perf_counter()
+        dataset = generate_dataset(folder, rows, seed)
+        results = {
+            'version': RESULTS_VERSION,
+            'commit': git_commit(),
+            'recorded_at': datetime.now().isoformat(timespec="seconds"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'rows': dataset['rows'],
+            'seed': seed,
+            'generate_seconds': round(time.perf_counter() - start_time, 3),
+            'benchmarks': {},
+        }
+        benchmarks = [
+            ("csv_ingest", lambda: bench_csv_ingest(dataset)),
+            ("dashboard_query", lambda: bench_dashboard_query(dataset, rng)),
+            ("client_detail", lambda: bench_client_detail(dataset, rng)),
+            ("screening", lambda: bench_screening(dataset, rng)),
+            ("matching", lambda: bench_matching(dataset)),
+            ("pipeline", lambda: bench_pipeline(dataset, os.path.join(folder, "extracted_data"))),
+        ]
+        for name, benchmark in benchmarks:
+            try:
+                results['benchmarks'][name] = benchmark()
+            except Exception as e:
+                results['benchmarks'][name] = {'error': f"{type(e).__name__}: {e}"}
+            print(f"{name}: {results['benchmarks'][name]}")
+    return results
+
+
+def compare_results(baseline, current, tolerance=REGRESSION_TOLERANCE):
+    """
+    Compares two results dictionaries of the same dataset size.
+
+    Returns:
+        List of regression messages, one per measurement that got worse by more than tolerance
+    """
+    if baseline.get('version') != current.get('version') or baseline.get('rows') != current.get('rows'):
+        raise ValueError("Results have different formats or dataset sizes and cannot be compared")
+    regressions = []
+    for name, measures in current['benchmarks'].items():
+        before = baseline['benchmarks'].get(name, {})
+        if 'error' in measures and 'error' not in before:
+            regressions.append(f"{name}: failed ({measures['error']})")
+            continue
+        for measure, value in measures.items():
+            old_value = before.get(measure)
+            if not isinstance(old_value, (int, float)) or not old_value:
+                continue
+            if measure in THROUGHPUT_MEASURES:
+                change = (old_value - value) / old_value
+            elif measure.endswith(("_ms", "seconds")):
+                scale = 1 if measure.endswith("_ms") else 1000
+                if (value - old_value) * scale < NOISE_FLOOR_MS:
+                    continue
+                change = (value - old_value) / old_value
+            else:
+                continue
+            if change > tolerance:
+                regressions.append(f"{name}.{measure}: {old_value} -> {value} ({change:+.0%} worse)")
+    return regressions
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        with open(sys.argv[2], encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(sys.argv[3], encoding="utf-8") as f:
+            current = json.load(f)
+        regressions = compare_results(baseline, current)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        print(f"{len(regressions)} regression(s)")
+        sys.exit(1 if regressions else 0)
+
+    scale = sys.argv[1] if len(sys.argv) > 1 else "1k"
+    output_path = sys.argv[2] if len(sys.argv) > 2 else f"benchmark_{scale}.json"
+    results = run_suite(SCALES.get(scale.lower()) or int(scale))
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output_path}")
@@ -0,0 +1,67 @@
+"""
+Measures the peak Python memory of extract_data_from_pdf with the in-memory (bytes) upload
+and the streamed upload, using the offline fake Document Intelligence client.
+
+Usage: python benchmark_upload_memory.py [document size in MB]
+"""
+import importlib
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from fake_document_client import FakeDocumentIntelligenceClient
+
+extraction = importlib.import_module("Extract_text_from_PDF 1")
+
+# The streamed upload must peak below this fraction of the document size
+MAX_STREAM_PEAK_RATIO = 0.1
+
+
+def make_large_pdf(pdf_path, size_mb):
+    """Write a PDF-like file of about size_mb megabytes, standing in for a large scanned report"""
+    filler = os.urandom(1024 * 1024)
+    with open(pdf_path, "wb") as f:
+        f.write(b"%PDF-1.7\nEntity Name: Large Scanned Report Ltd\nDocument Type: Annual Report\n")
+        for _ in range(size_mb):
+            f.write(filler)
+
+
+def measure_peak(pdf_path, output_folder, stream_upload):
+    """Return the peak traced memory in bytes of one extraction"""
+    session = extraction.ExtractionSession(client=FakeDocumentIntelligenceClient(latency=0))
+    tracemalloc.start()
+    try:
+        extraction.extract_data_from_pdf(pdf_path, output_folder, use_cache=False, session=session, stream_upload=stream_upload)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def compare_upload_memory(size_mb=200):
+    """
+    Compare the peak memory of both upload paths on a generated document
+
+    Returns:
+        Dictionary with the document size and the peak memory of each path, in bytes
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = os.path.join(temp_dir, "large_report.pdf")
+        make_large_pdf(pdf_path, size_mb)
+        return {
+            'document_size': os.path.getsize(pdf_path),
+            'bytes_peak': measure_peak(pdf_path, temp_dir, stream_upload=False),
+            'stream_peak': measure_peak(pdf_path, temp_dir, stream_upload=True),
+        }
+
+
+if __name__ == "__main__":
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    measurements = compare_upload_memory(size_mb)
+    mb = 1024 * 1024
+    print(f"Document size:       {measurements['document_size'] / mb:.1f} MB")
+    print(f"Bytes upload peak:   {measurements['bytes_peak'] / mb:.1f} MB")
+    print(f"Stream upload peak:  {measurements['stream_peak'] / mb:.1f} MB")
+    if measurements['stream_peak'] > measurements['document_size'] * MAX_STREAM_PEAK_RATIO:
+        print("FAIL: streamed upload peak memory grows with the document size")
+        sys.exit(1)
@@ -0,0 +1,212 @@
+import bisect
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import dashboard_data
+
+# Minimum number of seconds between two reads of the change feed, shared by all dashboard clients
+POLL_INTERVAL = 2
+
+# Maximum number of changed rows pushed per poll; after a bulk change the clients reload their page instead
+MAX_CHANGES_PER_POLL = 500
+
+# Number of recent changes kept for clients that are behind; a client further behind reloads its page
+MAX_HISTORY = 5000
+
+# Number of dashboard pages (filters, page number) kept by the shared page cache
+MAX_CACHED_PAGES = 256
+
+
+class ChangeFeed:
+    """
+    Feed of the dashboard grid rows changed in KycRefreshData, read by row_version (see db_migrations).
+
+    One feed serves every dashboard client of the process: it reads the rows changed since the
+    newest version it has seen at most once per poll_interval, keeps the recent changes, and each
+    client asks for the changes after its own watermark.
+    """
+
+    def __init__(self, db_path=None, poll_interval=POLL_INTERVAL, max_history=MAX_HISTORY):
+        self.db_path = db_path or dashboard_data.db_name
+        self.poll_interval = poll_interval
+        self.max_history = max_history
+        # Newest row version read, and the version from which the kept changes are complete
+        self.version = None
+        self._complete_since = None
+        self._versions = []
+        self._rows = []
+        self._polled_at = None
+        # Set while a thread reads the feed, so a single query runs at a time
+        self._polling = False
+        self._lock = threading.Lock()
+
+    def poll(self, conn=None):
+        """
+        Reads the rows changed since the last poll, unless the feed was read less than poll_interval ago
+        or another thread is reading it. The query runs outside the lock, so clients keep reading the kept changes.
+        conn is an open connection to use instead of connecting to db_path (see db_access).
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._polling or (self._polled_at is not None and now - self._polled_at < self.poll_interval):
+                return
+            self._polling = True
+            self._polled_at = now
+            version = self.version
+        try:
+            rows = None
+            with dashboard_data.connection(self.db_path, conn) as conn:
+                if version is not None:
+                    cursor = conn.cursor()
+                    cursor.row_factory = sqlite3.Row
+                    rows = cursor.execute(
+                        dashboard_data.CHANGES_QUERY, (version, version, MAX_CHANGES_PER_POLL + 1)
+                    ).fetchall()
+                if rows is None or len(rows) > MAX_CHANGES_PER_POLL:
+                    latest = conn.execute(f"SELECT {dashboard_data.LATEST_VERSION_SQL}").fetchone()[0]
+        finally:
+            with self._lock:
+                self._polling = False
+        with self._lock:
+            if rows is None or len(rows) > MAX_CHANGES_PER_POLL:
+                # First read, or a bulk change: drop the kept changes so every client reloads its page
+                self.version = latest
+                self._complete_since = latest
+                self._versions = []
+                self._rows = []
+                return
+            for row in rows:
+                row = dict(row)
+                self._versions.append(row.pop('row_version'))
+                self._rows.append({'id': row['id'], 'deleted': True} if row.pop('deleted') else row)
+            if rows:
+                self.version = self._versions[-1]
+            if len(self._rows) > self.max_history:
+                dropped = len(self._rows) - self.max_history
+                self._complete_since = self._versions[dropped - 1]
+                del self._versions[:dropped]
+                del self._rows[:dropped]
+
+    def changes_since(self, version, conn=None):
+        """
+        Returns the grid rows changed after a client's watermark.
+
+        Args:
+            version: Newest version the client has, or None for a client that has none yet
+
+        Returns:
+            Tuple of (new watermark, changed rows with the latest values of each row). A deleted row is
+            {'id': id, 'deleted': True}. The rows are None when the client is further behind than the kept
+            changes, or the feed was not read yet, and must reload its page.
+        """
+        self.poll(conn)
+        with self._lock:
+            if self.version is None:
+                # Another thread is still reading the feed for the first time
+                return None, None
+            if version is None or version >= self.version:
+                return self.version, []
+            if version < self._complete_since:
+                return self.version, None
+            start = bisect.bisect_right(self._versions, version)
+            latest = {row['id']: row for row in self._rows[start:]}
+            return self.version, list(latest.values())
+
+
+class PageCache:
+    """
+    Dashboard pages shared by all clients of the process, valid until the change feed sees a new version.
+
+    Analysts looking at the same page with the same filters (the unfiltered first page, most of the time)
+    share one query and one list of rows. The cached rows are shared, so clients must not modify them.
+    """
+
+    def __init__(self, feed, max_pages=MAX_CACHED_PAGES):
+        self.feed = feed
+        self.max_pages = max_pages
+        self._version = None
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def fetch_page(self, filters, page, page_size, conn=None):
+        """Same as dashboard_data.fetch_dashboard_page, from the cache when the page was read at the current version."""
+        key = (tuple(sorted((name, value) for name, value in filters.items() if value)), page, page_size)
+        with self._lock:
+            if self._version != self.feed.version:
+                self._version = self.feed.version
+                self._pages.clear()
+            cached = self._pages.get(key)
+            if cached is not None:
+                self._pages.move_to_end(key)
+                return cached
+            version = self._version
+        cached = dashboard_data.fetch_dashboard_page(filters, page, page_size, self.feed.db_path, conn)
+        with self._lock:
+            if self._version == version:
+                self._pages[key] = cached
+                if len(self._pages) > self.max_pages:
+                    self._pages.popitem(last=False)
+        return cached
+
+
+def _sort_key(row, order_columns):
+    # NULLs sort first, as in SQLite
+    return tuple((row[column] is not None, row[column]) for column in order_columns)
+
+
+def plan_grid_update(changes, matching_ids, visible_rows, page_size, filtered=True, order_columns=("id",)):
+    """
+    Decides how a client showing one page of the grid applies changed rows.
+
+    Args:
+        changes: Changed rows from ChangeFeed.changes_since
+        matching_ids: Ids of the changed rows that match the client's filters
+        visible_rows: Rows of the page the client shows
+        page_size: Number of rows per page
+        filtered: Whether the client filters the rows; unfiltered, only inserted rows (the highest ids) enter the grid
+        order_columns: Columns the grid rows are ordered by (see dashboard_data.sort_columns)
+
+    Returns:
+        Tuple of (updated_rows, removed_ids, reload, recount): the visible rows to update in place, the ids of
+        the deleted rows to remove from the page, whether the page must be reloaded because rows may enter,
+        leave or move within it, and whether the row count may have changed
+    """
+    visible = {row['id']: row for row in visible_rows}
+    last_visible_key = max((_sort_key(row, order_columns) for row in visible_rows), default=None)
+    page_full = len(visible_rows) >= page_size
+    updated_rows = []
+    removed_ids = []
+    reload = False
+    recount = False
+    for row in changes:
+        if row.get('deleted'):
+            # Only the id of a deleted row is known, so its position is known only in id order
+            if row['id'] in visible:
+                # On the last page no row moves in to take its place
+                if page_full or len(removed_ids) + 1 == len(visible_rows):
+                    reload = True
+                else:
+                    removed_ids.append(row['id'])
+                    recount = True
+            elif last_visible_key is None or (tuple(order_columns) == ("id",) and row['id'] > max(visible)):
+                recount = True
+            else:
+                reload = True
+            continue
+        matches = row['id'] in matching_ids
+        key = _sort_key(row, order_columns)
+        if row['id'] in visible:
+            if matches and key == _sort_key(visible[row['id']], order_columns):
+                updated_rows.append(row)
+            else:
+                reload = True
+        elif last_visible_key is not None and key < last_visible_key:
+            # A row entering or leaving the filtered rows before this page shifts the page
+            reload = reload or filtered
+        elif matches and not page_full:
+            reload = True
+        else:
+            recount = True
+    return updated_rows, removed_ids, reload, recount
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import sys
+
+from crewai import Crew, Process, Task
+
+from agents import researher_agent, KYC_analyst_agent, Screener_agent, Outreach_agent
+from crew_runner import DEFAULT_MAX_CONCURRENCY, CaseGraph, CaseTask, CrewRunner
+from extraction_cache import file_hash
+import pipeline_metrics
+from llm_cache import LLMResponseCache
+from work_queue import DOCUMENT_DIR, db_name, run_worker_pool
+
+
+# Responses of agent tasks, reused when a task is run again on unchanged inputs
+response_cache = LLMResponseCache()
+
+
+def agent_model(agent):
+    """Returns the model name of an agent's LLM."""
+    return getattr(agent.llm, "model", None) or str(agent.llm)
+
+
+def has_content(response):
+    """Validator caching any non-empty response."""
+    return bool(str(response).strip())
+
+
+def is_json(response):
+    """Validator caching only responses that parse as JSON, with or without a Markdown code fence."""
+    text = str(response).strip().removeprefix("```json").removeprefix("```").removesuffix("```")
+    try:
+        json.loads(text)
+    except ValueError:
+        return False
+    return True
+
+
+def document_version(case):
+    """Key input of stages reading the case document: the SHA-256 of the document, so a replaced file is read again."""
+    path = case.get('path')
+    return {'document_hash': file_hash(path) if path and os.path.exists(path) else None}
+
+
+def agent_stage(agent, description, expected_output, cache=response_cache, validate=has_content, key_inputs=None):
+    """
+    Returns a stage function that runs one agent task for a case.
+
+    The description is formatted with the case fields and {upstream}, the JSON outputs of the
+    stages it depends on. Each run works on a copy of the agent so concurrent cases do not share state.
+    With a cache, a task whose agent, description, inputs and model were seen before returns the cached response.
+    Only responses passing validate are cached; key_inputs(case) adds values the description does not show to the key.
+    """
+    def run(case, upstream):
+        inputs = dict(case, upstream=json.dumps(upstream, default=str))
+
+        def call():
+            stage_agent = agent.copy()
+            task = Task(description=description, expected_output=expected_output, agent=stage_agent)
+            crew = Crew(agents=[stage_agent], tasks=[task], process=Process.sequential)
+            with pipeline_metrics.remote_call():
+                output = crew.kickoff(inputs=inputs)
+            usage = output.token_usage
+            pipeline_metrics.add(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+            return output.raw
+
+        if cache is None:
+            return call()
+        return cache.get_or_call(
+            agent.role, f"{description}\n{expected_output}", inputs, agent_model(agent), call,
+            validate=validate, key_inputs=key_inputs(case) if key_inputs else None,
+        )
+    return run
+
+
+def ask_analyst(prompt, validate=has_content):
+    """
+    Sends a complete prompt to the KYC Analyst agent's LLM, through the response cache. Used by analyst_batching,
+    which passes a validator so a batched answer is only cached when every case in it was answered.
+    """
+    def call():
+        with pipeline_metrics.remote_call():
+            return KYC_analyst_agent.llm.call(prompt)
+
+    return response_cache.get_or_call_prompt(
+        KYC_analyst_agent.role, prompt, agent_model(KYC_analyst_agent), call, validate=validate
+    )
+
+
+# Researcher -> (KYC Analyst || Screener) -> Outreach
+# The data match and the screening only need the extracted data, so they run in parallel.
+KYC_REFRESH_GRAPH = CaseGraph([
+    CaseTask("research", agent_stage(
+        researher_agent,
+        "Extract the onboarding data of case {case_id} (client {client_identifier}) from the document at {path}.",
+        "The extracted key-value pairs of the document as JSON",
+        validate=is_json, key_inputs=document_version,
+    )),
+    CaseTask("analysis", agent_stage(
+        KYC_analyst_agent,
+        "Match the data extracted for case {case_id} with the KYC database profile of client "
+        "{client_identifier} and report every mismatch. Extracted data: {upstream}",
+        "A match report listing the matching, mismatching and ambiguous fields",
+    ), depends_on=["research"]),
+    CaseTask("screening", agent_stage(
+        Screener_agent,
+        "Screen the entity and member names extracted for case {case_id} against the screening list. "
+        "Extracted data: {upstream}",
+        "The screening hits and whether each one is material",
+    ), depends_on=["research"]),
+    CaseTask("outreach", agent_stage(
+        Outreach_agent,
+        "Prompt the KYC ops user to review case {case_id} if the data match found mismatches or the "
+        "screening found material hits. Results: {upstream}",
+        "The review request sent to the KYC ops user, or a note that no review is needed",
+    ), depends_on=["analysis", "screening"]),
+])
+
+
+def run_cases(cases, max_concurrency=DEFAULT_MAX_CONCURRENCY, db_path=db_name):
+    """
+    Runs the KYC refresh crew for many cases concurrently.
+
+    Args:
+        cases: List of case dictionaries with case_id, client_identifier and path (the client document)
+        max_concurrency: Maximum number of agent calls in flight across all cases
+        db_path: Database receiving the stage metrics
+
+    Returns:
+        List of (case, stage outputs, error)
+    """
+    runner = CrewRunner(KYC_REFRESH_GRAPH, max_concurrency, metrics=pipeline_metrics.MetricsRecorder(db_path))
+    return asyncio.run(runner.run_cases(cases))
+
+
+def run_queue(db_path=db_name, worker_count=4, max_concurrency=DEFAULT_MAX_CONCURRENCY, document_dir=DOCUMENT_DIR):
+    """Processes the queued refresh cases of the database with a pool of workers. Returns the number completed."""
+    return run_worker_pool(KYC_REFRESH_GRAPH, db_path, worker_count, max_concurrency, document_dir=document_dir)
+
+
+if __name__ == "__main__":
+    run_queue(
+        sys.argv[1] if len(sys.argv) > 1 else db_name,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+    )
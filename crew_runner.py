@@ -0,0 +1,164 @@
+import asyncio
+import inspect
+import time
+from contextlib import nullcontext
+
+# Default maximum number of stage runs (agent calls) in flight across all cases
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+class CaseTask:
+    """
+    One stage of a case pipeline.
+
+    Args:
+        name: Stage name, unique within the graph
+        run: Callable run(case, upstream) returning the stage output. case is the case dictionary and
+            upstream maps each dependency name to its output. Plain functions run in a worker thread,
+            coroutine functions on the event loop.
+        depends_on: Names of the stages whose output this stage needs
+    """
+
+    def __init__(self, name, run, depends_on=()):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+
+
+class CaseGraph:
+    """Dependency graph of the stages of a case. Raises ValueError for unknown dependencies and cycles."""
+
+    def __init__(self, tasks):
+        self.tasks = {}
+        for task in tasks:
+            if task.name in self.tasks:
+                raise ValueError(f"Duplicate stage '{task.name}'")
+            self.tasks[task.name] = task
+        for task in tasks:
+            for dependency in task.depends_on:
+                if dependency not in self.tasks:
+                    raise ValueError(f"Stage '{task.name}' depends on unknown stage '{dependency}'")
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        remaining = {name: set(task.depends_on) for name, task in self.tasks.items()}
+        order = []
+        while remaining:
+            ready = sorted(name for name, dependencies in remaining.items() if not dependencies)
+            if not ready:
+                raise ValueError(f"Dependency cycle between stages {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+                order.append(name)
+            for dependencies in remaining.values():
+                dependencies.difference_update(ready)
+        return order
+
+
+class CrewRunner:
+    """
+    Runs the stages of many cases concurrently.
+
+    A stage starts as soon as the stages it depends on are done, so independent stages of a case run in
+    parallel and a case takes as long as its critical path. max_concurrency caps the stage runs in
+    flight across all cases; at most that many cases are started at a time so started cases finish first.
+
+    on_stage, if given, is called as on_stage(case, stage name, status) with status 'running' before a
+    stage runs and 'completed' or 'failed' after; it runs in a worker thread so it can write to the database.
+
+    checkpoints, if given, stores stage outputs: checkpoints.load(case) returns {stage name: output} of the
+    stages a previous run completed, which are not run again, and checkpoints.save(case, stage name, output)
+    is called when a stage completes.
+
+    metrics, if given, is a pipeline_metrics.MetricsRecorder that records the wall time of every stage run
+    and the time it waited for a concurrency slot.
+    """
+
+    def __init__(self, graph, max_concurrency=DEFAULT_MAX_CONCURRENCY, on_stage=None, checkpoints=None, metrics=None):
+        self.graph = graph
+        self.max_concurrency = max_concurrency
+        self.on_stage = on_stage
+        self.checkpoints = checkpoints
+        self.metrics = metrics
+        self._semaphores = {}
+
+    def _semaphore(self):
+        # One cap per event loop, so a runner can be reused across asyncio.run() calls
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores = {loop: asyncio.Semaphore(self.max_concurrency)}
+        return self._semaphores[loop]
+
+    async def _notify(self, case, stage, status):
+        if self.on_stage is not None:
+            await asyncio.to_thread(self.on_stage, case, stage, status)
+
+    async def _run_stage(self, task, case, upstream):
+        ready_time = time.perf_counter()
+        async with self._semaphore():
+            queue_wait = time.perf_counter() - ready_time
+            await self._notify(case, task.name, 'running')
+            span = self.metrics.span(task.name, case.get('case_id'), queue_wait) if self.metrics else nullcontext()
+            try:
+                with span:
+                    if inspect.iscoroutinefunction(task.run):
+                        output = await task.run(case, upstream)
+                    else:
+                        output = await asyncio.to_thread(task.run, case, upstream)
+            except Exception:
+                await self._notify(case, task.name, 'failed')
+                raise
+            if self.checkpoints is not None:
+                await asyncio.to_thread(self.checkpoints.save, case, task.name, output)
+            await self._notify(case, task.name, 'completed')
+            return output
+
+    async def run_case(self, case):
+        """
+        Runs every stage of one case.
+
+        Returns:
+            Dictionary of stage name -> output. The first stage error is raised once the
+            stages already running have finished; stages depending on a failed stage do not run.
+        """
+        saved = {}
+        if self.checkpoints is not None:
+            saved = await asyncio.to_thread(self.checkpoints.load, case)
+        stages = {}
+
+        async def run(task):
+            if task.name in saved:
+                return saved[task.name]
+            dependencies = [stages[name] for name in task.depends_on]
+            outputs = await asyncio.gather(*dependencies)
+            return await self._run_stage(task, case, dict(zip(task.depends_on, outputs)))
+
+        for name in self.graph.order:
+            stages[name] = asyncio.ensure_future(run(self.graph.tasks[name]))
+        results = await asyncio.gather(*stages.values(), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return dict(zip(stages, results))
+
+    async def run_cases(self, cases):
+        """
+        Runs many cases under the global concurrency cap.
+
+        Returns:
+            List of (case, outputs, error) in the order of cases; error is None for a completed case
+        """
+        case_slots = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(case):
+            async with case_slots:
+                start_time = time.perf_counter()
+                try:
+                    outputs = await self.run_case(case)
+                except Exception as e:
+                    print(f"Case {case.get('case_id')} failed: {e}")
+                    return case, None, e
+                print(f"Case {case.get('case_id')} completed in {time.perf_counter() - start_time:.1f}s")
+                return case, outputs, None
+
+        return await asyncio.gather(*(run(case) for case in cases))
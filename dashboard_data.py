@@ -0,0 +1,277 @@
+import sqlite3
+from contextlib import contextmanager
+from datetime import date
+
+import pipeline_metrics
+
+db_name = "data/KYC_DataBase.db"
+table_name = "KycRefreshData"
+
+# Columns shown in the dashboard grid. case_status_display and case_sla_date are maintained
+# on write by the case summary triggers in db_migrations.py, with the SLA window of the case's risk tier.
+DASHBOARD_COLUMNS = [
+    "id",
+    "entity_legal_name",
+    "refresh_status",
+    "case_status_display",
+    "outreach_agent_status",
+    "document_name",
+    "KycRefresh_created_date",
+    "case_sla_date",
+    "KycRefresh_updated_date",
+]
+
+# Columns whose changes are pushed to the dashboard (see change_feed)
+GRID_SOURCE_COLUMNS = DASHBOARD_COLUMNS[1:]
+
+# Text filters: filter name -> column matched with a case-insensitive "contains"
+TEXT_FILTERS = {
+    "name": "entity_legal_name",
+    "change": "refresh_status",
+    "status": "case_status_display",
+    "case_id": "outreach_agent_status",
+    "data_source": "document_name",
+}
+
+# Trigram full-text index of the text filter columns, maintained by triggers in db_migrations.py.
+# A value of at least SEARCH_MIN_LENGTH characters is found through the index; a shorter value
+# has no trigram to look up and is matched with LIKE on the table.
+SEARCH_TABLE = "KycRefreshSearch"
+SEARCH_MIN_LENGTH = 3
+
+# Date range filters: filter name -> (column, label used in error messages)
+DATE_FILTERS = {
+    "creation_date": ("KycRefresh_created_date", "CASE CREATION DATE"),
+    "sla_date": ("case_sla_date", "CASE SLA DATE"),
+    "complete_date": ("KycRefresh_updated_date", "CASE COMPLETE DATE"),
+}
+
+
+def parse_date_range(date_filter, label):
+    """
+    Parses a 'YYYY-MM-DD to YYYY-MM-DD' filter value into a (start, end) pair of dates.
+    Returns None if the value is not a range. Raises ValueError if a date is invalid.
+    """
+    date_range = date_filter.split(' to ')
+    if len(date_range) != 2:
+        return None
+    try:
+        start_date = date.fromisoformat(date_range[0].strip())
+        end_date = date.fromisoformat(date_range[1].strip())
+    except ValueError:
+        raise ValueError(f"Invalid {label} range. Use format 'YYYY-MM-DD to YYYY-MM-DD'")
+    return start_date, end_date
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _search_phrase(column, value):
+    """FTS5 query matching value as a substring of one column: a quoted phrase of its trigrams"""
+    escaped = value.replace('"', '""')
+    return f'{column} : "{escaped}"'
+
+
+def build_where_clause(filters):
+    """
+    Turns the dashboard filters into a parameterized WHERE clause.
+
+    Args:
+        filters: Dictionary of filter name to user input (see TEXT_FILTERS and DATE_FILTERS)
+
+    Returns:
+        Tuple of (where_sql, params). where_sql is empty when no filter is set.
+    """
+    conditions = []
+    params = []
+    phrases = []
+    for name, column in TEXT_FILTERS.items():
+        value = filters.get(name)
+        if not value:
+            continue
+        if len(value) >= SEARCH_MIN_LENGTH:
+            phrases.append(_search_phrase(column, value))
+        else:
+            conditions.append(f"{column} LIKE ? ESCAPE '\\'")
+            params.append(f"%{_escape_like(value)}%")
+    if phrases:
+        conditions.insert(0, f"id IN (SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?)")
+        params.insert(0, " AND ".join(phrases))
+
+    for name, (column, label) in DATE_FILTERS.items():
+        value = filters.get(name)
+        if value:
+            date_range = parse_date_range(value, label)
+            if date_range:
+                conditions.append(f"{column} >= ? AND {column} <= ?")
+                params.extend(d.isoformat() for d in date_range)
+
+    if not conditions:
+        return "", []
+    return "WHERE " + " AND ".join(conditions), params
+
+
+def sort_columns(filters):
+    """
+    Returns the columns the dashboard rows are ordered by. A page filtered on a date range is
+    ordered by that date, then id, so it is read in the order of the date index without a sort;
+    otherwise the rows are ordered by id.
+    """
+    for name, (column, label) in DATE_FILTERS.items():
+        value = filters.get(name)
+        if value and parse_date_range(value, label):
+            return [column, "id"]
+    return ["id"]
+
+
+def count_query(where_sql):
+    return f"SELECT COUNT(*) FROM {table_name} {where_sql}"
+
+
+def page_query(where_sql, order_columns=("id",)):
+    return (
+        f"SELECT {', '.join(DASHBOARD_COLUMNS)} FROM {table_name} {where_sql} "
+        f"ORDER BY {', '.join(order_columns)} LIMIT ? OFFSET ?"
+    )
+
+
+@contextmanager
+def connection(db_path=None, conn=None):
+    """Yields conn, or a new connection to db_path (defaults to db_name) that is closed afterwards."""
+    if conn is not None:
+        yield conn
+        return
+    conn = sqlite3.connect(db_path or db_name)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+CASE_QUERY = f"SELECT * FROM {table_name} WHERE outreach_agent_status = ?"
+
+
+# Every dashboard row, for the dashboards that filter in memory (gui3.py, gui3withCss.py)
+DASHBOARD_QUERY = f"SELECT {', '.join(DASHBOARD_COLUMNS)} FROM {table_name} ORDER BY id"
+
+# Column types of the in-memory dashboard DataFrame. The status columns take a handful of values,
+# stored once as categories with a small code per row instead of one string object per row.
+DASHBOARD_DTYPES = {
+    "id": "int64",
+    "refresh_status": "category",
+    "case_status_display": "category",
+}
+
+# Date columns of the in-memory dashboard DataFrame, parsed to datetime64 (8 bytes per row).
+# KycRefresh_updated_date stays text: it is empty until a case completes and the grid shows it as is.
+DASHBOARD_DATE_COLUMNS = ["KycRefresh_created_date", "case_sla_date"]
+
+
+# Deleted rows with the row version of their deletion, written by a db_migrations trigger
+DELETES_TABLE = "KycRefreshDeletes"
+
+# Newest row version, of a written or a deleted row
+LATEST_VERSION_SQL = (
+    f"MAX(IFNULL((SELECT MAX(row_version) FROM {table_name}), 0), "
+    f"IFNULL((SELECT MAX(row_version) FROM {DELETES_TABLE}), 0))"
+)
+
+# Grid rows changed or deleted after a row version, oldest change first, read in one snapshot.
+# A deleted row has only its id and deleted = 1.
+CHANGES_QUERY = (
+    f"SELECT {', '.join(DASHBOARD_COLUMNS)}, row_version, 0 AS deleted FROM {table_name} WHERE row_version > ? "
+    f"UNION ALL SELECT {', '.join('refresh_id' if column == 'id' else 'NULL' for column in DASHBOARD_COLUMNS)}, "
+    f"row_version, 1 FROM {DELETES_TABLE} WHERE row_version > ? "
+    f"ORDER BY row_version LIMIT ?"
+)
+
+
+def fetch_dashboard_page(filters, page=1, page_size=5, db_path=None, conn=None):
+    """
+    Fetches one page of dashboard rows matching the filters.
+
+    Args:
+        filters: Dictionary of filter name to user input
+        page: 1-based page number
+        page_size: Number of rows per page
+        db_path: SQLite database path (defaults to db_name)
+        conn: Open connection to use instead of connecting to db_path (see db_access)
+
+    Returns:
+        Tuple of (rows, total_count) where rows is a list of dictionaries for the requested page
+        and total_count is the number of rows matching the filters.
+    """
+    where_sql, params = build_where_clause(filters)
+    offset = (max(page, 1) - 1) * page_size
+    with connection(db_path, conn) as conn:
+        total_count = conn.execute(count_query(where_sql), params).fetchone()[0]
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        query = page_query(where_sql, sort_columns(filters))
+        rows = [dict(row) for row in cursor.execute(query, params + [page_size, offset])]
+    return rows, total_count
+
+
+def fetch_dashboard_count(filters, db_path=None, conn=None):
+    """Returns the number of dashboard rows matching the filters."""
+    where_sql, params = build_where_clause(filters)
+    with connection(db_path, conn) as conn:
+        return conn.execute(count_query(where_sql), params).fetchone()[0]
+
+
+def fetch_matching_ids(filters, ids, db_path=None, conn=None):
+    """Returns the subset of the row ids that match the dashboard filters."""
+    if not ids:
+        return set()
+    where_sql, params = build_where_clause(filters)
+    id_condition = f"id IN ({', '.join('?' for _ in ids)})"
+    where_sql = f"{where_sql} AND {id_condition}" if where_sql else f"WHERE {id_condition}"
+    with connection(db_path, conn) as conn:
+        return {row[0] for row in conn.execute(f"SELECT id FROM {table_name} {where_sql}", params + list(ids))}
+
+
+def fetch_case(case_id, db_path=None, conn=None):
+    """
+    Fetches the full record for a case, including the derived dashboard columns.
+    Returns None if the case does not exist.
+    """
+    with connection(db_path, conn) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        row = cursor.execute(CASE_QUERY, (case_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def fetch_dashboard_frame(db_path=None, conn=None):
+    """
+    Loads the dashboard columns of every row into a pandas DataFrame, typed on load: the case dates as
+    datetime64 and the status columns as categoricals (see DASHBOARD_DTYPES). Only the columns the
+    grid shows are read, and no dictionary is built per row.
+    """
+    # pandas is only needed by the dashboards that filter in memory
+    import pandas as pd
+
+    with connection(db_path, conn) as conn:
+        return pd.read_sql_query(DASHBOARD_QUERY, conn, parse_dates=DASHBOARD_DATE_COLUMNS, dtype=DASHBOARD_DTYPES)
+
+
+def fetch_stage_latency(db_path=None, conn=None):
+    """
+    Fetches the per-stage latency summary of the refresh pipeline (see pipeline_metrics.stage_latency_summary).
+    Returns an empty list if no stage metrics were recorded yet.
+    """
+    with connection(db_path, conn) as conn:
+        try:
+            return pipeline_metrics.stage_latency_summary(conn)
+        except sqlite3.OperationalError:
+            return []
+
+
+def fetch_prometheus_metrics(db_path=None, conn=None):
+    """Returns the recorded stage metrics in the Prometheus text format, empty if none were recorded yet."""
+    with connection(db_path, conn) as conn:
+        try:
+            return pipeline_metrics.prometheus_text(conn)
+        except sqlite3.OperationalError:
+            return ""
@@ -0,0 +1,87 @@
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Default number of pooled connections, each owned by one worker thread
+DEFAULT_POOL_SIZE = 4
+
+# Prepared statements kept per pooled connection; the dashboard runs a few dozen distinct queries
+STATEMENT_CACHE_SIZE = 256
+
+
+class Database:
+    """
+    Read-only access to the KYC database for the NiceGUI apps, off the event loop.
+
+    Queries run on a small pool of worker threads, each holding one long-lived connection, so a
+    slow query never blocks the event loop and no query pays for opening a connection. A connection
+    keeps its prepared statements, so the parameterized dashboard queries are parsed once per thread.
+    Rows are sqlite3.Row objects: tuples that can also be read by column name.
+
+    Functions that take a connection as their conn keyword argument (dashboard_data, change_feed)
+    run on the pool with run() and run_sync().
+    """
+
+    def __init__(self, db_path, pool_size=DEFAULT_POOL_SIZE):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="kyc-db")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+            conn.row_factory = sqlite3.Row
+            # The apps only read; writes belong to the loaders and the crew workers
+            conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _call(self, function, args):
+        return function(*args, conn=self._connection())
+
+    async def run(self, function, *args):
+        """Runs function(*args, conn=<pooled connection>) on a pool thread and returns its result."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, function, args)
+
+    def run_sync(self, function, *args):
+        """Same as run() for code outside the event loop, such as data loaded at import time."""
+        return self._executor.submit(self._call, function, args).result()
+
+    async def fetch_all(self, sql, params=()):
+        return await self.run(_fetch_all, sql, params)
+
+    async def fetch_one(self, sql, params=()):
+        return await self.run(_fetch_one, sql, params)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+
+
+def _fetch_all(sql, params, conn):
+    return conn.execute(sql, params).fetchall()
+
+
+def _fetch_one(sql, params, conn):
+    return conn.execute(sql, params).fetchone()
+
+
+def fetch_table(table, conn):
+    """
+    Retrieves all rows of a table, each as a dictionary of column name to value.
+    Returns an empty list if the table cannot be read.
+    """
+    try:
+        return [dict(row) for row in conn.execute(f"SELECT * FROM {table}")]
+    except sqlite3.Error as e:
+        print(e)
+        return []
@@ -0,0 +1,515 @@
+import sqlite3
+import sys
+
+import dashboard_data
+
+db_name = dashboard_data.db_name
+
+# Prefix used for every index managed by this module
+INDEX_PREFIX = "idx_kyc_"
+
+# Risk tier of cases that were not given one, and the SLA window of a tier missing from SlaPolicy
+DEFAULT_RISK_TIER = "medium"
+DEFAULT_SLA_DAYS = 90
+
+# SLA windows (days from case creation) set up in a new database; operations change them in SlaPolicy
+SLA_POLICY_DEFAULTS = {"high": 30, "medium": DEFAULT_SLA_DAYS, "low": 180}
+
+# Profile fields shared by OnboardingData and KycRefreshData, compared to detect material changes
+PROFILE_FIELDS = [
+    "entity_legal_name", "date_of_incorporation", "dba_name", "dba_address", "phone_number",
+    "number_of_employees", "number_of_branches", "client_regulated", "name_of_regulator", "id_number",
+    "country_issuing_id", "id_type", "date_of_id_issuance", "is_payment_intermediary", "member_association",
+    "member_role", "ownership_percentage", "identification_number", "issuing_country", "id_expiry_date",
+    "identification_type", "address_line_1", "address_line_2", "address_country", "date_of_birth",
+    "country_of_citizenship", "city_of_birth", "country_of_birth",
+]
+
+# Columns identifying a client/member row: the client plus the member the row describes.
+IDENTITY_COLUMNS = [
+    "client_identifier", "member_type", "member_legal_name", "member_first_name", "member_middle_name", "member_last_name",
+]
+
+# Member fields are empty for entity-level rows, so NULLs are folded to '' to keep identities unique.
+ONBOARDING_IDENTITY = ", ".join(
+    [IDENTITY_COLUMNS[0]] + [f"IFNULL({column}, '')" for column in IDENTITY_COLUMNS[1:]]
+)
+
+# Rows without a client identifier cannot be identified, so they are left out of the identity index
+ONBOARDING_IDENTITY_CONDITION = f"{IDENTITY_COLUMNS[0]} IS NOT NULL"
+
+# Tables added to the original schema: (table, column definitions)
+TABLES = [
+    # Ids and row versions of deleted refresh rows, read by the dashboard change feed
+    (dashboard_data.DELETES_TABLE, """
+        row_version INTEGER PRIMARY KEY,
+        refresh_id INTEGER NOT NULL,
+        deleted_at TEXT
+    """),
+    # Screening list hits of KycRefreshData names, written by batch_screening
+    ("ScreeningHits", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        refresh_id INTEGER NOT NULL,
+        client_identifier TEXT,
+        field TEXT NOT NULL,
+        screened_name TEXT,
+        entry_id TEXT NOT NULL,
+        entry_name TEXT,
+        list_type TEXT,
+        score REAL,
+        list_version TEXT,
+        screened_date DATE
+    """),
+    # Output of each completed crew stage of a case, used to resume a failed case
+    ("StageOutputs", """
+        refresh_id INTEGER NOT NULL,
+        stage TEXT NOT NULL,
+        output TEXT,
+        completed_at REAL,
+        PRIMARY KEY (refresh_id, stage)
+    """),
+    # Case SLA window of each risk tier; changing a row re-dates the cases of the tier
+    ("SlaPolicy", """
+        risk_tier TEXT PRIMARY KEY,
+        sla_days INTEGER NOT NULL
+    """),
+    # Timing, token and size measurements of crew stage runs, written by pipeline_metrics
+    ("StageMetrics", """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        case_id TEXT,
+        stage TEXT NOT NULL,
+        status TEXT,
+        wall_seconds REAL,
+        queue_wait_seconds REAL,
+        remote_seconds REAL,
+        prompt_tokens INTEGER,
+        completion_tokens INTEGER,
+        bytes_processed INTEGER,
+        recorded_at REAL NOT NULL
+    """),
+]
+
+# Columns added to the original schema: (table, column, declaration)
+ADDED_COLUMNS = [
+    ("OnboardingData", "row_fingerprint", "TEXT"),
+    ("KycRefreshData", "row_fingerprint", "TEXT"),
+    # Work queue state of a refresh case, maintained by work_queue
+    ("KycRefreshData", "queue_status", "TEXT"),
+    ("KycRefreshData", "queued_at", "REAL"),
+    ("KycRefreshData", "lease_owner", "TEXT"),
+    ("KycRefreshData", "lease_expires_at", "REAL"),
+    ("KycRefreshData", "attempts", "INTEGER NOT NULL DEFAULT 0"),
+    ("KycRefreshData", "last_error", "TEXT"),
+    # Change feed watermark of a refresh row, maintained by the row version triggers
+    ("KycRefreshData", "row_version", "INTEGER NOT NULL DEFAULT 0"),
+    ("KycRefreshData", "updated_at", "TEXT"),
+    # Risk tier of the case, selecting its SLA window in SlaPolicy
+    ("KycRefreshData", "risk_tier", f"TEXT NOT NULL DEFAULT '{DEFAULT_RISK_TIER}'"),
+    # Ready-to-display dashboard values, maintained by the case summary triggers
+    ("KycRefreshData", "case_status_display", "TEXT"),
+    ("KycRefreshData", "case_sla_date", "DATE"),
+]
+
+# Dashboard columns derived from other KycRefreshData columns: column -> SQL computing it for a row
+CASE_SUMMARY_COLUMNS = {
+    "case_status_display": (
+        "CASE WHEN lower(refresh_status) = 'yes' THEN 'KYC status Refreshed' "
+        "WHEN lower(refresh_status) = 'no' THEN 'Profile updates absorbed' "
+        "ELSE refresh_status END"
+    ),
+    "case_sla_date": (
+        "date(KycRefresh_created_date, '+' || IFNULL((SELECT sla_days FROM SlaPolicy "
+        f"WHERE SlaPolicy.risk_tier = KycRefreshData.risk_tier), {DEFAULT_SLA_DAYS}) || ' days')"
+    ),
+}
+CASE_SUMMARY_UPDATE = (
+    f"UPDATE KycRefreshData SET {', '.join(f'{column} = {sql}' for column, sql in CASE_SUMMARY_COLUMNS.items())}"
+)
+
+# KycRefreshData columns the case summary columns are computed from
+CASE_SUMMARY_SOURCE_COLUMNS = ["refresh_status", "KycRefresh_created_date", "risk_tier"]
+
+# Prefix used for every trigger managed by this module
+TRIGGER_PREFIX = "trg_kyc_"
+
+# Managed triggers: (trigger name, SQL body after CREATE TRIGGER <name>)
+# A stored fingerprint is cleared when a profile field changes, so refresh_delta recomputes it.
+TRIGGERS = [
+    (
+        f"{TRIGGER_PREFIX}{table.lower()}_fingerprint",
+        f"AFTER UPDATE OF {', '.join(PROFILE_FIELDS + IDENTITY_COLUMNS)} ON {table} "
+        f"BEGIN UPDATE {table} SET row_fingerprint = NULL WHERE id = NEW.id; END",
+    )
+    for table in ("OnboardingData", "KycRefreshData")
+]
+
+# A refresh row gets the next row version when it is inserted or a dashboard grid column changes.
+# Writers are serialized, so versions are committed in increasing order and the dashboard
+# change feed can read everything after the last version it saw.
+# The case summary columns are left out of the update trigger: they are rewritten by the summary triggers of
+# the same insert or update, which would bump the version a second time. A change of their source columns
+# bumps it instead, and an SLA window change bumps the rows of its tier (which share one version).
+# An update that sets row_version itself is not bumped again.
+# A deleted row is recorded in the deletes table with the next version, so the feed removes it from the grid.
+NEXT_ROW_VERSION = (
+    f"row_version = {dashboard_data.LATEST_VERSION_SQL} + 1, "
+    "updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+)
+ROW_VERSION_UPDATE = f"UPDATE KycRefreshData SET {NEXT_ROW_VERSION} WHERE id = NEW.id"
+VERSIONED_COLUMNS = [
+    column for column in dashboard_data.GRID_SOURCE_COLUMNS if column not in CASE_SUMMARY_COLUMNS
+] + [column for column in CASE_SUMMARY_SOURCE_COLUMNS if column not in dashboard_data.GRID_SOURCE_COLUMNS]
+TRIGGERS += [
+    (f"{TRIGGER_PREFIX}kycrefreshdata_version_insert", f"AFTER INSERT ON KycRefreshData BEGIN {ROW_VERSION_UPDATE}; END"),
+    (
+        f"{TRIGGER_PREFIX}kycrefreshdata_version_update",
+        f"AFTER UPDATE OF {', '.join(VERSIONED_COLUMNS)} ON KycRefreshData "
+        f"WHEN NEW.row_version = OLD.row_version BEGIN {ROW_VERSION_UPDATE}; END",
+    ),
+    (
+        f"{TRIGGER_PREFIX}kycrefreshdata_version_delete",
+        f"AFTER DELETE ON KycRefreshData BEGIN INSERT INTO {dashboard_data.DELETES_TABLE} "
+        f"(row_version, refresh_id, deleted_at) VALUES (MAX({dashboard_data.LATEST_VERSION_SQL}, OLD.row_version) + 1, "
+        "OLD.id, strftime('%Y-%m-%dT%H:%M:%f', 'now')); END",
+    ),
+]
+
+# The case summary columns are recomputed when a row is written, and for a whole tier when its SLA window changes,
+# so the dashboard reads them instead of deriving them on every query
+TRIGGERS += [
+    (
+        f"{TRIGGER_PREFIX}kycrefreshdata_summary_insert",
+        f"AFTER INSERT ON KycRefreshData BEGIN {CASE_SUMMARY_UPDATE} WHERE id = NEW.id; END",
+    ),
+    (
+        f"{TRIGGER_PREFIX}kycrefreshdata_summary_update",
+        f"AFTER UPDATE OF {', '.join(CASE_SUMMARY_SOURCE_COLUMNS)} ON KycRefreshData "
+        f"BEGIN {CASE_SUMMARY_UPDATE} WHERE id = NEW.id; END",
+    ),
+] + [
+    (
+        f"{TRIGGER_PREFIX}slapolicy_{event.lower()}",
+        f"AFTER {event} ON SlaPolicy BEGIN {CASE_SUMMARY_UPDATE}, {NEXT_ROW_VERSION} WHERE risk_tier = {row}.risk_tier; END",
+    )
+    for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD"))
+]
+
+# The dashboard text filter columns of a refresh row are copied to the trigram search index when the row
+# is written. The copy is read back from the table, so it holds the final values whichever trigger runs last.
+SEARCH_COLUMNS = list(dashboard_data.TEXT_FILTERS.values())
+SEARCH_UPDATE = (
+    f"DELETE FROM {dashboard_data.SEARCH_TABLE} WHERE rowid = NEW.id; "
+    f"INSERT INTO {dashboard_data.SEARCH_TABLE} (rowid, {', '.join(SEARCH_COLUMNS)}) "
+    f"SELECT id, {', '.join(SEARCH_COLUMNS)} FROM KycRefreshData WHERE id = NEW.id"
+)
+TRIGGERS += [
+    (f"{TRIGGER_PREFIX}kycrefreshdata_search_insert", f"AFTER INSERT ON KycRefreshData BEGIN {SEARCH_UPDATE}; END"),
+    (
+        f"{TRIGGER_PREFIX}kycrefreshdata_search_update",
+        f"AFTER UPDATE OF {', '.join(SEARCH_COLUMNS)} ON KycRefreshData BEGIN {SEARCH_UPDATE}; END",
+    ),
+    (
+        f"{TRIGGER_PREFIX}kycrefreshdata_search_delete",
+        f"AFTER DELETE ON KycRefreshData BEGIN DELETE FROM {dashboard_data.SEARCH_TABLE} WHERE rowid = OLD.id; END",
+    ),
+]
+
+# Managed unique indexes: (index name, table, indexed columns, condition of the rows indexed)
+# The onboarding identity index is also the upsert key of insert_onboarding_data and
+# serves client_identifier lookups on OnboardingData.
+UNIQUE_INDEXES = [
+    (f"{INDEX_PREFIX}onboarding_identity", "OnboardingData", ONBOARDING_IDENTITY, ONBOARDING_IDENTITY_CONDITION),
+]
+
+# Managed indexes: (index name, table, indexed columns)
+# The dashboard text filters are answered by the search index (see SEARCH_COLUMNS), the date
+# filters by the date indexes, which also return the rows in date order for the filtered pages.
+INDEXES = [
+    (f"{INDEX_PREFIX}refresh_case_id", "KycRefreshData", "outreach_agent_status"),
+    (f"{INDEX_PREFIX}refresh_created_date", "KycRefreshData", "KycRefresh_created_date"),
+    (f"{INDEX_PREFIX}refresh_updated_date", "KycRefreshData", "KycRefresh_updated_date"),
+    (f"{INDEX_PREFIX}refresh_identity", "KycRefreshData", ONBOARDING_IDENTITY),
+    # Covering indexes of the work queue claims: pending rows in id order, leased rows by lease expiry
+    (f"{INDEX_PREFIX}refresh_queue", "KycRefreshData", "queue_status, lease_expires_at, attempts, outreach_agent_status"),
+    (f"{INDEX_PREFIX}refresh_queue_order", "KycRefreshData", "queue_status, id, outreach_agent_status"),
+    (f"{INDEX_PREFIX}refresh_row_version", "KycRefreshData", "row_version"),
+    (f"{INDEX_PREFIX}refresh_case_sla_date", "KycRefreshData", "case_sla_date"),
+    (f"{INDEX_PREFIX}refresh_risk_tier", "KycRefreshData", "risk_tier"),
+    (f"{INDEX_PREFIX}onboarding_entity_name", "OnboardingData", "entity_legal_name COLLATE NOCASE"),
+    (f"{INDEX_PREFIX}screening_hits_refresh_id", "ScreeningHits", "refresh_id"),
+    (f"{INDEX_PREFIX}screening_hits_client_id", "ScreeningHits", "client_identifier"),
+    (f"{INDEX_PREFIX}stage_metrics_recorded_at", "StageMetrics", "recorded_at"),
+]
+
+# Sample filters for every indexed dashboard access path, used to build the checked queries.
+# Text values are SEARCH_MIN_LENGTH characters or longer; shorter ones cannot use the search index.
+CHECKED_FILTERS = {
+    "client name": {"name": "Acme"},
+    "case status": {"status": "Refreshed"},
+    "material change": {"change": "Yes"},
+    "case id": {"case_id": "CASE-1"},
+    "data source": {"data_source": "certificate"},
+    "case creation date": {"creation_date": "2025-01-01 to 2025-03-31"},
+    "case sla date": {"sla_date": "2025-04-01 to 2025-06-30"},
+    "case complete date": {"complete_date": "2025-01-01 to 2025-03-31"},
+}
+
+
+# Dashboard queries that read the whole table by design: the unfiltered row count, and the unfiltered
+# page, read in id order until its LIMIT is reached
+FULL_SCAN_QUERIES = {"all rows count", "all rows page"}
+
+
+class DuplicateRows(ValueError):
+    """
+    Raised when a unique index cannot be created because rows already share its key. The migration
+    never deletes rows; the duplicates are reviewed and removed on purpose (see remove_duplicates).
+    """
+
+    def __init__(self, index, table, duplicates):
+        self.index = index
+        self.table = table
+        self.duplicates = duplicates
+        examples = "; ".join(f"ids {', '.join(map(str, ids))}" for _, ids in duplicates[:5])
+        super().__init__(
+            f"Cannot create {index}: {len(duplicates)} group(s) of {table} rows share the same key ({examples}). "
+            f"Review them, then run 'python db_migrations.py remove-duplicates [db]' to keep the latest row of each group."
+        )
+
+
+def apply_migrations(conn):
+    """
+    Brings an existing database up to date: added tables and columns, the search index,
+    managed triggers and managed indexes.
+    """
+    apply_tables(conn)
+    added = apply_columns(conn)
+    if any(column in CASE_SUMMARY_COLUMNS for _, column in added):
+        refresh_case_summary(conn)
+    apply_search_index(conn)
+    apply_triggers(conn)
+    return apply_indexes(conn)
+
+
+def apply_tables(conn):
+    """Creates the tables in TABLES that do not exist yet."""
+    with conn:
+        for table, columns in TABLES:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+        conn.executemany("INSERT OR IGNORE INTO SlaPolicy (risk_tier, sla_days) VALUES (?, ?)", SLA_POLICY_DEFAULTS.items())
+
+
+def apply_columns(conn):
+    """Adds the columns in ADDED_COLUMNS that a table does not have yet. Returns the added (table, column) pairs."""
+    added = []
+    with conn:
+        for table, column, declaration in ADDED_COLUMNS:
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+                added.append((table, column))
+    return added
+
+
+def refresh_case_summary(conn):
+    """Recomputes the case summary columns of every refresh case. Returns the number of cases updated."""
+    with conn:
+        return conn.execute(CASE_SUMMARY_UPDATE).rowcount
+
+
+def set_sla_days(conn, risk_tier, sla_days):
+    """Sets the SLA window of a risk tier; the triggers re-date the cases of the tier."""
+    with conn:
+        conn.execute(
+            "INSERT INTO SlaPolicy (risk_tier, sla_days) VALUES (?, ?) "
+            "ON CONFLICT(risk_tier) DO UPDATE SET sla_days = excluded.sla_days",
+            (risk_tier, sla_days),
+        )
+
+
+def apply_search_index(conn):
+    """Creates the trigram search index of the dashboard text filters and fills it, if it does not exist yet."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (dashboard_data.SEARCH_TABLE,)
+    ).fetchone()
+    if exists:
+        return
+    with conn:
+        conn.execute(
+            f"CREATE VIRTUAL TABLE {dashboard_data.SEARCH_TABLE} USING fts5({', '.join(SEARCH_COLUMNS)}, tokenize = 'trigram')"
+        )
+        conn.execute(
+            f"INSERT INTO {dashboard_data.SEARCH_TABLE} (rowid, {', '.join(SEARCH_COLUMNS)}) "
+            f"SELECT id, {', '.join(SEARCH_COLUMNS)} FROM KycRefreshData"
+        )
+
+
+def apply_triggers(conn):
+    """Recreates the managed triggers so they always match TRIGGERS, and drops stale managed triggers."""
+    existing = [
+        row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE ?", (f"{TRIGGER_PREFIX}%",)
+        )
+    ]
+    with conn:
+        for name in existing:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        for name, body in TRIGGERS:
+            conn.execute(f"CREATE TRIGGER {name} {body}")
+
+
+def index_sql(name, table, columns, unique=False, condition=None):
+    """CREATE INDEX statement of a managed index, as SQLite stores it in sqlite_master"""
+    where_sql = f" WHERE {condition}" if condition else ""
+    return f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({columns}){where_sql}"
+
+
+def apply_indexes(conn):
+    """
+    Creates the managed indexes that are missing, recreates those whose definition changed and drops
+    managed indexes that are no longer part of INDEXES or UNIQUE_INDEXES. Safe to run on existing databases.
+    Rows are never deleted: a unique index whose key is shared by several rows is not created.
+
+    Returns:
+        Tuple of (created, dropped) index names
+
+    Raises:
+        DuplicateRows: Rows of a table share the key of one of its unique indexes
+    """
+    wanted = {name: index_sql(name, table, columns) for name, table, columns in INDEXES}
+    wanted.update({
+        name: index_sql(name, table, columns, unique=True, condition=condition)
+        for name, table, columns, condition in UNIQUE_INDEXES
+    })
+    existing = {
+        row[0]: row[1] for row in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND name LIKE ?", (f"{INDEX_PREFIX}%",)
+        )
+    }
+    created = []
+    dropped = []
+    with conn:
+        for name, sql in sorted(existing.items()):
+            if wanted.get(name) != sql:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+                dropped.append(name)
+        for name, table, columns in INDEXES:
+            if existing.get(name) != wanted[name]:
+                conn.execute(wanted[name])
+                created.append(name)
+        for name, table, columns, condition in UNIQUE_INDEXES:
+            if existing.get(name) != wanted[name]:
+                duplicates = find_duplicates(conn, table, columns, condition)
+                if duplicates:
+                    raise DuplicateRows(name, table, duplicates)
+                conn.execute(wanted[name])
+                created.append(name)
+    return created, dropped
+
+
+def find_duplicates(conn, table, columns, condition=None):
+    """
+    Returns the groups of rows sharing the given key, among the rows matching condition,
+    as a list of (key, ids) with the ids in insertion order.
+    """
+    where_sql = f"WHERE {condition}" if condition else ""
+    cursor = conn.execute(
+        f"SELECT {columns}, GROUP_CONCAT(id) FROM {table} {where_sql} GROUP BY {columns} HAVING COUNT(*) > 1"
+    )
+    return [(tuple(row[:-1]), sorted(int(row_id) for row_id in row[-1].split(","))) for row in cursor]
+
+
+def remove_duplicates(conn):
+    """
+    Deletes all but the most recently inserted row of each group of rows sharing the key of a unique index,
+    so the indexes can be created. Never run by the migrations; an operator runs it after reviewing the
+    duplicates reported by DuplicateRows.
+
+    Returns:
+        Dictionary of table -> ids of the deleted rows
+    """
+    deleted = {}
+    with conn:
+        for name, table, columns, condition in UNIQUE_INDEXES:
+            ids = [row_id for _, group in find_duplicates(conn, table, columns, condition) for row_id in group[:-1]]
+            conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(row_id,) for row_id in ids])
+            deleted[table] = deleted.get(table, []) + ids
+    return deleted
+
+
+def dashboard_queries():
+    """
+    Returns every dashboard query and the profile lookup queries,
+    as a list of (description, sql, params).
+    """
+    queries = []
+    for description, filters in [("all rows", {})] + list(CHECKED_FILTERS.items()):
+        where_sql, params = dashboard_data.build_where_clause(filters)
+        page_sql = dashboard_data.page_query(where_sql, dashboard_data.sort_columns(filters))
+        queries.append((f"{description} count", dashboard_data.count_query(where_sql), params))
+        queries.append((f"{description} page", page_sql, params + [5, 0]))
+    queries.append(("client details", dashboard_data.CASE_QUERY, ["CASE-1"]))
+    queries.append(("change feed", dashboard_data.CHANGES_QUERY, [0, 0, 1000]))
+    queries.append((
+        "onboarding profile search",
+        "SELECT * FROM OnboardingData WHERE client_identifier = ?",
+        ["CLIENT-1"],
+    ))
+    queries.append((
+        "refresh profile search",
+        "SELECT * FROM KycRefreshData WHERE client_identifier = ?",
+        ["CLIENT-1"],
+    ))
+    return queries
+
+
+def plan_step_fails(description, detail):
+    """Whether one step of a query plan reads more rows than the query needs"""
+    if "TEMP B-TREE" in detail:
+        # A sort or grouping of every matching row before the first one is returned
+        return True
+    if detail.startswith(f"SCAN {dashboard_data.SEARCH_TABLE} VIRTUAL TABLE INDEX") and ":M" in detail:
+        # Full-text MATCH, answered from the trigram index
+        return False
+    return detail.startswith("SCAN") and description not in FULL_SCAN_QUERIES
+
+
+def check_query_plans(conn):
+    """
+    Runs EXPLAIN QUERY PLAN on every dashboard query.
+
+    Returns:
+        List of (description, plan detail) for each query that falls back to a scan or to a sort
+        in a temporary b-tree. An empty list means every query is served by an index, in index order.
+    """
+    failures = []
+    for description, sql, params in dashboard_queries():
+        for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+            detail = row[3]
+            if plan_step_fails(description, detail):
+                failures.append((description, detail))
+    return failures
+
+
+def migrate(db_path=db_name):
+    """Applies the migrations to a database and verifies the dashboard query plans."""
+    with sqlite3.connect(db_path) as conn:
+        try:
+            created, dropped = apply_migrations(conn)
+        except DuplicateRows as e:
+            print(e)
+            return False
+        print(f"Created {len(created)} index(es), dropped {len(dropped)} stale index(es)")
+        failures = check_query_plans(conn)
+    for description, detail in failures:
+        print(f"Query plan check failed for {description}: {detail}")
+    return not failures
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "remove-duplicates":
+        with sqlite3.connect(sys.argv[2] if len(sys.argv) > 2 else db_name) as conn:
+            for table, ids in remove_duplicates(conn).items():
+                print(f"Removed {len(ids)} duplicate row(s) from {table}: ids {ids}")
+        sys.exit(0)
+    sys.exit(0 if migrate(sys.argv[1] if len(sys.argv) > 1 else db_name) else 1)
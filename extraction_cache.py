@@ -0,0 +1,61 @@
+import hashlib
+
+from lru_store import LRUStore
+
+# Default size limit of the cache, in bytes of serialized results
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Analyze result fields needed to rebuild extracted_data (REST names, as returned by as_dict())
+CACHED_FIELDS = ["content", "tables", "keyValuePairs", "paragraphs"]
+
+# Read size used when hashing files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def document_hash(document_bytes):
+    """Returns the SHA-256 hex digest of the document bytes."""
+    return hashlib.sha256(document_bytes).hexdigest()
+
+
+def file_hash(path):
+    """Returns the SHA-256 hex digest of a file, read in chunks so the file is never fully in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def serialize_analyze_result(result):
+    """
+    Serializes the parts of an Azure Document Intelligence AnalyzeResult that the
+    extraction uses (content, tables, key-value pairs, paragraphs) to a JSON-ready dict.
+    """
+    result_dict = result.as_dict()
+    return {field: result_dict[field] for field in CACHED_FIELDS if field in result_dict}
+
+
+class AnalysisCache:
+    """
+    Persistent, size-bounded LRU cache of analyze results stored in SQLite.
+    Entries are keyed by the SHA-256 of the document bytes and the model ID.
+    """
+
+    def __init__(self, db_path, max_bytes=DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self._store = LRUStore(db_path, "AnalysisCache", ["document_hash", "model_id"], max_bytes)
+
+    def get(self, document_hash, model_id):
+        """Returns the cached payload dict, or None on a miss. A hit refreshes the entry's LRU position."""
+        return self._store.get((document_hash, model_id))
+
+    def put(self, document_hash, model_id, payload):
+        """Stores a payload dict and evicts least recently used entries until the cache fits in max_bytes."""
+        self._store.put((document_hash, model_id), payload)
+
+    def stats(self):
+        """Returns the number and size of the cached results."""
+        return self._store.stats()
+
+    def clear(self):
+        self._store.clear()
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from azure.core.exceptions import HttpResponseError
+from azure.ai.documentintelligence.models import AnalyzeResult
+
+# Chunk size used when consuming a streamed request body, like an HTTP transport would
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Only the start of a document is kept to build the fake analyze result
+ANALYZED_PREFIX_SIZE = 64 * 1024
+
+
+class FakePoller:
+    """Stands in for the LROPoller returned by begin_analyze_document."""
+
+    def __init__(self, client, document_bytes):
+        self._client = client
+        self._document_bytes = document_bytes
+
+    def result(self):
+        return self._client._analyze(self._document_bytes)
+
+
+class FakeDocumentIntelligenceClient:
+    """
+    Offline stand-in for azure.ai.documentintelligence.DocumentIntelligenceClient.
+    Use it through ExtractionSession(client=FakeDocumentIntelligenceClient()).
+
+    begin_analyze_document() returns a poller whose result() sleeps for `latency` seconds
+    to simulate the remote round trip and returns an AnalyzeResult built from the document.
+    Documents that do not start with the PDF signature are rejected with HttpResponseError,
+    like the service does for unsupported content.
+    """
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.calls = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def begin_analyze_document(self, model_id, body, **kwargs):
+        # The real client accepts bytes or a binary stream; a stream is consumed in chunks
+        if isinstance(body, (bytes, bytearray, memoryview)):
+            document_prefix = bytes(body[:ANALYZED_PREFIX_SIZE])
+        else:
+            document_prefix = b""
+            for chunk in iter(lambda: body.read(UPLOAD_CHUNK_SIZE), b""):
+                if len(document_prefix) < ANALYZED_PREFIX_SIZE:
+                    document_prefix += chunk[:ANALYZED_PREFIX_SIZE - len(document_prefix)]
+        return FakePoller(self, document_prefix)
+
+    def _analyze(self, document_bytes):
+        with self._lock:
+            self.calls += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            time.sleep(self.latency)
+            if not document_bytes.startswith(b"%PDF"):
+                raise HttpResponseError(message="InvalidContent: The file is corrupted or format is unsupported.")
+            return AnalyzeResult(fake_analyze_payload(document_bytes))
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def close(self):
+        pass
+
+
+def fake_analyze_payload(document_bytes):
+    """Builds a small analyze result payload (REST field names) describing the document."""
+    text = document_bytes.decode("latin-1")
+    lines = [line.strip() for line in text.splitlines()[1:] if line.strip()]
+    return {
+        "content": "\n".join(lines),
+        "paragraphs": [{"content": line} for line in lines],
+        "tables": [],
+        "keyValuePairs": [
+            {"key": {"content": key.strip()}, "value": {"content": value.strip()}}
+            for key, _, value in (line.partition(":") for line in lines)
+            if value.strip()
+        ],
+    }
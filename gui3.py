@@ -1,45 +1,14 @@
 import pandas as pd
 from nicegui import ui
-import sqlite3
-
-db_name = "data/KYC_DataBase.db"
-table_name = "OnboardingData"
-
-def retrieve_data_with_column_name():
-    """
-    Retrieves all data from a specified SQLite table and returns each row with its corresponding column names as a dictionary.
-    """
-    try:
-        with sqlite3.connect(db_name) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT * FROM {table_name}")
-            rows = cursor.fetchall()
-            column_names = [description[0] for description in cursor.description]
-            row_data = [dict(zip(column_names, row)) for row in rows]
-            return row_data
-    except sqlite3.Error as e:
-        print(e)
-        return []
-
-# Load data from DB into a DataFrame
-data = retrieve_data_with_column_name()
-df = pd.DataFrame(data)
-
-# Convert KycRefresh_created_date to datetime and calculate case_sla_date as KycRefresh_created_date + 90 days
-df['KycRefresh_created_date'] = pd.to_datetime(df['KycRefresh_created_date'], errors='coerce')
-df['case_sla_date'] = df['KycRefresh_created_date'] + pd.Timedelta(days=90)
-
-# Add computed column for CASE STATUS based on refresh_status
-df['case_status_display'] = df['refresh_status'].apply(
-    lambda x: "KYC status Refreshed" if str(x).lower() == "yes" else "Profile updates absorbed" if str(x).lower() == "no" else x
-)
-
-# Convert relevant columns to strings to avoid issues during filtering
-df['document_name'] = df['document_name'].astype(str)
-df['refresh_status'] = df['refresh_status'].astype(str)
-df['case_status_display'] = df['case_status_display'].astype(str)
-df['entity_legal_name'] = df['entity_legal_name'].astype(str)
-df['outreach_agent_status'] = df['outreach_agent_status'].astype(str)
+import dashboard_data
+import db_access
+
+# Shared read-only database access, off the NiceGUI event loop
+database = db_access.Database(dashboard_data.db_name)
+
+# Load the dashboard columns into a typed DataFrame; case_status_display and case_sla_date
+# are maintained in the table (see dashboard_data.fetch_dashboard_frame)
+df = database.run_sync(dashboard_data.fetch_dashboard_frame)
 
 # Pagination settings
 ITEMS_PER_PAGE = 5
@@ -48,7 +17,7 @@ total_pages = (len(df) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
 
 # Function to filter the DataFrame based on user inputs
 def filter_data(name_filter, change_filter, status_filter, case_id_filter, data_source_filter, creation_date_filter, sla_date_filter, complete_date_filter):
-    filtered_df = df.copy()
+    filtered_df = df
 
     if name_filter:
         filtered_df = filtered_df[filtered_df['entity_legal_name'].str.contains(name_filter, case=False, na=False)]
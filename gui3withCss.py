@@ -1,37 +1,14 @@
 import pandas as pd
 from nicegui import ui
-import sqlite3
-
-db_name = "data/KYC_DataBase.db"
-table_name = "OnboardingData"
-
-def retrieve_data_with_column_name():
-    try:
-        with sqlite3.connect(db_name) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT * FROM {table_name}")
-            rows = cursor.fetchall()
-            column_names = [description[0] for description in cursor.description]
-            row_data = [dict(zip(column_names, row)) for row in rows]
-            return row_data
-    except sqlite3.Error as e:
-        print(e)
-        return []
-
-# Load data from DB into a DataFrame
-data = retrieve_data_with_column_name()
-df = pd.DataFrame(data)
-
-# Date conversion and computed columns
-df['KycRefresh_created_date'] = pd.to_datetime(df['KycRefresh_created_date'], errors='coerce')
-df['case_sla_date'] = df['KycRefresh_created_date'] + pd.Timedelta(days=90)
-df['case_status_display'] = df['refresh_status'].apply(
-    lambda x: "KYC status Refreshed" if str(x).lower() == "yes" else "Profile updates absorbed" if str(x).lower() == "no" else x
-)
-
-# Cast relevant columns
-for col in ['document_name', 'refresh_status', 'case_status_display', 'entity_legal_name', 'outreach_agent_status']:
-    df[col] = df[col].astype(str)
+import dashboard_data
+import db_access
+
+# Shared read-only database access, off the NiceGUI event loop
+database = db_access.Database(dashboard_data.db_name)
+
+# Load the dashboard columns into a typed DataFrame; case_status_display and case_sla_date
+# are maintained in the table (see dashboard_data.fetch_dashboard_frame)
+df = database.run_sync(dashboard_data.fetch_dashboard_frame)
 
 # Pagination settings
 ITEMS_PER_PAGE = 5
@@ -40,7 +17,7 @@ total_pages = (len(df) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
 
 # Filtering logic
 def filter_data(name_filter, change_filter, status_filter, case_id_filter, data_source_filter, creation_date_filter, sla_date_filter, complete_date_filter):
-    filtered_df = df.copy()
+    filtered_df = df
 
     if name_filter:
         filtered_df = filtered_df[filtered_df['entity_legal_name'].str.contains(name_filter, case=False, na=False)]
@@ -1,231 +1,218 @@
-import pandas as pd
-from nicegui import ui
-import sqlite3
+from nicegui import app, ui
+from fastapi.responses import PlainTextResponse
 import random
+import change_feed
+import dashboard_data
+import db_access
+
+# Pagination settings
+ITEMS_PER_PAGE = 5
+
+# Seconds between two checks for changed rows
+LIVE_UPDATE_INTERVAL = 2
+
+# Shared by every connected client: the pooled connections every query runs on, off the event loop,
+# the rows changed by the agents, read once per interval, and the dashboard pages read since the last change.
+# None of them holds any per-client state.
+database = db_access.Database(dashboard_data.db_name)
+feed = change_feed.ChangeFeed(dashboard_data.db_name, LIVE_UPDATE_INTERVAL)
+page_cache = change_feed.PageCache(feed)
+
+# Filter inputs: filter name -> (label, placeholder)
+FILTER_INPUTS = {
+    'name': ('CLIENT NAME Filter', 'Enter client name'),
+    'change': ('MATERIAL CHANGE Filter', 'Yes/No'),
+    'status': ('CASE STATUS Filter', 'Enter status'),
+    'case_id': ('CASE ID Filter', 'Enter case ID'),
+    'data_source': ('DATA SOURCE Filter', 'Enter data source'),
+}
+DATE_FILTER_INPUTS = {
+    'creation_date': ('CASE CREATION DATE Filter', 'YYYY-MM-DD to YYYY-MM-DD'),
+    'sla_date': ('CASE SLA DATE Filter', 'YYYY-MM-DD to YYYY-MM-DD'),
+    'complete_date': ('CASE COMPLETE DATE Filter', 'YYYY-MM-DD to YYYY-MM-DD'),
+}
+
+# Define table columns with clickable CLIENT NAME
+COLUMN_DEFS = [
+    {
+        'headerName': 'CLIENT NAME',
+        'field': 'entity_legal_name',
+        'filter': 'agTextColumnFilter',
+        'cellRenderer': lambda params: f'<a href="/client/{params.data["outreach_agent_status"]}" target="_self">{params.value}</a>'
+    },
+    {'headerName': 'MATERIAL CHANGE', 'field': 'refresh_status', 'filter': 'agTextColumnFilter'},
+    {'headerName': 'CASE STATUS', 'field': 'case_status_display', 'filter': 'agTextColumnFilter'},
+    {'headerName': 'CASE ID', 'field': 'outreach_agent_status', 'filter': 'agTextColumnFilter'},
+    {'headerName': 'DATA SOURCE', 'field': 'document_name', 'filter': 'agTextColumnFilter'},
+    {'headerName': 'CASE CREATION DATE', 'field': 'KycRefresh_created_date', 'filter': 'agDateColumnFilter'},
+    {'headerName': 'CASE SLA DATE', 'field': 'case_sla_date', 'filter': 'agDateColumnFilter'},
+    {'headerName': 'CASE COMPLETE DATE', 'field': 'KycRefresh_updated_date', 'filter': 'agDateColumnFilter'},
+]
 
-db_name = "data/KYC_DataBase.db"
-table_name = "OnboardingData"
 
-def retrieve_data_with_column_name(case_id=None):
+class DashboardSession:
     """
-    Retrieves data from the SQLite table. If case_id is provided, filters by outreach_agent_status.
-    Returns each row with its corresponding column names as a dictionary.
+    Filter inputs, grid and pagination of one client connection. A session is created on every
+    page load, so one analyst's filters and page never repaint another analyst's grid.
+    The rows come from the shared page cache and are never modified in place.
+    Call start() once the session is built to load the first page and start the live updates.
     """
-    try:
-        with sqlite3.connect(db_name) as conn:
-            cursor = conn.cursor()
-            if case_id:
-                cursor.execute(f"SELECT * FROM {table_name} WHERE outreach_agent_status = ?", (case_id,))
-            else:
-                cursor.execute(f"SELECT * FROM {table_name}")
-            rows = cursor.fetchall()
-            column_names = [description[0] for description in cursor.description]
-            row_data = [dict(zip(column_names, row)) for row in rows]
-            return row_data
-    except sqlite3.Error as e:
-        print(e)
-        return []
-
-# Load data from DB into a DataFrame
-data = retrieve_data_with_column_name()
-df = pd.DataFrame(data)
-
-# Convert KycRefresh_created_date to datetime and calculate case_sla_date
-df['KycRefresh_created_date'] = pd.to_datetime(df['KycRefresh_created_date'], errors='coerce')
-df['case_sla_date'] = df['KycRefresh_created_date'] + pd.Timedelta(days=90)
-
-# Add computed column for CASE STATUS
-df['case_status_display'] = df['refresh_status'].apply(
-    lambda x: "KYC status Refreshed" if str(x).lower() == "yes" else "Profile updates absorbed" if str(x).lower() == "no" else x
-)
-
-# Convert relevant columns to strings
-df['document_name'] = df['document_name'].astype(str)
-df['refresh_status'] = df['refresh_status'].astype(str)
-df['case_status_display'] = df['case_status_display'].astype(str)
-df['entity_legal_name'] = df['entity_legal_name'].astype(str)
-df['outreach_agent_status'] = df['outreach_agent_status'].astype(str)
 
-# Pagination settings
-ITEMS_PER_PAGE = 5
-current_page = 1
-total_pages = (len(df) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
-
-# Function to filter the DataFrame
-def filter_data(name_filter, change_filter, status_filter, case_id_filter, data_source_filter, creation_date_filter, sla_date_filter, complete_date_filter):
-    filtered_df = df.copy()
-    if name_filter:
-        filtered_df = filtered_df[filtered_df['entity_legal_name'].str.contains(name_filter, case=False, na=False)]
-    if change_filter:
-        filtered_df = filtered_df[filtered_df['refresh_status'].str.contains(change_filter, case=False, na=False)]
-    if status_filter:
-        filtered_df = filtered_df[filtered_df['case_status_display'].str.contains(status_filter, case=False, na=False)]
-    if case_id_filter:
-        filtered_df = filtered_df[filtered_df['outreach_agent_status'].str.contains(case_id_filter, case=False, na=False)]
-    if data_source_filter:
-        filtered_df = filtered_df[filtered_df['document_name'].str.contains(data_source_filter, case=False, na=False)]
-    if creation_date_filter:
-        try:
-            date_range = creation_date_filter.split(' to ')
-            if len(date_range) == 2:
-                start_date = pd.to_datetime(date_range[0].strip())
-                end_date = pd.to_datetime(date_range[1].strip())
-                filtered_df = filtered_df[
-                    (filtered_df['KycRefresh_created_date'] >= start_date) &
-                    (filtered_df['KycRefresh_created_date'] <= end_date)
-                ]
-        except (ValueError, TypeError):
-            ui.notify("Invalid CASE CREATION DATE range. Use format 'YYYY-MM-DD to YYYY-MM-DD'", type='error')
-            return pd.DataFrame()
-    if sla_date_filter:
+    def __init__(self):
+        self.current_page = 1
+        self.total_pages = 1
+        self.watermark = None
+        self.inputs = {}
+
+        # Filter inputs
+        with ui.row().classes('w-full gap-4'):
+            for name, (label, placeholder) in FILTER_INPUTS.items():
+                self.inputs[name] = ui.input(label=label, placeholder=placeholder).classes('flex-grow')
+
+        with ui.row().classes('w-full gap-4'):
+            for name, (label, placeholder) in DATE_FILTER_INPUTS.items():
+                self.inputs[name] = ui.input(label=label, placeholder=placeholder).classes('flex-grow')
+
+        # Filter and reset buttons
+        with ui.row().classes('w-full justify-center'):
+            ui.button('Apply Filters', on_click=lambda: self.update_table(1)).classes('w-40')
+            ui.button('Reset Filters', on_click=self.reset_filters).classes('w-40')
+
+        # Create the table
+        self.grid = ui.aggrid(
+            {
+                'columnDefs': COLUMN_DEFS,
+                'rowData': [],
+                'defaultColDef': {'sortable': True, 'filter': True, 'resizable': True},
+                # Rows are identified by id so pushed changes update them in place
+                ':getRowId': '(params) => String(params.data.id)',
+            },
+            theme='ag-theme-material'
+        ).classes('w-full h-64')
+
+        # Pagination controls
+        with ui.row().classes('w-full justify-center mt-4'):
+            self.prev_button = ui.button('Previous', on_click=lambda: self.update_table(self.current_page - 1)).classes('w-32')
+            self.pagination_label = ui.label(f"Page {self.current_page} of {self.total_pages}").classes('mx-4')
+            self.next_button = ui.button('Next', on_click=lambda: self.update_table(self.current_page + 1)).classes('w-32')
+
+    async def start(self):
+        # Initial table update, then live updates of the rows changed after it
+        self.watermark, _ = await database.run(feed.changes_since, None)
+        await self.update_table()
+        ui.timer(LIVE_UPDATE_INTERVAL, self.push_changes)
+
+    # Function to read the filter inputs
+    def current_filters(self):
+        return {name: field.value for name, field in self.inputs.items()}
+
+    async def reset_filters(self):
+        for field in self.inputs.values():
+            field.set_value('')
+        await self.update_table(1)
+
+    # Function to update the table with one page of filtered data, queried from the database
+    async def update_table(self, page=1):
         try:
-            date_range = sla_date_filter.split(' to ')
-            if len(date_range) == 2:
-                start_date = pd.to_datetime(date_range[0].strip())
-                end_date = pd.to_datetime(date_range[1].strip())
-                filtered_df = filtered_df[
-                    (filtered_df['case_sla_date'] >= start_date) &
-                    (filtered_df['case_sla_date'] <= end_date)
-                ]
-        except (ValueError, TypeError):
-            ui.notify("Invalid CASE SLA DATE range. Use format 'YYYY-MM-DD to YYYY-MM-DD'", type='error')
-            return pd.DataFrame()
-    if complete_date_filter:
+            rows, total_count = await database.run(page_cache.fetch_page, self.current_filters(), max(page, 1), ITEMS_PER_PAGE)
+        except ValueError as e:
+            ui.notify(str(e), type='error')
+            rows, total_count = [], 0
+        self.total_pages = max(1, (total_count + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE)
+        if page > self.total_pages:
+            # The page no longer exists, for example after a filter change or live update
+            return await self.update_table(self.total_pages)
+        self.current_page = max(page, 1)
+        self.grid.options['rowData'] = rows
+        self.grid.update()
+        self.update_pagination_controls()
+
+    # Function to set the page count from the number of matching rows
+    def set_total_pages(self, total_count):
+        self.total_pages = max(1, (total_count + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE)
+        self.update_pagination_controls()
+
+    # Function to push the rows changed since the last check to the grid, without reloading the table
+    async def push_changes(self):
+        self.watermark, changes = await database.run(feed.changes_since, self.watermark)
+        if changes is None:
+            await self.update_table(self.current_page)
+            return
+        if not changes:
+            return
+        filters = self.current_filters()
         try:
-            date_range = complete_date_filter.split(' to ')
-            if len(date_range) == 2:
-                start_date = pd.to_datetime(date_range[0].strip())
-                end_date = pd.to_datetime(date_range[1].strip())
-                filtered_df = filtered_df[
-                    (filtered_df['KycRefresh_updated_date'] >= start_date) &
-                    (filtered_df['KycRefresh_updated_date'] <= end_date)
-                ]
-        except (ValueError, TypeError):
-            ui.notify("Invalid CASE COMPLETE DATE range. Use format 'YYYY-MM-DD to YYYY-MM-DD'", type='error')
-            return pd.DataFrame()
-    return filtered_df
-
-# Function to paginate the filtered data
-def get_paginated_data(filtered_df, page):
-    start = (page - 1) * ITEMS_PER_PAGE
-    end = start + ITEMS_PER_PAGE
-    return filtered_df.iloc[start:end]
-
-# Function to update the table
-def update_table(page=1):
-    global current_page, total_pages
-    current_page = page
-    name_filter = name_input.value
-    change_filter = change_input.value
-    status_filter = status_input.value
-    case_id_filter = case_id_input.value
-    data_source_filter = data_source_input.value
-    creation_date_filter = creation_date_input.value
-    sla_date_filter = sla_date_input.value
-    complete_date_filter = complete_date_input.value
-    filtered_df = filter_data(name_filter, change_filter, status_filter, case_id_filter, data_source_filter, creation_date_filter, sla_date_filter, complete_date_filter)
-    total_pages = (len(filtered_df) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
-    if len(filtered_df) == 0:
-        total_pages = 1
-    paginated_df = get_paginated_data(filtered_df, current_page)
-    grid.options['rowData'] = paginated_df.to_dict(orient='records')
-    grid.update()
-    update_pagination_controls()
-
-# Function to update pagination controls
-def update_pagination_controls():
-    pagination_label.set_text(f"Page {current_page} of {total_pages}")
-    prev_button.props('disabled' if current_page == 1 else '')
-    next_button.props('disabled' if current_page == total_pages else '')
+            matching_ids = await database.run(dashboard_data.fetch_matching_ids, filters, [row['id'] for row in changes])
+        except ValueError:
+            # Invalid date filters are reported when they are applied
+            return
+        updated_rows, removed_ids, reload, recount = change_feed.plan_grid_update(
+            changes, matching_ids, self.grid.options['rowData'], ITEMS_PER_PAGE,
+            filtered=any(filters.values()), order_columns=dashboard_data.sort_columns(filters),
+        )
+        if reload:
+            await self.update_table(self.current_page)
+            return
+        if updated_rows:
+            updated = {row['id']: row for row in updated_rows}
+            self.grid.options['rowData'] = [updated.get(row['id'], row) for row in self.grid.options['rowData']]
+            self.grid.run_grid_method('applyTransaction', {'update': updated_rows})
+        if removed_ids:
+            removed = set(removed_ids)
+            self.grid.options['rowData'] = [row for row in self.grid.options['rowData'] if row['id'] not in removed]
+            self.grid.run_grid_method('applyTransaction', {'remove': [{'id': row_id} for row_id in removed_ids]})
+        if recount:
+            self.set_total_pages(await database.run(dashboard_data.fetch_dashboard_count, filters))
+
+    # Function to update pagination controls
+    def update_pagination_controls(self):
+        self.pagination_label.set_text(f"Page {self.current_page} of {self.total_pages}")
+        self.prev_button.props('disabled' if self.current_page == 1 else '')
+        self.next_button.props('disabled' if self.current_page == self.total_pages else '')
+
+# Prometheus scrape endpoint for the pipeline stage metrics
+@app.get('/metrics')
+async def metrics():
+    return PlainTextResponse(await database.run(dashboard_data.fetch_prometheus_metrics))
 
 # Main page UI
 @ui.page('/')
-def main_page():
+async def main_page():
     with ui.header():
         ui.label("Event driven KYC Review process : Intelligent Automation using AI agents").style("font-size: 2.0em; font-weight: bold")
         ui.space()
         ui.label("KYC Data with Column Filters").style("font-size: 1.2em;")
 
-    # Filter inputs
-    with ui.row().classes('w-full gap-4'):
-        global name_input, change_input, status_input, case_id_input, data_source_input
-        name_input = ui.input(label='CLIENT NAME Filter', placeholder='Enter client name').classes('flex-grow')
-        change_input = ui.input(label='MATERIAL CHANGE Filter', placeholder='Yes/No').classes('flex-grow')
-        status_input = ui.input(label='CASE STATUS Filter', placeholder='Enter status').classes('flex-grow')
-        case_id_input = ui.input(label='CASE ID Filter', placeholder='Enter case ID').classes('flex-grow')
-        data_source_input = ui.input(label='DATA SOURCE Filter', placeholder='Enter data source').classes('flex-grow')
-
-    with ui.row().classes('w-full gap-4'):
-        global creation_date_input, sla_date_input, complete_date_input
-        creation_date_input = ui.input(label='CASE CREATION DATE Filter', placeholder='YYYY-MM-DD to YYYY-MM-DD').classes('flex-grow')
-        sla_date_input = ui.input(label='CASE SLA DATE Filter', placeholder='YYYY-MM-DD to YYYY-MM-DD').classes('flex-grow')
-        complete_date_input = ui.input(label='CASE COMPLETE DATE Filter', placeholder='YYYY-MM-DD to YYYY-MM-DD').classes('flex-grow')
-
-    # Filter and reset buttons
-    with ui.row().classes('w-full justify-center'):
-        filter_button = ui.button('Apply Filters', on_click=lambda: update_table(1)).classes('w-40')
-        reset_button = ui.button('Reset Filters', on_click=lambda: [
-            name_input.set_value(''),
-            change_input.set_value(''),
-            status_input.set_value(''),
-            case_id_input.set_value(''),
-            data_source_input.set_value(''),
-            creation_date_input.set_value(''),
-            sla_date_input.set_value(''),
-            complete_date_input.set_value(''),
-            update_table(1)
-        ]).classes('w-40')
-
-    # Define table columns with clickable CLIENT NAME
-    column_defs = [
-        {
-            'headerName': 'CLIENT NAME',
-            'field': 'entity_legal_name',
-            'filter': 'agTextColumnFilter',
-            'cellRenderer': lambda params: f'<a href="/client/{params.data["outreach_agent_status"]}" target="_self">{params.value}</a>'
-        },
-        {'headerName': 'MATERIAL CHANGE', 'field': 'refresh_status', 'filter': 'agTextColumnFilter'},
-        {'headerName': 'CASE STATUS', 'field': 'case_status_display', 'filter': 'agTextColumnFilter'},
-        {'headerName': 'CASE ID', 'field': 'outreach_agent_status', 'filter': 'agTextColumnFilter'},
-        {'headerName': 'DATA SOURCE', 'field': 'document_name', 'filter': 'agTextColumnFilter'},
-        {'headerName': 'CASE CREATION DATE', 'field': 'KycRefresh_created_date', 'filter': 'agDateColumnFilter'},
-        {'headerName': 'CASE SLA DATE', 'field': 'case_sla_date', 'filter': 'agDateColumnFilter'},
-        {'headerName': 'CASE COMPLETE DATE', 'field': 'KycRefresh_updated_date', 'filter': 'agDateColumnFilter'},
-    ]
-
-    # Create the table
-    global grid
-    grid = ui.aggrid(
-        {
-            'columnDefs': column_defs,
-            'rowData': get_paginated_data(df, current_page).to_dict(orient='records'),
-            'defaultColDef': {'sortable': True, 'filter': True, 'resizable': True},
-        },
-        theme='ag-theme-material'
-    ).classes('w-full h-64')
-
-    # Pagination controls
-    with ui.row().classes('w-full justify-center mt-4'):
-        global prev_button, pagination_label, next_button
-        prev_button = ui.button('Previous', on_click=lambda: update_table(current_page - 1)).classes('w-32')
-        pagination_label = ui.label(f"Page {current_page} of {total_pages}").classes('mx-4')
-        next_button = ui.button('Next', on_click=lambda: update_table(current_page + 1)).classes('w-32')
-
-    # Initial table update
-    update_table()
+    # Filters, grid and pagination of this client
+    session = DashboardSession()
+
+    # Pipeline stage latency over the last 24 hours, slowest stage first
+    with ui.card().classes('w-full mt-4'):
+        ui.label('Pipeline Stage Latency (last 24 hours)').style('font-size: 1.2em; font-weight: bold')
+        latency_columns = [
+            {'name': 'stage', 'label': 'STAGE', 'field': 'stage', 'align': 'left'},
+            {'name': 'runs', 'label': 'RUNS', 'field': 'runs'},
+            {'name': 'failed', 'label': 'FAILED', 'field': 'failed'},
+            {'name': 'p50_seconds', 'label': 'P50 (s)', 'field': 'p50_seconds'},
+            {'name': 'p95_seconds', 'label': 'P95 (s)', 'field': 'p95_seconds'},
+            {'name': 'p95_queue_wait_seconds', 'label': 'P95 QUEUE WAIT (s)', 'field': 'p95_queue_wait_seconds'},
+            {'name': 'remote_share', 'label': 'REMOTE SHARE', 'field': 'remote_share'},
+            {'name': 'tokens', 'label': 'TOKENS', 'field': 'tokens'},
+        ]
+        ui.table(columns=latency_columns, rows=await database.run(dashboard_data.fetch_stage_latency), row_key='stage').classes('w-full')
+
+    await session.start()
 
 # Client details page
 @ui.page('/client/{case_id}')
-def client_details_page(case_id: str):
+async def client_details_page(case_id: str):
     # Fetch client data
-    client_data = retrieve_data_with_column_name(case_id)
-    if not client_data:
+    client = await database.run(dashboard_data.fetch_case, case_id)
+    if not client:
         ui.notify(f"No data found for Case ID: {case_id}", type='error')
         ui.navigate.to('/')
         return
 
-    client = client_data[0]  # Expecting one record
-
     # Header
     with ui.header():
         ui.label(f"Client Details: {client['entity_legal_name']}").style("font-size: 2.0em; font-weight: bold")
@@ -1,36 +1,94 @@
 import sqlite3
+import sys
+import time
 import pandas as pd
 from datetime import datetime
+from db_migrations import ONBOARDING_IDENTITY, ONBOARDING_IDENTITY_CONDITION, DuplicateRows, apply_migrations
 
-# Read CSV file
-df = pd.read_csv('Data/onboardingData.csv')  # Replace with your CSV file path
-
-# Add today's date for created and updated dates
-today = datetime.now().date()
-df['onboarding_created_date'] = today
-df['onboarding_updated_date'] = today
-
-# Connect to the database
-conn = sqlite3.connect('KYC_DataBase.db')
-cursor = conn.cursor()
-
-# Convert dataframe to list of tuples
-columns = df.columns.tolist()
-values = [tuple(row) for row in df.values]
-
-# Generate the INSERT statement
-placeholders = ','.join(['?' for _ in columns])
-columns_str = ','.join(columns)
-insert_query = f"INSERT INTO OnboardingData ({columns_str}) VALUES ({placeholders})"
-
-# Insert the data
-try:
-    cursor.executemany(insert_query, values)
-    conn.commit()
-    print(f"Successfully inserted {len(values)} records into OnboardingData table")
-except sqlite3.Error as e:
-    print(f"Error inserting data: {e}")
-finally:
-    conn.close()
-
-# Close the database connection
+csv_path = 'Data/onboardingData.csv'  # Replace with your CSV file path
+db_name = 'KYC_DataBase.db'
+
+# Number of CSV rows read and written per transaction
+CHUNK_SIZE = 50000
+
+# BOOLEAN columns of OnboardingData, stored as 1/0
+BOOLEAN_COLUMNS = ['client_regulated', 'is_payment_intermediary']
+BOOLEAN_VALUES = {'true': 1, 'false': 0}
+
+def build_upsert_query(columns):
+    """
+    Build an INSERT that updates the existing row when the client/member identity is already loaded,
+    so re-running the load does not duplicate records. Rows without a client_identifier have no
+    identity and are inserted every time.
+    """
+    placeholders = ','.join(['?' for _ in columns])
+    columns_str = ','.join(columns)
+    # Keep the original creation date of rows that are updated
+    updates = ','.join(f"{column}=excluded.{column}" for column in columns if column != 'onboarding_created_date')
+    return (
+        f"INSERT INTO OnboardingData ({columns_str}) VALUES ({placeholders}) "
+        f"ON CONFLICT({ONBOARDING_IDENTITY}) WHERE {ONBOARDING_IDENTITY_CONDITION} DO UPDATE SET {updates}"
+    )
+
+def load_onboarding_csv(csv_path=csv_path, db_path=db_name, chunk_size=CHUNK_SIZE):
+    """
+    Load the onboarding CSV into OnboardingData in fixed-size batches
+
+    Args:
+        csv_path: Path to the onboarding CSV file
+        db_path: SQLite database path
+        chunk_size: Number of rows per batch; each batch is written in its own transaction
+
+    Returns:
+        Number of rows written, or None when OnboardingData holds duplicate identities and the
+        identity index used by the upsert cannot be created
+    """
+    conn = sqlite3.connect(db_path)
+    # Bulk load settings: write-ahead log and fewer fsyncs
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    # Make sure the identity index used by the upsert exists
+    try:
+        apply_migrations(conn)
+    except DuplicateRows as e:
+        # The error names the duplicate rows and the remove-duplicates command (db_migrations.remove_duplicates)
+        print(f"Error preparing OnboardingData, no rows were loaded: {e}")
+        conn.close()
+        return None
+
+    # Add today's date for created and updated dates
+    today = datetime.now().date().isoformat()
+    total_rows = 0
+    start_time = time.perf_counter()
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size, dtype=str, keep_default_na=False):
+            chunk['onboarding_created_date'] = today
+            chunk['onboarding_updated_date'] = today
+            for column in BOOLEAN_COLUMNS:
+                if column in chunk:
+                    lowered = chunk[column].str.lower()
+                    chunk[column] = lowered.map(BOOLEAN_VALUES).where(lowered.isin(BOOLEAN_VALUES), chunk[column])
+            # Empty CSV fields are stored as NULL
+            chunk = chunk.astype(object).where(chunk != '', None)
+
+            insert_query = build_upsert_query(chunk.columns.tolist())
+            with conn:
+                conn.executemany(insert_query, chunk.itertuples(index=False, name=None))
+
+            total_rows += len(chunk)
+            elapsed = time.perf_counter() - start_time
+            print(f"Loaded {total_rows} rows ({total_rows / elapsed:.0f} rows/sec)")
+
+        elapsed = time.perf_counter() - start_time
+        rate = total_rows / elapsed if elapsed > 0 else 0.0
+        print(f"Successfully loaded {total_rows} records into OnboardingData table in {elapsed:.1f}s ({rate:.0f} rows/sec)")
+    except sqlite3.Error as e:
+        # Batches committed before the error are kept; re-running the load is safe
+        print(f"Error inserting data after {total_rows} rows: {e}")
+    finally:
+        conn.close()
+    return total_rows
+
+if __name__ == "__main__":
+    load_onboarding_csv(sys.argv[1] if len(sys.argv) > 1 else csv_path)
@@ -0,0 +1,275 @@
+import re
+import sqlite3
+from datetime import datetime
+
+from dashboard_data import db_name
+from db_migrations import PROFILE_FIELDS
+from name_screening import jaro_winkler, normalize_name
+
+# Fields compared with a type-specific normalization; other fields are compared as text
+DATE_FIELDS = {"date_of_incorporation", "date_of_id_issuance", "id_expiry_date", "date_of_birth"}
+PHONE_FIELDS = {"phone_number"}
+ADDRESS_FIELDS = {"dba_address", "address_line_1", "address_line_2"}
+PERCENTAGE_FIELDS = {"ownership_percentage"}
+BOOLEAN_FIELDS = {"client_regulated", "is_payment_intermediary"}
+NUMBER_FIELDS = {"number_of_employees", "number_of_branches"}
+NAME_FIELDS = {"entity_legal_name", "dba_name", "member_legal_name"}
+
+# Fields that can be matched against document keys
+MATCHED_FIELDS = PROFILE_FIELDS + ["member_legal_name", "member_first_name", "member_middle_name", "member_last_name"]
+
+# Document key labels that name a field differently, after key normalization
+KEY_ALIASES = {
+    "legal_name": "entity_legal_name",
+    "entity_name": "entity_legal_name",
+    "company_name": "entity_legal_name",
+    "registered_name": "entity_legal_name",
+    "name_of_entity": "entity_legal_name",
+    "incorporation_date": "date_of_incorporation",
+    "date_incorporated": "date_of_incorporation",
+    "doing_business_as": "dba_name",
+    "trading_name": "dba_name",
+    "dba": "dba_name",
+    "business_address": "dba_address",
+    "phone": "phone_number",
+    "telephone": "phone_number",
+    "telephone_number": "phone_number",
+    "tel": "phone_number",
+    "employees": "number_of_employees",
+    "branches": "number_of_branches",
+    "regulator": "name_of_regulator",
+    "regulated": "client_regulated",
+    "ownership": "ownership_percentage",
+    "ownership_interest": "ownership_percentage",
+    "percentage_owned": "ownership_percentage",
+    "address": "address_line_1",
+    "street_address": "address_line_1",
+    "country": "address_country",
+    "dob": "date_of_birth",
+    "birth_date": "date_of_birth",
+    "place_of_birth": "city_of_birth",
+    "citizenship": "country_of_citizenship",
+    "nationality": "country_of_citizenship",
+    "expiry_date": "id_expiry_date",
+    "date_of_expiry": "id_expiry_date",
+    "issue_date": "date_of_id_issuance",
+    "date_of_issue": "date_of_id_issuance",
+    "first_name": "member_first_name",
+    "given_name": "member_first_name",
+    "middle_name": "member_middle_name",
+    "last_name": "member_last_name",
+    "surname": "member_last_name",
+    "full_name": "member_legal_name",
+}
+
+# Accepted date formats; a value that parses to different dates (03/04/2020) is ambiguous
+DATE_FORMATS = [
+    "%Y-%m-%d", "%Y/%m/%d", "%Y%m%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%m-%d-%Y", "%d.%m.%Y",
+    "%d %B %Y", "%d %b %Y", "%B %d %Y", "%b %d %Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S",
+]
+
+# Address words written in full or abbreviated
+ADDRESS_ABBREVIATIONS = {
+    "street": "st", "avenue": "ave", "road": "rd", "boulevard": "blvd", "drive": "dr", "lane": "ln",
+    "court": "ct", "place": "pl", "square": "sq", "suite": "ste", "floor": "fl", "building": "bldg",
+    "apartment": "apt", "number": "no", "north": "n", "south": "s", "east": "e", "west": "w",
+}
+
+BOOLEAN_VALUES = {"true": True, "yes": True, "y": True, "1": True, "false": False, "no": False, "n": False, "0": False}
+
+# Minimum similarity of two different text values to be reported as ambiguous rather than a mismatch
+AMBIGUOUS_SIMILARITY = 0.9
+
+# Minimum number of digits two phone numbers must share at the end to match
+MIN_PHONE_DIGITS = 7
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+class Unparseable(ValueError):
+    """Raised when a value cannot be normalized for its field type."""
+
+
+def field_for_key(key):
+    """Returns the OnboardingData field a document key label refers to, or None."""
+    normalized = _NON_ALNUM.sub("_", str(key).casefold()).strip("_")
+    if normalized in MATCHED_FIELDS:
+        return normalized
+    return KEY_ALIASES.get(normalized)
+
+
+def _text(value):
+    return " ".join(_NON_ALNUM.split(str(value).casefold())).strip()
+
+
+def date_readings(value):
+    """Returns the set of ISO dates a value can be read as under DATE_FORMATS."""
+    text = " ".join(str(value).replace(",", " ").split())
+    dates = set()
+    for date_format in DATE_FORMATS:
+        try:
+            dates.add(datetime.strptime(text, date_format).date().isoformat())
+        except ValueError:
+            continue
+    return dates
+
+
+def normalize_date(value):
+    """Returns the ISO date of a value. Raises Unparseable when it matches no format or several different dates."""
+    dates = date_readings(value)
+    if len(dates) != 1:
+        raise Unparseable(f"{'Ambiguous' if dates else 'Unrecognized'} date '{value}'")
+    return dates.pop()
+
+
+def normalize_phone(value):
+    """Returns the digits of a phone number without international or trunk prefixes."""
+    digits = re.sub(r"\D", "", str(value)).lstrip("0")
+    if len(digits) < MIN_PHONE_DIGITS:
+        raise Unparseable(f"Unrecognized phone number '{value}'")
+    return digits
+
+
+def normalize_address(value):
+    return " ".join(ADDRESS_ABBREVIATIONS.get(token, token) for token in _text(value).split())
+
+
+def normalize_percentage(value):
+    """
+    Returns a percentage as a number between 0 and 100. Decimal fractions without a % sign (0.25, 1.0)
+    are scaled; whole numbers (1) are already percentages.
+    """
+    text = str(value).replace(",", ".")
+    number = _NUMBER.search(text)
+    if not number:
+        raise Unparseable(f"Unrecognized percentage '{value}'")
+    percentage = float(number.group())
+    if "%" not in text and "." in number.group() and 0 < percentage <= 1:
+        percentage *= 100
+    return round(percentage, 2)
+
+
+def normalize_boolean(value):
+    normalized = _text(value)
+    if normalized not in BOOLEAN_VALUES:
+        raise Unparseable(f"Unrecognized yes/no value '{value}'")
+    return BOOLEAN_VALUES[normalized]
+
+
+def normalize_number(value):
+    number = _NUMBER.search(str(value).replace(",", ""))
+    if not number:
+        raise Unparseable(f"Unrecognized number '{value}'")
+    return float(number.group())
+
+
+def normalize_field(field, value):
+    """Normalizes a field value for comparison according to the field type. Raises Unparseable."""
+    if field in DATE_FIELDS:
+        return normalize_date(value)
+    if field in PHONE_FIELDS:
+        return normalize_phone(value)
+    if field in ADDRESS_FIELDS:
+        return normalize_address(value)
+    if field in PERCENTAGE_FIELDS:
+        return normalize_percentage(value)
+    if field in BOOLEAN_FIELDS:
+        return normalize_boolean(value)
+    if field in NUMBER_FIELDS:
+        return normalize_number(value)
+    if field in NAME_FIELDS:
+        # Same normalization as name screening: legal form and word order do not matter
+        return " ".join(normalize_name(value))
+    return _text(value)
+
+
+def compare_field(field, document_value, database_value):
+    """
+    Compares a document value with the stored value of a field.
+
+    Returns:
+        Dictionary with field, document_value, database_value, status ('match', 'mismatch' or 'ambiguous')
+        and reason
+    """
+    result = {'field': field, 'document_value': document_value, 'database_value': database_value}
+    if database_value is None or str(database_value).strip() == "":
+        return dict(result, status='ambiguous', reason="No value on file")
+    try:
+        if field in DATE_FIELDS:
+            # A day/month order ambiguity in the document is resolved by the date on file
+            database_normalized = normalize_date(database_value)
+            readings = date_readings(document_value)
+            document_normalized = database_normalized if database_normalized in readings else normalize_date(document_value)
+        else:
+            document_normalized = normalize_field(field, document_value)
+            database_normalized = normalize_field(field, database_value)
+    except Unparseable as e:
+        return dict(result, status='ambiguous', reason=str(e))
+
+    if field in PHONE_FIELDS:
+        # Numbers written with and without the country code match on their common ending
+        shorter, longer = sorted((document_normalized, database_normalized), key=len)
+        matched = longer.endswith(shorter)
+    else:
+        matched = document_normalized == database_normalized
+    if matched:
+        return dict(result, status='match', reason=None)
+
+    if isinstance(document_normalized, str) and field not in PHONE_FIELDS and field not in DATE_FIELDS:
+        similarity = jaro_winkler(document_normalized, database_normalized)
+        if similarity >= AMBIGUOUS_SIMILARITY:
+            return dict(result, status='ambiguous', reason=f"Similar but not equal ({similarity:.2f})")
+    return dict(result, status='mismatch', reason=None)
+
+
+def match_extracted_data(key_value_pairs, record):
+    """
+    Compares the key-value pairs extracted from a document with an OnboardingData record.
+
+    Args:
+        key_value_pairs: List of {'key', 'value'} dictionaries, as in extract_data_from_pdf's key_value_pairs
+        record: OnboardingData row as a dictionary
+
+    Returns:
+        Report dictionary with 'onboarding_id', 'matches', 'mismatches' and 'ambiguous' (lists of compare_field
+        results) and 'unmapped' (the key-value pairs that do not name a field). Only 'ambiguous' and 'unmapped'
+        need review by the KYC Analyst.
+    """
+    report = {'onboarding_id': record.get('id'), 'matches': [], 'mismatches': [], 'ambiguous': [], 'unmapped': []}
+    lists = {'match': report['matches'], 'mismatch': report['mismatches'], 'ambiguous': report['ambiguous']}
+    for pair in key_value_pairs:
+        field = field_for_key(pair['key'])
+        if field is None:
+            report['unmapped'].append(pair)
+            continue
+        result = compare_field(field, pair['value'], record.get(field))
+        lists[result['status']].append(result)
+    return report
+
+
+def find_onboarding_records(conn, client_identifier):
+    """Returns the OnboardingData rows (entity and members) of a client as dictionaries."""
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    cursor.execute("SELECT * FROM OnboardingData WHERE client_identifier = ?", (client_identifier,))
+    return [dict(row) for row in cursor.fetchall()]
+
+
+def match_client_document(conn, client_identifier, key_value_pairs):
+    """
+    Matches a document's key-value pairs with the client's onboarding record it describes:
+    the entity or member row with the most matching and fewest mismatching fields.
+
+    Returns:
+        The match_extracted_data report with 'client_identifier' added, or None when the client is not on file
+    """
+    best = None
+    for record in find_onboarding_records(conn, client_identifier):
+        report = match_extracted_data(key_value_pairs, record)
+        rank = (len(report['matches']) - len(report['mismatches']), len(report['matches']))
+        if best is None or rank > best[0]:
+            best = (rank, report)
+    if best is None:
+        return None
+    return dict(best[1], client_identifier=client_identifier)
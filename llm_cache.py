@@ -0,0 +1,118 @@
+import hashlib
+import json
+import string
+import threading
+
+from lru_store import LRUStore
+
+# Default cache file, next to the KYC database
+DEFAULT_CACHE_PATH = "llm_cache.db"
+
+# Default size limit of the cache, in bytes of stored responses
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Default number of seconds a cached response is used before the prompt is sent again
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def normalize_inputs(value):
+    """Normalizes prompt inputs so formatting-only differences (whitespace, key order) give the same key."""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {str(key): normalize_inputs(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_inputs(item) for item in value]
+    return value
+
+
+def template_fields(template):
+    """Returns the names of the {placeholders} of a task description."""
+    return {field for _, field, _, _ in string.Formatter().parse(template) if field}
+
+
+def prompt_key(agent, description, inputs, model):
+    """Returns the cache key of a prompt: the SHA-256 of the agent, task description, normalized inputs and model."""
+    payload = json.dumps(
+        [agent, " ".join(description.split()), normalize_inputs(inputs), model], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Persistent LLM response cache stored in SQLite, with a time to live and a size-bounded LRU eviction.
+    Hit and miss counts of this process are kept in hits and misses.
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._store = LRUStore(
+            db_path, "LLMResponseCache", ["prompt_key"], max_bytes, ttl_seconds, label_columns=["agent", "model"]
+        )
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """Returns the cached response, or None on a miss or an expired entry. A hit refreshes the entry's LRU position."""
+        response = self._store.get((key,))
+        self._count(response is not None)
+        return response
+
+    def put(self, key, response, agent=None, model=None):
+        """Stores a JSON-serializable response and evicts least recently used entries until the cache fits in max_bytes."""
+        self._store.put((key,), response, agent=agent, model=model)
+
+    def get_or_call(self, agent, description, inputs, model, call, validate=None, key_inputs=None):
+        """
+        Returns the cached response of a prompt, or calls call() and caches its response.
+
+        Args:
+            agent: Agent role
+            description: Task description template
+            inputs: Values the description is formatted with; only the fields it uses are part of the key
+            model: LLM model name
+            call: Function sending the prompt to the LLM and returning the response
+            validate: Function returning whether a response is usable; other responses are returned but not cached
+            key_inputs: Further values of the key, such as the hash of a document the description only names
+        """
+        used_inputs = {field: inputs.get(field) for field in template_fields(description)}
+        used_inputs.update(key_inputs or {})
+        return self._get_or_call(prompt_key(agent, description, used_inputs, model), agent, model, call, validate)
+
+    def get_or_call_prompt(self, agent, prompt, model, call, validate=None):
+        """Same as get_or_call for a prompt that is already complete (no template fields)."""
+        return self._get_or_call(prompt_key(agent, prompt, {}, model), agent, model, call, validate)
+
+    def _get_or_call(self, key, agent, model, call, validate=None):
+        response = self._store.get((key,))
+        # A stored response the validator rejects (cached before it existed) is asked again, and counts as a miss
+        hit = response is not None and (validate is None or validate(response))
+        self._count(hit)
+        if hit:
+            return response
+        response = call()
+        if validate is None or validate(response):
+            self.put(key, response, agent, model)
+        return response
+
+    def stats(self):
+        """Returns the hit and miss counts of this process and the number and size of the stored entries."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            **self._store.stats(),
+        }
+
+    def clear(self):
+        self._store.clear()
@@ -0,0 +1,96 @@
+import json
+import sqlite3
+import time
+
+
+class LRUStore:
+    """
+    JSON values stored in one SQLite table, with an optional time to live and a size-bounded LRU eviction.
+    Used by the LLM response cache (llm_cache) and the analyze result cache (extraction_cache).
+    """
+
+    def __init__(self, db_path, table, key_columns, max_bytes, ttl_seconds=None, label_columns=()):
+        """
+        Args:
+            db_path: SQLite file of the store
+            table: Table of the store
+            key_columns: Columns of the entry key; get and put take one value per column
+            max_bytes: Size limit of the store, in bytes of stored JSON
+            ttl_seconds: Number of seconds an entry is used, or None to keep entries until they are evicted
+            label_columns: Informational columns put can set on an entry
+        """
+        self.db_path = db_path
+        self.table = table
+        self.key_columns = list(key_columns)
+        self.label_columns = list(label_columns)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._key_condition = " AND ".join(f"{column} = ?" for column in self.key_columns)
+        with self._connect() as conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {''.join(f'{column} TEXT NOT NULL, ' for column in self.key_columns)}
+                    {''.join(f'{column} TEXT, ' for column in self.label_columns)}
+                    payload TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY ({', '.join(self.key_columns)})
+                )
+            """)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table.lower()}_last_access ON {table} (last_access)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, key):
+        """Returns the stored value of a key tuple, or None if it is missing or expired. A hit refreshes the entry's LRU position."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT payload, created_at FROM {self.table} WHERE {self._key_condition}", key
+            ).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                conn.execute(f"DELETE FROM {self.table} WHERE {self._key_condition}", key)
+                row = None
+            if row is not None:
+                conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE {self._key_condition}", (now, *key))
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, key, value, **labels):
+        """Stores a JSON-serializable value and evicts least recently used entries until the store fits in max_bytes."""
+        data = json.dumps(value, default=str)
+        now = time.time()
+        columns = self.key_columns + self.label_columns + ["payload", "size", "created_at", "last_access"]
+        values = [*key, *(labels.get(column) for column in self.label_columns), data, len(data), now, now]
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                values,
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        if self.ttl_seconds is not None:
+            conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        cursor = conn.execute(f"SELECT {', '.join(self.key_columns)}, size FROM {self.table} ORDER BY last_access")
+        evicted = []
+        for *key, size in cursor:
+            if total <= self.max_bytes:
+                break
+            evicted.append(key)
+            total -= size
+        conn.executemany(f"DELETE FROM {self.table} WHERE {self._key_condition}", evicted)
+
+    def stats(self):
+        """Returns the number and size of the stored entries."""
+        with self._connect() as conn:
+            entries, size = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+        return {'entries': entries, 'bytes': size}
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute(f"DELETE FROM {self.table}")
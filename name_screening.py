@@ -0,0 +1,340 @@
+import csv
+import io
+import itertools
+import math
+import os
+import re
+import threading
+import unicodedata
+from array import array
+
+from extraction_cache import document_hash, file_hash
+
+SCREENING_LIST_PATH = "Data/screeningList.csv"
+
+# Default minimum score of a reported hit
+DEFAULT_MIN_SCORE = 0.85
+
+# Minimum Jaro-Winkler similarity for two name tokens to count as the same token
+TOKEN_THRESHOLD = 0.85
+
+# Legal form suffixes and other noise tokens removed before matching
+LEGAL_SUFFIXES = {
+    "ltd", "limited", "llc", "llp", "lp", "plc", "inc", "incorporated", "corp", "corporation",
+    "co", "company", "gmbh", "ag", "kg", "sa", "sas", "sarl", "srl", "spa", "bv", "nv", "oy", "ab",
+    "as", "pte", "pty", "kk", "the", "and", "of",
+}
+
+# Tokens up to this length only match exactly; one edit changes them too much
+MIN_FUZZY_LENGTH = 3
+
+# Query tokens whose vocabulary expansion is kept; the kept expansions start over when there are more
+MAX_CACHED_EXPANSIONS = 200_000
+
+# Names with more tokens than this take candidates from their rarest tokens instead of
+# from every combination of tokens that can reach the minimum score
+MAX_COMBINED_TOKENS = 8
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(name):
+    """
+    Normalizes a name for matching: strips diacritics, case and punctuation, drops legal
+    suffixes (LTD, LLC, GmbH, ...) and sorts the tokens so word order does not matter.
+
+    Returns:
+        Tuple of normalized tokens
+    """
+    if not name:
+        return ()
+    decomposed = unicodedata.normalize("NFKD", str(name).casefold())
+    # Dotted abbreviations such as G.m.b.H. or S.A. become single tokens
+    ascii_name = "".join(c for c in decomposed if not unicodedata.combining(c)).replace(".", "")
+    tokens = [token for token in _NON_ALNUM.split(ascii_name) if token and token not in LEGAL_SUFFIXES]
+    return tuple(sorted(tokens))
+
+
+def deletion_variants(token):
+    """
+    Returns the token and every string obtained by deleting one of its characters.
+    Two tokens share a variant when they differ by one substitution, insertion,
+    deletion or swap of adjacent characters (Jhon/John).
+    """
+    variants = {token}
+    if len(token) > MIN_FUZZY_LENGTH:
+        variants.update(token[:i] + token[i + 1:] for i in range(len(token)))
+    return variants
+
+
+def jaro_winkler(s1, s2, prefix_scale=0.1):
+    """Returns the Jaro-Winkler similarity of two strings, between 0 and 1."""
+    if s1 == s2:
+        return 1.0
+    len1, len2 = len(s1), len(s2)
+    if not len1 or not len2:
+        return 0.0
+    window = max(max(len1, len2) // 2 - 1, 0)
+    matched1 = [False] * len1
+    matched2 = [False] * len2
+    matches = 0
+    for i, c in enumerate(s1):
+        for j in range(max(0, i - window), min(i + window + 1, len2)):
+            if not matched2[j] and s2[j] == c:
+                matched1[i] = matched2[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+    transpositions = 0
+    k = 0
+    for i in range(len1):
+        if matched1[i]:
+            while not matched2[k]:
+                k += 1
+            if s1[i] != s2[k]:
+                transpositions += 1
+            k += 1
+    jaro = (matches / len1 + matches / len2 + (matches - transpositions / 2) / matches) / 3
+    prefix = 0
+    for a, b in zip(s1, s2):
+        if a != b or prefix == 4:
+            break
+        prefix += 1
+    return jaro + prefix * prefix_scale * (1 - jaro)
+
+
+class ScreeningIndex:
+    """
+    Fuzzy name screening index over a sanctions/PEP list.
+
+    Entries are indexed by normalized token (token -> entry ids). The token vocabulary is
+    itself indexed by single-character deletions, so a query token is expanded to the
+    vocabulary tokens within one edit without comparing it to every entry. Candidates are taken from the
+    rarest query tokens first and only as long as an entry could still reach the minimum
+    score, and only those candidates are scored.
+    """
+
+    def __init__(self, token_threshold=TOKEN_THRESHOLD):
+        self.token_threshold = token_threshold
+        # SHA-256 of the screening list file the index was built from, if any
+        self.version = None
+        self.entries = []
+        self._token_ids = {}
+        self._tokens = []
+        self._postings = []
+        self._variant_tokens = {}
+        self._expansions = {}
+        self._weights = {}
+
+    @classmethod
+    def from_csv(cls, path=SCREENING_LIST_PATH):
+        """Builds an index from a CSV file with entry_id, name and list_type columns. Its version is the file's SHA-256."""
+        with open(path, "rb") as f:
+            data = f.read()
+        index = cls()
+        for row in csv.DictReader(io.StringIO(data.decode("utf-8"), newline="")):
+            index.add(row["entry_id"], row["name"], row.get("list_type"))
+        # Hashed from the bytes indexed, so the version always describes the entries
+        index.version = document_hash(data)
+        return index
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, entry_id, name, list_type=None):
+        """Adds a screening list entry."""
+        tokens = normalize_name(name)
+        position = len(self.entries)
+        self.entries.append((entry_id, name, list_type, tokens))
+        for token in set(tokens):
+            token_id = self._token_ids.get(token)
+            if token_id is None:
+                token_id = len(self._tokens)
+                self._token_ids[token] = token_id
+                self._tokens.append(token)
+                self._postings.append(array("I"))
+                for variant in deletion_variants(token):
+                    self._variant_tokens.setdefault(variant, []).append(token_id)
+            self._postings[token_id].append(position)
+        # New entries invalidate the cached query token expansions and weights
+        self._expansions.clear()
+        self._weights.clear()
+
+    def _weight(self, document_frequency):
+        return math.log(1 + len(self.entries) / (1 + document_frequency))
+
+    def _token_weight(self, token_id):
+        weight = self._weights.get(token_id)
+        if weight is None:
+            weight = self._weights[token_id] = self._weight(len(self._postings[token_id]))
+        return weight
+
+    def _similar_tokens(self, token):
+        """Returns {vocabulary token id: similarity} for the vocabulary tokens similar to a query token."""
+        expansion = self._expansions.get(token)
+        if expansion is not None:
+            return expansion
+        if len(self._expansions) >= MAX_CACHED_EXPANSIONS:
+            self._expansions = {}
+        expansion = {}
+        exact = self._token_ids.get(token)
+        if exact is not None:
+            expansion[exact] = 1.0
+        candidates = set()
+        for variant in deletion_variants(token):
+            candidates.update(self._variant_tokens.get(variant, ()))
+        candidates.discard(exact)
+        for token_id in candidates:
+            similarity = jaro_winkler(token, self._tokens[token_id])
+            if similarity >= self.token_threshold:
+                expansion[token_id] = similarity
+        self._expansions[token] = expansion
+        return expansion
+
+    def _query_weights(self, query_tokens, expansions):
+        """Weights each query token by the inverse frequency of the entries it can match."""
+        weights = {}
+        for token in query_tokens:
+            frequency = sum(len(self._postings[token_id]) for token_id in expansions[token])
+            weights[token] = self._weight(frequency)
+        return weights
+
+    def _entries_matching(self, expansion):
+        entries = set()
+        for token_id in expansion:
+            entries.update(self._postings[token_id])
+        return entries
+
+    def _candidates(self, query_tokens, expansions, query_weights, min_score):
+        groups = sorted(((query_weights[token], expansions[token]) for token in query_tokens), key=lambda group: -group[0])
+
+        # The score averages both match directions, so a hit matches query tokens
+        # carrying at least this share of the query weight
+        total_weight = sum(weight for weight, _ in groups)
+        required_weight = max(2 * min_score - 1, 0) * total_weight
+
+        if len(groups) > MAX_COMBINED_TOKENS:
+            # Long names: entries that share none of the rarer tokens can no longer reach the minimum score
+            remaining_weight = total_weight
+            candidates = set()
+            for weight, expansion in groups:
+                if remaining_weight < required_weight:
+                    break
+                candidates |= self._entries_matching(expansion)
+                remaining_weight -= weight
+            return candidates
+
+        # Every hit matches all tokens of at least one minimal combination of query tokens
+        # reaching the required weight, so candidates are the entries matching such a combination
+        matching = [None] * len(groups)
+        candidates = set()
+        for size in range(1, len(groups) + 1):
+            for combination in itertools.combinations(range(len(groups)), size):
+                weights = [groups[i][0] for i in combination]
+                if sum(weights) < required_weight or (size > 1 and sum(weights) - min(weights) >= required_weight):
+                    continue
+                entries = None
+                for i in combination:
+                    if matching[i] is None:
+                        matching[i] = self._entries_matching(groups[i][1])
+                    entries = matching[i] if entries is None else entries & matching[i]
+                candidates |= entries
+        return candidates
+
+    def _score(self, query_tokens, expansions, query_weights, entry_tokens):
+        # Query -> entry: each query token's best similarity to an entry token
+        query_weight = 0.0
+        query_matched = 0.0
+        entry_similarity = {}
+        for token in query_tokens:
+            expansion = expansions[token]
+            weight = query_weights[token]
+            best = 0.0
+            for entry_token in entry_tokens:
+                similarity = expansion.get(self._token_ids[entry_token], 0.0)
+                if similarity > best:
+                    best = similarity
+                if similarity > entry_similarity.get(entry_token, 0.0):
+                    entry_similarity[entry_token] = similarity
+            query_weight += weight
+            query_matched += weight * best
+        # Entry -> query: penalizes entries with extra unmatched tokens
+        entry_weight = 0.0
+        entry_matched = 0.0
+        for entry_token in entry_tokens:
+            weight = self._token_weight(self._token_ids[entry_token])
+            entry_weight += weight
+            entry_matched += weight * entry_similarity.get(entry_token, 0.0)
+        if not query_weight or not entry_weight:
+            return 0.0
+        return (query_matched / query_weight + entry_matched / entry_weight) / 2
+
+    def search(self, name, min_score=DEFAULT_MIN_SCORE, limit=10):
+        """
+        Screens one name against the list.
+
+        Returns:
+            List of hit dictionaries (entry_id, name, list_type, score), best first
+        """
+        query_tokens = normalize_name(name)
+        if not query_tokens or not self.entries:
+            return []
+        expansions = {token: self._similar_tokens(token) for token in query_tokens}
+        query_weights = self._query_weights(query_tokens, expansions)
+        hits = []
+        for position in self._candidates(query_tokens, expansions, query_weights, min_score):
+            entry_id, entry_name, list_type, entry_tokens = self.entries[position]
+            score = self._score(query_tokens, expansions, query_weights, entry_tokens)
+            if score >= min_score:
+                hits.append({'entry_id': entry_id, 'name': entry_name, 'list_type': list_type, 'score': round(score, 4)})
+        hits.sort(key=lambda hit: hit['score'], reverse=True)
+        return hits[:limit]
+
+
+def screening_names(record):
+    """Returns the (field, name) pairs of a KycRefreshData/OnboardingData record that are screened."""
+    names = []
+    for field in ("entity_legal_name", "member_legal_name"):
+        if record.get(field):
+            names.append((field, record[field]))
+    full_name = " ".join(
+        record[field] for field in ("member_first_name", "member_middle_name", "member_last_name") if record.get(field)
+    )
+    if full_name:
+        names.append(("member_name", full_name))
+    return names
+
+
+def screen_record(index, record, min_score=DEFAULT_MIN_SCORE):
+    """Screens the entity and member names of a record. Returns the hits, each tagged with the screened field."""
+    hits = []
+    for field, name in screening_names(record):
+        for hit in index.search(name, min_score):
+            hits.append(dict(hit, field=field, screened_name=name))
+    return hits
+
+
+# Screening indexes of this process: list path -> (file size and modification time, index)
+_screening_indexes = {}
+_screening_index_lock = threading.Lock()
+
+
+def get_screening_index(path=SCREENING_LIST_PATH):
+    """
+    Returns the screening index of a list file, loading the list on first use and again when its content changes.
+    An index is kept per path and per content: a file whose size or modification time changed is hashed
+    again and reloaded only if its SHA-256 differs from the version of the kept index.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    with _screening_index_lock:
+        cached = _screening_indexes.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        index = cached[1] if cached is not None else None
+        if index is None or index.version != file_hash(path):
+            index = ScreeningIndex.from_csv(path)
+        _screening_indexes[path] = (signature, index)
+        return index
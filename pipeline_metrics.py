@@ -0,0 +1,175 @@
+import contextvars
+import math
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import dashboard_data
+
+# Upper bounds (seconds) of the Prometheus stage latency histogram buckets
+LATENCY_BUCKETS = [0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600]
+
+# Default window of the dashboard latency percentiles, in seconds
+PERCENTILE_WINDOW_SECONDS = 24 * 3600
+
+# Measured quantities of a stage run, stored as StageMetrics columns
+MEASURES = ["wall_seconds", "queue_wait_seconds", "remote_seconds", "prompt_tokens", "completion_tokens", "bytes_processed"]
+
+INSERT_METRIC_QUERY = (
+    f"INSERT INTO StageMetrics (case_id, stage, status, {', '.join(MEASURES)}, recorded_at) "
+    f"VALUES (?, ?, ?, {', '.join('?' for _ in MEASURES)}, ?)"
+)
+
+# Stage run being measured in the current context; asyncio.to_thread copies it into the stage's thread
+_current_span = contextvars.ContextVar("pipeline_metrics_span", default=None)
+
+
+class StageSpan:
+    """Measurements of one stage run of one case."""
+
+    def __init__(self, stage, case_id, queue_wait_seconds=0.0):
+        self.stage = stage
+        self.case_id = case_id
+        self.status = 'completed'
+        self.wall_seconds = 0.0
+        self.queue_wait_seconds = queue_wait_seconds
+        self.remote_seconds = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.bytes_processed = 0
+        self._lock = threading.Lock()
+
+    def add(self, **measures):
+        with self._lock:
+            for name, value in measures.items():
+                setattr(self, name, getattr(self, name) + (value or 0))
+
+
+def add(**measures):
+    """
+    Adds to the measures (remote_seconds, prompt_tokens, completion_tokens, bytes_processed) of the stage
+    run in progress. Does nothing outside a measured stage, so instrumented code also runs on its own.
+    """
+    span = _current_span.get()
+    if span is not None:
+        span.add(**measures)
+
+
+@contextmanager
+def remote_call():
+    """Adds the time spent in the block (an OCR poll, an LLM call) to the remote time of the current stage."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(remote_seconds=time.perf_counter() - start_time)
+
+
+class MetricsRecorder:
+    """Records stage runs in the StageMetrics table (see db_migrations)."""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or dashboard_data.db_name
+
+    @contextmanager
+    def span(self, stage, case_id, queue_wait_seconds=0.0):
+        """Measures the wall time of the block as one run of a stage and records it, failed if the block raises."""
+        span = StageSpan(stage, case_id, queue_wait_seconds)
+        token = _current_span.set(span)
+        start_time = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.status = 'failed'
+            raise
+        finally:
+            span.wall_seconds = time.perf_counter() - start_time
+            _current_span.reset(token)
+            self.record(span)
+
+    def record(self, span):
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.execute(
+                INSERT_METRIC_QUERY,
+                [span.case_id, span.stage, span.status] + [getattr(span, name) for name in MEASURES] + [time.time()],
+            )
+
+
+def _percentile(sorted_values, fraction):
+    # Nearest-rank percentile
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def stage_latency_summary(conn, window_seconds=PERCENTILE_WINDOW_SECONDS):
+    """
+    Summarizes the stage runs recorded in the last window_seconds.
+
+    Returns:
+        List of dictionaries (stage, runs, failed, p50_seconds, p95_seconds, p95_queue_wait_seconds,
+        remote_share, tokens), slowest p95 first
+    """
+    rows = conn.execute(
+        "SELECT stage, status, wall_seconds, queue_wait_seconds, remote_seconds, prompt_tokens + completion_tokens "
+        "FROM StageMetrics WHERE recorded_at >= ?",
+        (time.time() - window_seconds,),
+    ).fetchall()
+    stages = {}
+    for stage, status, wall, queue_wait, remote, tokens in rows:
+        stages.setdefault(stage, []).append((status, wall or 0.0, queue_wait or 0.0, remote or 0.0, tokens or 0))
+    summary = []
+    for stage, runs in stages.items():
+        walls = sorted(run[1] for run in runs)
+        waits = sorted(run[2] for run in runs)
+        total_wall = sum(walls)
+        summary.append({
+            'stage': stage,
+            'runs': len(runs),
+            'failed': sum(1 for run in runs if run[0] == 'failed'),
+            'p50_seconds': round(_percentile(walls, 0.50), 3),
+            'p95_seconds': round(_percentile(walls, 0.95), 3),
+            'p95_queue_wait_seconds': round(_percentile(waits, 0.95), 3),
+            'remote_share': round(sum(run[3] for run in runs) / total_wall, 3) if total_wall else 0.0,
+            'tokens': sum(run[4] for run in runs),
+        })
+    summary.sort(key=lambda row: row['p95_seconds'], reverse=True)
+    return summary
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def prometheus_text(conn):
+    """Returns the recorded stage metrics in the Prometheus text exposition format."""
+    bucket_columns = ", ".join(f"SUM(wall_seconds <= {bound})" for bound in LATENCY_BUCKETS)
+    rows = conn.execute(
+        f"SELECT stage, status, COUNT(*), SUM(wall_seconds), SUM(queue_wait_seconds), SUM(remote_seconds), "
+        f"SUM(prompt_tokens), SUM(completion_tokens), SUM(bytes_processed), {bucket_columns} "
+        f"FROM StageMetrics GROUP BY stage, status"
+    ).fetchall()
+
+    lines = [
+        "# HELP kyc_stage_duration_seconds Wall time of crew stage runs",
+        "# TYPE kyc_stage_duration_seconds histogram",
+    ]
+    for stage, status, count, wall_seconds, *measures in rows:
+        for bound, bucket_count in zip(LATENCY_BUCKETS, measures[5:]):
+            lines.append(f"kyc_stage_duration_seconds_bucket{_labels(stage=stage, status=status, le=bound)} {bucket_count}")
+        lines.append(f"kyc_stage_duration_seconds_bucket{_labels(stage=stage, status=status, le='+Inf')} {count}")
+        lines.append(f"kyc_stage_duration_seconds_sum{_labels(stage=stage, status=status)} {wall_seconds or 0}")
+        lines.append(f"kyc_stage_duration_seconds_count{_labels(stage=stage, status=status)} {count}")
+
+    counters = [
+        ("kyc_stage_queue_wait_seconds_total", "Time stage runs waited for a concurrency slot"),
+        ("kyc_stage_remote_seconds_total", "Time spent in remote calls (OCR, LLM)"),
+        ("kyc_stage_prompt_tokens_total", "LLM prompt tokens"),
+        ("kyc_stage_completion_tokens_total", "LLM completion tokens"),
+        ("kyc_stage_bytes_processed_total", "Document bytes processed"),
+    ]
+    for position, (name, help_text) in enumerate(counters):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for stage, status, *measures in rows:
+            lines.append(f"{name}{_labels(stage=stage, status=status)} {measures[position + 2] or 0}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,123 @@
+import hashlib
+import sqlite3
+import sys
+
+from dashboard_data import db_name
+from db_migrations import IDENTITY_COLUMNS, PROFILE_FIELDS, apply_migrations
+
+# Separator between field values in the fingerprint input; cannot appear in CSV or OCR text
+FIELD_SEPARATOR = "\x1f"
+
+
+def normalize_value(value):
+    """Normalizes a field value for comparison: NULL and blanks are equal and whitespace runs are collapsed."""
+    if value is None:
+        return ""
+    return " ".join(str(value).split())
+
+
+def fingerprint(*values):
+    """Returns the SHA-256 fingerprint of a row's normalized profile field values."""
+    joined = FIELD_SEPARATOR.join(normalize_value(value) for value in values)
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+
+def register_fingerprint_function(conn):
+    conn.create_function("kyc_fingerprint", -1, fingerprint, deterministic=True)
+
+
+def refresh_fingerprints(conn, table):
+    """
+    Computes the fingerprint of every row of the table that does not have one yet.
+    New rows have none and the db_migrations triggers clear it when a profile field changes.
+
+    Returns:
+        Number of rows fingerprinted
+    """
+    register_fingerprint_function(conn)
+    with conn:
+        cursor = conn.execute(
+            f"UPDATE {table} SET row_fingerprint = kyc_fingerprint({', '.join(PROFILE_FIELDS)}) "
+            "WHERE row_fingerprint IS NULL"
+        )
+    return cursor.rowcount
+
+
+def _identity_join(left, right):
+    conditions = [f"{left}.{IDENTITY_COLUMNS[0]} = {right}.{IDENTITY_COLUMNS[0]}"]
+    conditions += [f"IFNULL({left}.{column}, '') = IFNULL({right}.{column}, '')" for column in IDENTITY_COLUMNS[1:]]
+    return " AND ".join(conditions)
+
+
+def _field_diff(old_row, new_row):
+    diff = {}
+    for field in PROFILE_FIELDS:
+        old_value = old_row[field] if old_row is not None else None
+        new_value = new_row[field] if new_row is not None else None
+        if normalize_value(old_value) != normalize_value(new_value):
+            diff[field] = (old_value, new_value)
+    return diff
+
+
+def detect_changes(conn):
+    """
+    Compares KycRefreshData with OnboardingData row by row using the stored fingerprints.
+
+    Only rows whose fingerprints differ are read in full, so the cost of a nightly run
+    grows with the number of changed profiles rather than the size of the book.
+
+    Returns:
+        Dictionary of client_identifier -> list of changes. Each change is a dictionary with
+        'member' (the identity column values), 'change' ('added', 'removed' or 'changed')
+        and 'fields' (field name -> (onboarding value, refresh value)).
+    """
+    refresh_fingerprints(conn, "OnboardingData")
+    refresh_fingerprints(conn, "KycRefreshData")
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+
+    changes = {}
+
+    def record(change, old_row, new_row):
+        row = new_row if new_row is not None else old_row
+        changes.setdefault(row["client_identifier"], []).append({
+            'member': {column: row[column] for column in IDENTITY_COLUMNS},
+            'change': change,
+            'fields': _field_diff(old_row, new_row),
+        })
+
+    # Refresh rows that are new or whose profile fields changed
+    columns = ", ".join(IDENTITY_COLUMNS + PROFILE_FIELDS)
+    candidates = conn.execute(
+        f"SELECT r.id AS refresh_id, o.id AS onboarding_id FROM KycRefreshData r "
+        f"LEFT JOIN OnboardingData o ON {_identity_join('o', 'r')} "
+        f"WHERE o.id IS NULL OR o.row_fingerprint IS NOT r.row_fingerprint"
+    ).fetchall()
+    for refresh_id, onboarding_id in candidates:
+        new_row = cursor.execute(f"SELECT {columns} FROM KycRefreshData WHERE id = ?", (refresh_id,)).fetchone()
+        if onboarding_id is None:
+            record('added', None, new_row)
+        else:
+            old_row = cursor.execute(f"SELECT {columns} FROM OnboardingData WHERE id = ?", (onboarding_id,)).fetchone()
+            record('changed', old_row, new_row)
+
+    # Onboarded members that are missing from a client's refresh
+    cursor.execute(
+        f"SELECT {', '.join('o.' + c for c in IDENTITY_COLUMNS + PROFILE_FIELDS)} FROM OnboardingData o "
+        f"WHERE o.client_identifier IN (SELECT client_identifier FROM KycRefreshData) "
+        f"AND NOT EXISTS (SELECT 1 FROM KycRefreshData r WHERE {_identity_join('r', 'o')})"
+    )
+    for old_row in cursor.fetchall():
+        record('removed', old_row, None)
+
+    return changes
+
+
+if __name__ == "__main__":
+    with sqlite3.connect(sys.argv[1] if len(sys.argv) > 1 else db_name) as conn:
+        apply_migrations(conn)
+        changed_clients = detect_changes(conn)
+    print(f"{len(changed_clients)} client(s) with material changes")
+    for client_identifier, client_changes in changed_clients.items():
+        for change in client_changes:
+            print(f"  {client_identifier} {change['change']}: {', '.join(change['fields'])}")
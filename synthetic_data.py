@@ -0,0 +1,377 @@
+"""
+Generates a synthetic KYC dataset for benchmarks: an onboarding CSV, the matching KycRefreshData rows,
+a screening list and, for a sample of clients, fake client documents with their OCR key-value pairs.
+
+Each client has an entity row and up to three member rows (individual or corporate owners, directors).
+The refresh rows repeat the onboarding rows, with changed profile fields for a share of the clients,
+and the documents describe the refreshed profile in the labels and formats clients actually use,
+so matching finds both matches and mismatches. A share of the client names is planted, perturbed,
+in the screening list so screening finds hits.
+
+Usage: python synthetic_data.py [rows] [output folder]
+"""
+import csv
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+from benchmark_screening import COMPANY_WORDS, LEGAL_FORMS, perturb, random_name, random_word
+
+# Dataset sizes by name
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+# Share of clients whose refresh rows differ from their onboarding rows
+CHANGE_RATE = 0.1
+
+# Share of clients whose name is planted in the screening list
+PLANTED_HIT_RATE = 0.01
+
+# Number of screening list entries that are not client names
+SCREENING_LIST_SIZE = 50_000
+
+# Number of clients with a generated document
+DOCUMENT_COUNT = 200
+
+# Rows per executemany batch when writing KycRefreshData
+WRITE_CHUNK_SIZE = 50_000
+
+# Average number of rows per client (entity row plus members), used to spread the document sample
+ROWS_PER_CLIENT = 2.5
+
+# Fixed date the generated dates are relative to, so a seed always gives the same dataset
+REFERENCE_DATE = date(2025, 6, 30)
+
+ONBOARDING_COLUMNS = [
+    "document_name", "document_type", "client_identifier", "entity_legal_name", "date_of_incorporation",
+    "dba_name", "dba_address", "phone_number", "number_of_employees", "number_of_branches", "client_regulated",
+    "name_of_regulator", "id_number", "country_issuing_id", "id_type", "date_of_id_issuance",
+    "is_payment_intermediary", "member_type", "member_association", "member_role", "member_legal_name",
+    "member_first_name", "member_middle_name", "member_last_name", "ownership_percentage",
+    "identification_number", "issuing_country", "id_expiry_date", "identification_type", "address_line_1",
+    "address_line_2", "address_country", "date_of_birth", "country_of_citizenship", "city_of_birth",
+    "country_of_birth",
+]
+
+REFRESH_COLUMNS = ONBOARDING_COLUMNS + [
+    "KycRefresh_created_date", "KycRefresh_updated_date", "screening_agent_status", "outreach_agent_status",
+    "research_agent_status", "analyst_agent_status", "refresh_status", "risk_tier",
+]
+
+BOOLEAN_COLUMNS = ["client_regulated", "is_payment_intermediary"]
+
+COUNTRIES = {
+    "United Kingdom": ("+44", ["London", "Manchester", "Leeds"]),
+    "United States": ("+1", ["New York", "Chicago", "Houston"]),
+    "Germany": ("+49", ["Berlin", "Hamburg", "Munich"]),
+    "Singapore": ("+65", ["Singapore"]),
+    "Switzerland": ("+41", ["Zurich", "Geneva", "Basel"]),
+    "United Arab Emirates": ("+971", ["Dubai", "Abu Dhabi"]),
+}
+REGULATORS = ["FCA", "SEC", "BaFin", "MAS", "FINMA", "DFSA"]
+STREET_TYPES = ["Street", "Avenue", "Road", "Lane", "Boulevard"]
+DOCUMENT_TYPES = ["Certificate of Incorporation", "Annual Report", "Register of Members", "KYC Questionnaire"]
+ENTITY_ID_TYPES = ["Registration Number", "LEI", "Tax ID"]
+MEMBER_ID_TYPES = ["Passport", "National ID"]
+MEMBER_ASSOCIATIONS = [("UBO", "Beneficial Owner"), ("Director", "Director"), ("Shareholder", "Shareholder")]
+REFRESH_STATUSES = ["Yes", "No", None]
+RISK_TIERS = ["high", "medium", "medium", "medium", "low"]
+
+# Document labels of the fields a client document states, as clients write them (see kyc_matcher.KEY_ALIASES)
+ENTITY_DOCUMENT_LABELS = [
+    ("Entity Name", "entity_legal_name"),
+    ("Date of Incorporation", "date_of_incorporation"),
+    ("Trading Name", "dba_name"),
+    ("Business Address", "dba_address"),
+    ("Telephone", "phone_number"),
+    ("Employees", "number_of_employees"),
+    ("Branches", "number_of_branches"),
+    ("Regulated", "client_regulated"),
+    ("Regulator", "name_of_regulator"),
+]
+MEMBER_DOCUMENT_LABELS = [
+    ("Full Name", "member_legal_name"),
+    ("Date of Birth", "date_of_birth"),
+    ("Nationality", "country_of_citizenship"),
+    ("Ownership", "ownership_percentage"),
+    ("Address", "address_line_1"),
+]
+
+
+def random_date(rng, start_year, end_year):
+    start = date(start_year, 1, 1)
+    return start + timedelta(days=rng.randrange((date(end_year, 12, 31) - start).days))
+
+
+def random_address(rng, country):
+    street = f"{rng.randint(1, 400)} {random_word(rng, 2, 3)} {rng.choice(STREET_TYPES)}"
+    return street, f"{rng.choice(COUNTRIES[country][1])}, {country}"
+
+
+def random_phone(rng, country):
+    return f"{COUNTRIES[country][0]} {rng.randint(100, 999)} {rng.randint(1000000, 9999999)}"
+
+
+def entity_row(rng, client_number):
+    """Returns the onboarding row of a client's entity."""
+    country = rng.choice(list(COUNTRIES))
+    street, city = random_address(rng, country)
+    regulated = rng.random() < 0.3
+    client_identifier = f"C{client_number:08d}"
+    document_type = rng.choice(DOCUMENT_TYPES)
+    return {
+        "document_name": f"{client_identifier}_{document_type.replace(' ', '_')}.pdf",
+        "document_type": document_type,
+        "client_identifier": client_identifier,
+        "entity_legal_name": f"{random_word(rng)} {rng.choice(COMPANY_WORDS)} {rng.choice(LEGAL_FORMS)}",
+        "date_of_incorporation": random_date(rng, 1950, 2022).isoformat(),
+        "dba_name": f"{random_word(rng)} {rng.choice(COMPANY_WORDS)}" if rng.random() < 0.4 else None,
+        "dba_address": f"{street}, {city}",
+        "phone_number": random_phone(rng, country),
+        "number_of_employees": str(rng.randint(1, 20000)),
+        "number_of_branches": str(rng.randint(1, 200)),
+        "client_regulated": regulated,
+        "name_of_regulator": rng.choice(REGULATORS) if regulated else None,
+        "id_number": f"{rng.randint(10000000, 99999999)}",
+        "country_issuing_id": country,
+        "id_type": rng.choice(ENTITY_ID_TYPES),
+        "date_of_id_issuance": random_date(rng, 2000, 2024).isoformat(),
+        "is_payment_intermediary": rng.random() < 0.1,
+        "address_line_1": street,
+        "address_line_2": city,
+        "address_country": country,
+    }
+
+
+def member_row(rng, entity):
+    """Returns the onboarding row of one member (owner or director) of a client."""
+    row = {column: entity[column] for column in ONBOARDING_COLUMNS[:17]}
+    country = rng.choice(list(COUNTRIES))
+    street, city = random_address(rng, country)
+    association, role = rng.choice(MEMBER_ASSOCIATIONS)
+    row.update({
+        "member_association": association,
+        "member_role": role,
+        "ownership_percentage": f"{rng.choice([10, 15, 20, 25, 30, 40, 50, 75, 100])}%" if association != "Director" else None,
+        "address_line_1": street,
+        "address_line_2": city,
+        "address_country": country,
+    })
+    if rng.random() < 0.8:
+        first_name, last_name = random_word(rng), random_word(rng)
+        middle_name = random_word(rng) if rng.random() < 0.3 else None
+        row.update({
+            "member_type": "Individual",
+            "member_legal_name": " ".join(name for name in (first_name, middle_name, last_name) if name),
+            "member_first_name": first_name,
+            "member_middle_name": middle_name,
+            "member_last_name": last_name,
+            "identification_number": f"{rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ')}{rng.randint(1000000, 9999999)}",
+            "issuing_country": country,
+            "id_expiry_date": random_date(rng, 2025, 2035).isoformat(),
+            "identification_type": rng.choice(MEMBER_ID_TYPES),
+            "date_of_birth": random_date(rng, 1940, 2000).isoformat(),
+            "country_of_citizenship": country,
+            "city_of_birth": rng.choice(COUNTRIES[country][1]),
+            "country_of_birth": country,
+        })
+    else:
+        row.update({
+            "member_type": "Entity",
+            "member_legal_name": f"{random_word(rng)} {rng.choice(COMPANY_WORDS)} {rng.choice(LEGAL_FORMS)}",
+        })
+    return row
+
+
+def client_rows(rng, client_number):
+    """Returns the onboarding rows of a client: the entity row followed by its members."""
+    entity = entity_row(rng, client_number)
+    return [entity] + [member_row(rng, entity) for _ in range(rng.choice([0, 1, 1, 2, 2, 3]))]
+
+
+def refreshed_rows(rng, rows):
+    """
+    Returns the refresh rows of a client: its onboarding rows, with an updated address, phone number
+    and headcount for CHANGE_RATE of the clients, plus the case fields shown on the dashboard.
+    """
+    rows = [dict(row) for row in rows]
+    if rng.random() < CHANGE_RATE:
+        country = rows[0]["address_country"]
+        street, city = random_address(rng, country)
+        phone_number = random_phone(rng, country)
+        number_of_employees = str(rng.randint(1, 20000))
+        for row in rows:
+            row.update(dba_address=f"{street}, {city}", phone_number=phone_number, number_of_employees=number_of_employees)
+        rows[0].update(address_line_1=street, address_line_2=city)
+
+    created = REFERENCE_DATE - timedelta(days=rng.randrange(365))
+    refresh_status = rng.choice(REFRESH_STATUSES)
+    done = "completed" if refresh_status else None
+    case_fields = {
+        "KycRefresh_created_date": created.isoformat(),
+        "KycRefresh_updated_date": (created + timedelta(days=rng.randrange(120))).isoformat() if refresh_status else None,
+        "screening_agent_status": done,
+        "outreach_agent_status": f"CASE-{rows[0]['client_identifier'][1:]}",
+        "research_agent_status": done,
+        "analyst_agent_status": done,
+        "refresh_status": refresh_status,
+        "risk_tier": rng.choice(RISK_TIERS),
+    }
+    for row in rows:
+        row.update(case_fields)
+    return rows
+
+
+def document_key_values(rows):
+    """
+    Returns the key-value pairs a client document states about the client (the OCR result of the document),
+    with dates, booleans and percentages written the way documents write them.
+    """
+    labelled = [(label, field, rows[0]) for label, field in ENTITY_DOCUMENT_LABELS]
+    member = next((row for row in rows[1:] if row.get("member_type") == "Individual"), None)
+    if member is not None:
+        labelled += [(label, field, member) for label, field in MEMBER_DOCUMENT_LABELS]
+
+    pairs = []
+    for label, field, row in labelled:
+        value = row.get(field)
+        if value is None:
+            continue
+        if field in ("date_of_incorporation", "date_of_birth"):
+            value = date.fromisoformat(value).strftime("%d %B %Y")
+        elif isinstance(value, bool):
+            value = "Yes" if value else "No"
+        elif field == "ownership_percentage":
+            value = value.replace("%", " percent")
+        pairs.append({"key": label, "value": value})
+    return pairs
+
+
+def write_document(path, key_value_pairs):
+    """Writes a PDF-like document stating the key-value pairs, one 'Key: Value' line each (see fake_document_client)."""
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.7\n")
+        for pair in key_value_pairs:
+            f.write(f"{pair['key']}: {pair['value']}\n".encode("utf-8"))
+
+
+def csv_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "" if value is None else value
+
+
+def db_value(value):
+    return int(value) if isinstance(value, bool) else value
+
+
+def create_database(folder):
+    """Creates an empty KYC database (KYC_DataBase.db) in the folder with the DataBase 1.py schema."""
+    script = Path(__file__).resolve().parent / "DataBase 1.py"
+    subprocess.run([sys.executable, str(script)], cwd=folder, check=True, stdout=subprocess.DEVNULL)
+    return os.path.join(folder, "KYC_DataBase.db")
+
+
+def write_refresh_rows(conn, rows):
+    query = (
+        f"INSERT INTO KycRefreshData ({', '.join(REFRESH_COLUMNS)}) "
+        f"VALUES ({', '.join('?' for _ in REFRESH_COLUMNS)})"
+    )
+    with conn:
+        conn.executemany(query, ([db_value(row.get(column)) for column in REFRESH_COLUMNS] for row in rows))
+
+
+def write_screening_list(path, planted_names, rng, size=SCREENING_LIST_SIZE):
+    """Writes a screening list of random names with the planted names mixed in, perturbed."""
+    names = [random_name(rng) for _ in range(size)] + [perturb(rng, name) for name in planted_names]
+    rng.shuffle(names)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["entry_id", "name", "list_type"])
+        for position, name in enumerate(names):
+            writer.writerow([f"E{position}", name, "sanctions" if position % 3 else "pep"])
+
+
+def generate_dataset(folder, rows=SCALES["1k"], seed=7, document_count=DOCUMENT_COUNT, screening_list_size=SCREENING_LIST_SIZE):
+    """
+    Generates a dataset of about the given number of onboarding rows in the folder:
+    onboardingData.csv, KYC_DataBase.db with the KycRefreshData rows (OnboardingData is left
+    to the CSV load), screeningList.csv, the sampled client documents and manifest.json.
+
+    Rows are generated and written in one streaming pass, so memory stays flat at 1M rows.
+
+    Returns:
+        The manifest: row and client counts, file paths and the documented cases
+        (case_id, client_identifier, path, key_value_pairs)
+    """
+    Path(folder, "documents").mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    db_path = create_database(folder)
+    csv_path = os.path.join(folder, "onboardingData.csv")
+    document_stride = max(1, round(rows / ROWS_PER_CLIENT / document_count))
+
+    written = 0
+    client_number = 0
+    planted_names = []
+    documents = []
+    pending_refresh_rows = []
+    conn = sqlite3.connect(db_path)
+    try:
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(ONBOARDING_COLUMNS)
+            while written < rows:
+                client_number += 1
+                onboarding = client_rows(rng, client_number)[:rows - written]
+                refresh = refreshed_rows(rng, onboarding)
+                writer.writerows([csv_value(row.get(column)) for column in ONBOARDING_COLUMNS] for row in onboarding)
+                pending_refresh_rows.extend(refresh)
+                written += len(onboarding)
+
+                if rng.random() < PLANTED_HIT_RATE:
+                    planted_names.append(rng.choice(refresh).get("member_legal_name") or refresh[0]["entity_legal_name"])
+                if client_number % document_stride == 0 and len(documents) < document_count:
+                    key_value_pairs = document_key_values(refresh)
+                    path = os.path.join(folder, "documents", refresh[0]["document_name"])
+                    write_document(path, key_value_pairs)
+                    documents.append({
+                        "case_id": refresh[0]["outreach_agent_status"],
+                        "client_identifier": refresh[0]["client_identifier"],
+                        "path": path,
+                        "key_value_pairs": key_value_pairs,
+                    })
+                if len(pending_refresh_rows) >= WRITE_CHUNK_SIZE:
+                    write_refresh_rows(conn, pending_refresh_rows)
+                    pending_refresh_rows = []
+        write_refresh_rows(conn, pending_refresh_rows)
+    finally:
+        conn.close()
+
+    list_path = os.path.join(folder, "screeningList.csv")
+    write_screening_list(list_path, planted_names, rng, screening_list_size)
+
+    manifest = {
+        "rows": written,
+        "clients": client_number,
+        "seed": seed,
+        "db_path": db_path,
+        "csv_path": csv_path,
+        "list_path": list_path,
+        "planted_names": len(planted_names),
+        "documents": documents,
+    }
+    with open(os.path.join(folder, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    scale = sys.argv[1] if len(sys.argv) > 1 else "1k"
+    folder = sys.argv[2] if len(sys.argv) > 2 else f"synthetic_{scale}"
+    manifest = generate_dataset(folder, SCALES.get(scale.lower()) or int(scale))
+    print(f"Generated {manifest['rows']} rows for {manifest['clients']} clients and "
+          f"{len(manifest['documents'])} documents in {folder}")
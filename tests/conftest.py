@@ -0,0 +1,18 @@
+import itertools
+import os
+import sys
+import types
+
+import pytest
+
+# The modules live at the repository root, next to this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lru_store  # noqa: E402
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Makes every cache access one second later than the previous one, so LRU order and expiry are deterministic."""
+    ticks = itertools.count(1)
+    monkeypatch.setattr(lru_store, "time", types.SimpleNamespace(time=lambda: next(ticks)))
@@ -0,0 +1,17 @@
+import pytest
+
+pytest.importorskip("crewai")
+pytest.importorskip("crewai_tools")
+
+import agents  # noqa: E402
+import tools  # noqa: E402
+
+
+@pytest.mark.parametrize("agent, expected_tools", [
+    (agents.researher_agent, [tools.Pdf_Extraction_tool]),
+    (agents.KYC_analyst_agent, [tools.Profile_Search_tool, tools.Match_KYC_Data_tool, tools.Validator_tool]),
+    (agents.Screener_agent, [tools.Name_Screening_tool]),
+    (agents.Outreach_agent, []),
+])
+def test_agent_tools(agent, expected_tools):
+    assert [tool.name for tool in agent.tools] == [tool.name for tool in expected_tools]
@@ -0,0 +1,100 @@
+import json
+
+import analyst_batching
+from analyst_batching import build_prompt, pack_questions, parse_response, resolve_questions
+from llm_cache import LLMResponseCache
+
+
+def question(case_id, *fields):
+    return {'case_id': case_id, 'fields': [
+        {'field': field, 'document_value': "x", 'database_value': "y", 'note': "Ambiguous"} for field in fields
+    ]}
+
+
+def answer(*questions, decision="match"):
+    return json.dumps({"results": [
+        {"case_id": q['case_id'], "fields": [{"field": f['field'], "decision": decision, "explanation": "Same"}
+                                             for f in q['fields']]}
+        for q in questions
+    ]})
+
+
+class StubLLM:
+    """Answers every case of a prompt, except the cases in skip when they are asked in a batch."""
+
+    def __init__(self, skip=()):
+        self.skip = set(skip)
+        self.prompts = []
+
+    def __call__(self, prompt, validate=None):
+        self.prompts.append(prompt)
+        lines = prompt[len(analyst_batching.BATCH_INSTRUCTIONS):].splitlines()
+        questions = [json.loads(line) for line in lines if line]
+        if len(questions) > 1:
+            questions = [q for q in questions if q['case_id'] not in self.skip]
+        return answer(*questions)
+
+
+def test_pack_questions_fits_the_token_budget():
+    questions = [question(f"CASE-{n}", "phone_number", "dba_address") for n in range(20)]
+    budget = analyst_batching.estimate_tokens(build_prompt(questions[:5]))
+
+    batches = pack_questions(questions, budget)
+
+    assert [q for batch in batches for q in batch] == questions
+    assert all(analyst_batching.estimate_tokens(build_prompt(batch)) <= budget for batch in batches)
+    assert 1 < len(batches) < len(questions)
+
+
+def test_oversized_question_gets_a_batch_of_its_own():
+    big = question("BIG", *(f"field_{n}" for n in range(200)))
+    batches = pack_questions([question("A", "phone_number"), big, question("B", "phone_number")], token_budget=200)
+    assert [[q['case_id'] for q in batch] for batch in batches] == [["A"], ["BIG"], ["B"]]
+
+
+def test_parse_response_accepts_only_complete_answers():
+    complete = question("A", "phone_number")
+    partial = question("B", "phone_number", "dba_address")
+    response = json.dumps({"results": [
+        {"case_id": "A", "fields": [{"field": "phone_number", "decision": "match", "explanation": "Same"}]},
+        {"case_id": "B", "fields": [{"field": "phone_number", "decision": "maybe"}]},
+    ]})
+
+    decisions, failed = parse_response(f"```json\n{response}\n```", [complete, partial])
+
+    assert decisions == {"A": {"phone_number": {'decision': "match", 'explanation': "Same"}}}
+    assert failed == [partial]
+    assert parse_response("not json", [complete]) == ({}, [complete])
+
+
+def test_cases_missing_from_a_batched_answer_are_asked_alone():
+    questions = [question("A", "phone_number"), question("B", "phone_number"), question("C", "phone_number")]
+    llm = StubLLM(skip={"B"})
+
+    decisions = resolve_questions(questions, llm)
+
+    assert set(decisions) == {"A", "B", "C"}
+    assert all('error' not in decision for decision in decisions.values())
+    assert len(llm.prompts) == 2
+
+
+def test_case_never_answered_is_reported_as_an_error():
+    decisions = resolve_questions([question("A", "phone_number")], lambda prompt, validate=None: "I cannot help")
+    assert decisions == {"A": {'error': "No valid answer from the LLM"}}
+
+
+def test_only_complete_batched_answers_are_cached(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm_cache.db"))
+    llm = StubLLM(skip={"B"})
+
+    def ask(prompt, validate):
+        return cache.get_or_call_prompt("KYC Analyst", prompt, "stub", lambda: llm(prompt), validate=validate)
+
+    questions = [question("A", "phone_number"), question("B", "phone_number")]
+    first = resolve_questions(questions, ask)
+    second = resolve_questions(questions, ask)
+
+    assert first == second
+    # The incomplete batch is asked again; the single-case answer comes from the cache
+    assert len(llm.prompts) == 3
+    assert cache.stats()['entries'] == 1
@@ -0,0 +1,177 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import dashboard_data
+import db_migrations
+from change_feed import ChangeFeed, PageCache, plan_grid_update
+from synthetic_data import create_database
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = create_database(str(tmp_path))
+    with sqlite3.connect(db_path) as conn:
+        db_migrations.apply_migrations(conn)
+    return db_path
+
+
+def insert_case(conn, case_id, risk_tier="low"):
+    with conn:
+        return conn.execute(
+            "INSERT INTO KycRefreshData (outreach_agent_status, risk_tier, KycRefresh_created_date) VALUES (?, ?, '2025-01-01')",
+            (case_id, risk_tier),
+        ).lastrowid
+
+
+def row_version(conn, row_id):
+    return conn.execute("SELECT row_version FROM KycRefreshData WHERE id = ?", (row_id,)).fetchone()[0]
+
+
+def test_each_write_takes_one_row_version(db_path):
+    with sqlite3.connect(db_path) as conn:
+        first = insert_case(conn, "CASE-1")
+        second = insert_case(conn, "CASE-2")
+        assert (row_version(conn, first), row_version(conn, second)) == (1, 2)
+
+        with conn:
+            conn.execute("UPDATE KycRefreshData SET refresh_status = 'Yes' WHERE id = ?", (first,))
+        assert row_version(conn, first) == 3
+        with conn:
+            conn.execute("UPDATE KycRefreshData SET attempts = 2 WHERE id = ?", (first,))
+        assert row_version(conn, first) == 3
+
+        # An SLA window change re-dates and re-versions the cases of its tier
+        with conn:
+            conn.execute("UPDATE SlaPolicy SET sla_days = 10 WHERE risk_tier = 'low'")
+        assert row_version(conn, first) == row_version(conn, second) == 4
+
+
+def test_feed_returns_the_latest_values_of_changed_rows(db_path):
+    feed = ChangeFeed(db_path, poll_interval=0)
+    watermark, _ = feed.changes_since(None)
+    with sqlite3.connect(db_path) as conn:
+        row_id = insert_case(conn, "CASE-1")
+        with conn:
+            conn.execute("UPDATE KycRefreshData SET refresh_status = 'Yes' WHERE id = ?", (row_id,))
+
+    watermark, changes = feed.changes_since(watermark)
+
+    assert watermark == 2
+    assert [(row['id'], row['case_status_display']) for row in changes] == [(row_id, "KYC status Refreshed")]
+
+
+def test_feed_returns_deleted_rows(db_path):
+    feed = ChangeFeed(db_path, poll_interval=0)
+    with sqlite3.connect(db_path) as conn:
+        row_id = insert_case(conn, "CASE-1")
+        watermark, _ = feed.changes_since(None)
+        with conn:
+            conn.execute("DELETE FROM KycRefreshData WHERE id = ?", (row_id,))
+        # A later write takes a version after the delete's
+        newer_id = insert_case(conn, "CASE-2")
+        assert row_version(conn, newer_id) == watermark + 2
+
+    watermark, changes = feed.changes_since(watermark)
+
+    assert changes[0] == {'id': row_id, 'deleted': True}
+    assert [row['id'] for row in changes[1:]] == [newer_id]
+
+
+def page_ids(rows):
+    return [row['id'] for row in rows]
+
+
+@pytest.mark.parametrize("change", ["update", "insert", "delete"])
+def test_page_cache_is_invalidated_by_a_change(db_path, change):
+    feed = ChangeFeed(db_path, poll_interval=0)
+    pages = PageCache(feed)
+    with sqlite3.connect(db_path) as conn:
+        first_id, _, _ = (insert_case(conn, f"CASE-{number}") for number in range(3))
+        watermark, _ = feed.changes_since(None)
+        rows, total_count = pages.fetch_page({}, 1, 5)
+        assert pages.fetch_page({}, 1, 5)[0] is rows
+        with conn:
+            if change == "update":
+                conn.execute("UPDATE KycRefreshData SET entity_legal_name = 'Renamed Ltd' WHERE id = ?", (first_id,))
+            elif change == "insert":
+                insert_case(conn, "CASE-NEW")
+            else:
+                conn.execute("DELETE FROM KycRefreshData WHERE id = ?", (first_id,))
+
+    # Until the feed sees the change, the cached page is served
+    assert pages.fetch_page({}, 1, 5)[0] is rows
+    feed.changes_since(watermark)
+    fresh_rows, fresh_count = pages.fetch_page({}, 1, 5)
+
+    assert (fresh_rows, fresh_count) == dashboard_data.fetch_dashboard_page({}, 1, 5, db_path)
+    if change == "update":
+        assert fresh_rows[0]['entity_legal_name'] == 'Renamed Ltd'
+    elif change == "insert":
+        assert (len(fresh_rows), fresh_count) == (4, 4)
+    else:
+        assert (page_ids(fresh_rows), fresh_count) == (page_ids(rows)[1:], 2)
+
+
+def rows_with_ids(*ids):
+    return [{'id': row_id, 'refresh_status': 'No'} for row_id in ids]
+
+
+def test_plan_updates_visible_rows_in_place():
+    changed = {'id': 2, 'refresh_status': 'Yes'}
+    assert plan_grid_update([changed], {2}, rows_with_ids(1, 2, 3), 3) == ([changed], [], False, False)
+
+
+def test_plan_adds_inserted_rows():
+    inserted = rows_with_ids(9)
+    # A row entering a page with room for it reloads the page
+    assert plan_grid_update(inserted, {9}, rows_with_ids(1, 2), 3, filtered=False) == ([], [], True, False)
+    # After a full page, it only changes the page count
+    assert plan_grid_update(inserted, {9}, rows_with_ids(1, 2, 3), 3, filtered=False) == ([], [], False, True)
+
+
+def test_plan_removes_deleted_rows():
+    deleted = [{'id': 2, 'deleted': True}]
+    # On the last page the row is removed in place
+    assert plan_grid_update(deleted, set(), rows_with_ids(1, 2), 3) == ([], [2], False, True)
+    # On a full page the next row moves in, and removing the only row leaves an empty page
+    assert plan_grid_update(deleted, set(), rows_with_ids(1, 2, 3), 3) == ([], [], True, False)
+    assert plan_grid_update(deleted, set(), rows_with_ids(2), 3) == ([], [], True, False)
+    # A row deleted after the page changes the count, one before it shifts the page
+    assert plan_grid_update(deleted, set(), rows_with_ids(0, 1), 3) == ([], [], False, True)
+    assert plan_grid_update(deleted, set(), rows_with_ids(5, 6), 3) == ([], [], True, False)
+
+
+class BlockingConnection:
+    """Connection whose queries wait until released, to hold a poll inside its query."""
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.querying = threading.Event()
+        self.release = threading.Event()
+
+    def cursor(self):
+        self.querying.set()
+        self.release.wait(5)
+        return self.conn.cursor()
+
+    def execute(self, *args):
+        return self.conn.execute(*args)
+
+
+def test_clients_read_the_kept_changes_while_a_poll_queries(db_path):
+    feed = ChangeFeed(db_path, poll_interval=0)
+    watermark, _ = feed.changes_since(None)
+    blocking = BlockingConnection(db_path)
+    poller = threading.Thread(target=feed.poll, args=(blocking,))
+    poller.start()
+    try:
+        assert blocking.querying.wait(5)
+        start_time = time.monotonic()
+        assert feed.changes_since(watermark) == (watermark, [])
+        assert time.monotonic() - start_time < 1
+    finally:
+        blocking.release.set()
+        poller.join()
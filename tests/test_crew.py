@@ -0,0 +1,34 @@
+import json
+import types
+
+import pytest
+
+pytest.importorskip("crewai")
+pytest.importorskip("crewai_tools")
+
+import crew  # noqa: E402
+
+
+class StubCrew:
+    """Stands in for a one-task Crew: answers with the task's agent role and case, without calling an LLM."""
+
+    def __init__(self, agents, tasks, process):
+        self.task = tasks[0]
+
+    def kickoff(self, inputs):
+        raw = json.dumps({'role': self.task.agent.role, 'case_id': inputs['case_id']})
+        return types.SimpleNamespace(raw=raw, token_usage=types.SimpleNamespace(prompt_tokens=10, completion_tokens=5))
+
+
+def test_kyc_refresh_graph_runs_with_stub_agents(tmp_path, monkeypatch):
+    monkeypatch.setattr(crew, "Crew", StubCrew)
+    monkeypatch.setattr(crew, "Task", lambda **kwargs: types.SimpleNamespace(**kwargs))
+    monkeypatch.setattr(crew.response_cache, "get_or_call", lambda agent, description, inputs, model, call, **kwargs: call())
+
+    assert crew.KYC_REFRESH_GRAPH.order == ["research", "analysis", "screening", "outreach"]
+    cases = [{'id': 1, 'case_id': "CASE-1", 'client_identifier': "C1", 'path': str(tmp_path / "C1.pdf")}]
+    (case, outputs, error), = crew.run_cases(cases, max_concurrency=2, db_path=str(tmp_path / "metrics.db"))
+
+    assert error is None
+    assert json.loads(outputs['research']) == {'role': crew.researher_agent.role, 'case_id': "CASE-1"}
+    assert json.loads(outputs['outreach'])['role'] == crew.Outreach_agent.role
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from crew_runner import CaseGraph, CaseTask, CrewRunner
+
+
+class Tracker:
+    """Records the stage runs in flight, the most seen at once and the stages each case ran."""
+
+    def __init__(self):
+        self.in_flight = set()
+        self.max_in_flight = 0
+        self.overlaps = set()
+        self.ran = []
+
+    def stage(self, name, duration=0.02, output=None, error=None):
+        async def run(case, upstream):
+            key = (case['case_id'], name)
+            self.overlaps.update(frozenset((name, other)) for case_id, other in self.in_flight if case_id == case['case_id'])
+            self.in_flight.add(key)
+            self.max_in_flight = max(self.max_in_flight, len(self.in_flight))
+            self.ran.append(key)
+            try:
+                await asyncio.sleep(duration)
+                if error is not None:
+                    raise error
+                return output if output is not None else {'stage': name, 'upstream': sorted(upstream)}
+            finally:
+                self.in_flight.discard(key)
+        return run
+
+
+def kyc_graph(tracker, **stages):
+    """The KYC refresh shape: research -> (analysis || screening) -> outreach."""
+    def stage(name):
+        return stages.get(name) or tracker.stage(name)
+    return CaseGraph([
+        CaseTask("research", stage("research")),
+        CaseTask("analysis", stage("analysis"), depends_on=["research"]),
+        CaseTask("screening", stage("screening"), depends_on=["research"]),
+        CaseTask("outreach", stage("outreach"), depends_on=["analysis", "screening"]),
+    ])
+
+
+def test_graph_rejects_unknown_dependencies_and_cycles():
+    with pytest.raises(ValueError):
+        CaseGraph([CaseTask("a", None, depends_on=["missing"])])
+    with pytest.raises(ValueError):
+        CaseGraph([CaseTask("a", None, depends_on=["b"]), CaseTask("b", None, depends_on=["a"])])
+    assert CaseGraph([CaseTask("b", None, depends_on=["a"]), CaseTask("a", None)]).order == ["a", "b"]
+
+
+def test_independent_stages_overlap():
+    tracker = Tracker()
+    outputs = asyncio.run(CrewRunner(kyc_graph(tracker), max_concurrency=4).run_case({'case_id': "CASE-1"}))
+
+    assert frozenset(("analysis", "screening")) in tracker.overlaps
+    assert tracker.ran[0] == ("CASE-1", "research") and tracker.ran[-1] == ("CASE-1", "outreach")
+    assert outputs['outreach'] == {'stage': "outreach", 'upstream': ["analysis", "screening"]}
+
+
+def test_max_concurrency_caps_stage_runs_across_cases():
+    tracker = Tracker()
+    runner = CrewRunner(kyc_graph(tracker), max_concurrency=3)
+    results = asyncio.run(runner.run_cases([{'case_id': f"CASE-{n}"} for n in range(8)]))
+
+    assert [error for _, _, error in results] == [None] * 8
+    assert 1 < tracker.max_in_flight <= 3
+
+
+def test_failed_stage_stops_its_dependents_and_is_raised():
+    tracker = Tracker()
+    graph = kyc_graph(tracker, screening=tracker.stage("screening", error=RuntimeError("screening list unavailable")))
+    runner = CrewRunner(graph, max_concurrency=4)
+
+    with pytest.raises(RuntimeError, match="screening list unavailable"):
+        asyncio.run(runner.run_case({'case_id': "CASE-1"}))
+    assert ("CASE-1", "outreach") not in tracker.ran
+
+    (case, outputs, error), = asyncio.run(runner.run_cases([{'case_id': "CASE-2"}]))
+    assert outputs is None and isinstance(error, RuntimeError)
+
+
+class MemoryCheckpoints:
+    def __init__(self, saved):
+        self.saved = saved
+
+    def load(self, case):
+        return dict(self.saved.get(case['case_id'], {}))
+
+    def save(self, case, stage, output):
+        self.saved.setdefault(case['case_id'], {})[stage] = output
+
+
+def test_checkpointed_stages_are_not_run_again():
+    tracker = Tracker()
+    research = {'key_value_pairs': [{'key': "Entity Name", 'value': "Acme"}]}
+    checkpoints = MemoryCheckpoints({"CASE-1": {'research': research}})
+    runner = CrewRunner(kyc_graph(tracker), max_concurrency=4, checkpoints=checkpoints)
+
+    outputs = asyncio.run(runner.run_case({'case_id': "CASE-1"}))
+
+    assert ("CASE-1", "research") not in tracker.ran
+    assert outputs['research'] == research
+    assert set(checkpoints.saved["CASE-1"]) == {"research", "analysis", "screening", "outreach"}
@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+
+import db_migrations
+from synthetic_data import create_database
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(create_database(str(tmp_path)))
+    yield conn
+    conn.close()
+
+
+def insert_onboarding_rows(conn, rows):
+    with conn:
+        conn.executemany("INSERT INTO OnboardingData (client_identifier, member_type, entity_legal_name) VALUES (?, ?, ?)", rows)
+
+
+def test_duplicate_identities_fail_the_migration_without_deleting_rows(conn):
+    conn.execute("DROP INDEX idx_kyc_onboarding_identity")
+    insert_onboarding_rows(conn, [("C1", "Entity", "Acme"), ("C1", "Entity", "Acme Ltd"), ("C2", "Entity", "Other")])
+
+    with pytest.raises(db_migrations.DuplicateRows) as error:
+        db_migrations.apply_migrations(conn)
+
+    assert error.value.duplicates == [(("C1", "Entity", "", "", "", ""), [1, 2])]
+    assert conn.execute("SELECT COUNT(*) FROM OnboardingData").fetchone()[0] == 3
+
+
+def test_rows_without_client_identifier_are_not_unique(conn):
+    insert_onboarding_rows(conn, [(None, "Entity", "Unknown"), (None, "Entity", "Unknown")])
+
+    db_migrations.apply_migrations(conn)
+    assert conn.execute("SELECT COUNT(*) FROM OnboardingData").fetchone()[0] == 2
+
+
+def test_remove_duplicates_keeps_the_latest_row_of_each_group(conn):
+    conn.execute("DROP INDEX idx_kyc_onboarding_identity")
+    insert_onboarding_rows(conn, [("C1", "Entity", "Acme"), ("C1", "Entity", "Acme Ltd"), (None, "Entity", "Unknown")])
+
+    assert db_migrations.remove_duplicates(conn) == {"OnboardingData": [1]}
+    db_migrations.apply_migrations(conn)
+    assert conn.execute("SELECT id FROM OnboardingData ORDER BY id").fetchall() == [(2,), (3,)]
+
+
+def test_migrated_database_serves_every_dashboard_query_from_an_index(conn):
+    db_migrations.apply_migrations(conn)
+    assert db_migrations.check_query_plans(conn) == []
+
+
+@pytest.mark.parametrize("index, description", [
+    ("refresh_case_id", "client details"),
+    ("refresh_created_date", "case creation date page"),
+    ("refresh_identity", "refresh profile search"),
+])
+def test_query_plan_check_fails_without_an_index(conn, index, description):
+    db_migrations.apply_migrations(conn)
+    conn.execute(f"DROP INDEX {db_migrations.INDEX_PREFIX}{index}")
+
+    failures = db_migrations.check_query_plans(conn)
+
+    assert description in [failed for failed, _ in failures]
@@ -0,0 +1,85 @@
+import asyncio
+import contextlib
+import importlib
+
+import pytest
+
+pytest.importorskip("azure.ai.documentintelligence")
+
+import benchmark_upload_memory  # noqa: E402
+from fake_document_client import FakeDocumentIntelligenceClient  # noqa: E402
+
+extraction = importlib.import_module("Extract_text_from_PDF 1")
+
+
+def write_pdf(path, entity_name):
+    path.write_bytes(f"%PDF-1.7\nEntity Name: {entity_name}\nDocument Type: Annual Report\n".encode())
+    return str(path)
+
+
+def test_cache_hit_skips_the_analyze_call(tmp_path):
+    client = FakeDocumentIntelligenceClient(latency=0)
+    session = extraction.ExtractionSession(client=client)
+    pdf_path = write_pdf(tmp_path / "report.pdf", "Acme Holdings Ltd")
+    output_folder = str(tmp_path / "out")
+
+    first = extraction.extract_data_from_pdf(pdf_path, output_folder, session=session)
+    second = extraction.extract_data_from_pdf(pdf_path, output_folder, session=session)
+
+    assert client.calls == 1
+    assert second == first
+    assert first["key_value_pairs"][0] == {"key": "Entity Name", "value": "Acme Holdings Ltd"}
+
+
+def test_changed_document_is_analyzed_again(tmp_path):
+    client = FakeDocumentIntelligenceClient(latency=0)
+    session = extraction.ExtractionSession(client=client)
+    output_folder = str(tmp_path / "out")
+
+    extraction.extract_data_from_pdf(write_pdf(tmp_path / "report.pdf", "Acme Holdings Ltd"), output_folder, session=session)
+    changed = extraction.extract_data_from_pdf(write_pdf(tmp_path / "report.pdf", "Acme Group plc"), output_folder, session=session)
+
+    assert client.calls == 2
+    assert changed["key_value_pairs"][0]["value"] == "Acme Group plc"
+
+
+def test_streamed_and_bytes_uploads_extract_the_same_data(tmp_path):
+    session = extraction.ExtractionSession(client=FakeDocumentIntelligenceClient(latency=0))
+    pdf_path = write_pdf(tmp_path / "report.pdf", "Acme Holdings Ltd")
+    output_folder = str(tmp_path / "out")
+
+    streamed = extraction.extract_data_from_pdf(pdf_path, output_folder, use_cache=False, session=session, stream_upload=True)
+    in_memory = extraction.extract_data_from_pdf(pdf_path, output_folder, use_cache=False, session=session, stream_upload=False)
+
+    assert streamed == in_memory
+
+
+def test_streamed_upload_peak_memory_does_not_grow_with_the_document():
+    measurements = benchmark_upload_memory.compare_upload_memory(size_mb=20)
+
+    assert measurements["bytes_peak"] >= measurements["document_size"]
+    assert measurements["stream_peak"] < measurements["document_size"] * benchmark_upload_memory.MAX_STREAM_PEAK_RATIO
+
+
+def test_async_extraction_cancels_documents_in_flight_when_the_consumer_stops(tmp_path):
+    pdf_folder = tmp_path / "pdfs"
+    pdf_folder.mkdir()
+    for number in range(10):
+        write_pdf(pdf_folder / f"report{number}.pdf", f"Entity {number}")
+    session = extraction.ExtractionSession(client=FakeDocumentIntelligenceClient(latency=0.05))
+
+    async def first_document():
+        documents = extraction.aiter_extracted_pdfs(str(pdf_folder), str(tmp_path / "out"), max_in_flight=4, session=session)
+        async with contextlib.aclosing(documents):
+            async for file, _ in documents:
+                break
+        in_flight = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        await asyncio.sleep(0)
+        # asyncio.run cancels the tasks left at exit, so they are checked before it returns
+        return file, len(in_flight), [task.cancelled() for task in in_flight]
+
+    file, in_flight, cancelled = asyncio.run(first_document())
+
+    assert file.endswith(".pdf")
+    assert in_flight == 3
+    assert all(cancelled)
@@ -0,0 +1,41 @@
+import json
+import types
+
+from extraction_cache import AnalysisCache, document_hash, file_hash, serialize_analyze_result
+
+PAYLOAD = {"content": "Entity Name: Acme Holdings Ltd", "tables": [], "keyValuePairs": [], "paragraphs": []}
+
+
+def test_file_hash_matches_document_hash(tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF-1.7\n" * 1000)
+    assert file_hash(str(path)) == document_hash(path.read_bytes())
+
+
+def test_get_returns_stored_payload_for_same_hash_and_model(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache.db"))
+    cache.put("abc", "prebuilt-read", PAYLOAD)
+
+    assert cache.get("abc", "prebuilt-read") == PAYLOAD
+    assert cache.get("abc", "prebuilt-layout") is None
+    assert cache.get("other", "prebuilt-read") is None
+    # Entries persist across cache instances
+    assert AnalysisCache(str(tmp_path / "cache.db")).get("abc", "prebuilt-read") == PAYLOAD
+
+
+def test_evicts_least_recently_used_entries_over_the_size_limit(tmp_path, clock):
+    entry_size = len(json.dumps(PAYLOAD))
+    cache = AnalysisCache(str(tmp_path / "cache.db"), max_bytes=entry_size * 2)
+    cache.put("first", "prebuilt-read", PAYLOAD)
+    cache.put("second", "prebuilt-read", PAYLOAD)
+    cache.get("first", "prebuilt-read")
+    cache.put("third", "prebuilt-read", PAYLOAD)
+
+    assert cache.get("second", "prebuilt-read") is None
+    assert cache.get("first", "prebuilt-read") == PAYLOAD
+    assert cache.get("third", "prebuilt-read") == PAYLOAD
+
+
+def test_serialize_keeps_only_the_extracted_fields():
+    result = types.SimpleNamespace(as_dict=lambda: dict(PAYLOAD, modelId="prebuilt-read", pages=[{"pageNumber": 1}]))
+    assert serialize_analyze_result(result) == PAYLOAD
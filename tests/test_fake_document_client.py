@@ -0,0 +1,76 @@
+import importlib
+import io
+import os
+
+import pytest
+
+pytest.importorskip("azure.ai.documentintelligence")
+
+from azure.core.exceptions import HttpResponseError  # noqa: E402
+
+from fake_document_client import FakeDocumentIntelligenceClient  # noqa: E402
+
+extraction = importlib.import_module("Extract_text_from_PDF 1")
+
+PDF_BYTES = b"%PDF-1.7\nEntity Name: Acme Holdings Ltd\nDocument Type: Annual Report\n"
+
+
+def write_pdf(folder, name, data=PDF_BYTES):
+    path = os.path.join(folder, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_analyze_result_from_bytes_and_stream():
+    client = FakeDocumentIntelligenceClient(latency=0)
+    from_bytes = client.begin_analyze_document(extraction.MODEL_ID, PDF_BYTES).result()
+    from_stream = client.begin_analyze_document(extraction.MODEL_ID, io.BytesIO(PDF_BYTES)).result()
+
+    assert from_bytes.as_dict() == from_stream.as_dict()
+    assert from_bytes.content == "Entity Name: Acme Holdings Ltd\nDocument Type: Annual Report"
+    assert [(pair.key.content, pair.value.content) for pair in from_bytes.key_value_pairs] == [
+        ("Entity Name", "Acme Holdings Ltd"),
+        ("Document Type", "Annual Report"),
+    ]
+    assert client.calls == 2
+
+
+def test_rejects_content_that_is_not_a_pdf():
+    client = FakeDocumentIntelligenceClient(latency=0)
+    with pytest.raises(HttpResponseError):
+        client.begin_analyze_document(extraction.MODEL_ID, b"not a pdf").result()
+
+
+def test_concurrent_extraction_bounds_in_flight_requests(tmp_path):
+    pdf_folder = tmp_path / "pdfs"
+    pdf_folder.mkdir()
+    for number in range(12):
+        write_pdf(pdf_folder, f"client_{number}.pdf")
+    client = FakeDocumentIntelligenceClient(latency=0.02)
+    session = extraction.ExtractionSession(client=client)
+
+    results, errors = extraction.process_multiple_pdfs_concurrently(
+        str(pdf_folder), str(tmp_path / "out"), max_in_flight=4, session=session, use_cache=False
+    )
+
+    assert len(results) == 12
+    assert errors == {}
+    assert client.calls == 12
+    assert 1 < client.max_in_flight <= 4
+
+
+def test_failing_document_does_not_abort_the_batch(tmp_path):
+    pdf_folder = tmp_path / "pdfs"
+    pdf_folder.mkdir()
+    write_pdf(pdf_folder, "good.pdf")
+    write_pdf(pdf_folder, "corrupt.pdf", b"garbage")
+    session = extraction.ExtractionSession(client=FakeDocumentIntelligenceClient(latency=0))
+
+    results, errors = extraction.process_multiple_pdfs_concurrently(
+        str(pdf_folder), str(tmp_path / "out"), max_in_flight=2, session=session, use_cache=False
+    )
+
+    assert list(results) == ["good.pdf"]
+    assert list(errors) == ["corrupt.pdf"]
+    assert results["good.pdf"]["key_value_pairs"][0] == {"key": "Entity Name", "value": "Acme Holdings Ltd"}
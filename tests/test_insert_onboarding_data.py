@@ -0,0 +1,24 @@
+import importlib
+import sqlite3
+
+from synthetic_data import create_database
+
+loader = importlib.import_module("insert_onboarding_data 1")
+
+
+def test_load_stops_when_onboarding_data_holds_duplicate_identities(tmp_path, capsys):
+    db_path = create_database(str(tmp_path))
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DROP INDEX IF EXISTS idx_kyc_onboarding_identity")
+        conn.executemany(
+            "INSERT INTO OnboardingData (client_identifier, member_type, entity_legal_name) VALUES (?, ?, ?)",
+            [("C1", "Entity", "Acme"), ("C1", "Entity", "Acme Ltd")],
+        )
+    csv_path = tmp_path / "onboardingData.csv"
+    csv_path.write_text("client_identifier,member_type,entity_legal_name\nC2,Entity,Other\n")
+
+    assert loader.load_onboarding_csv(str(csv_path), db_path) is None
+
+    assert "remove-duplicates" in capsys.readouterr().out
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM OnboardingData").fetchone()[0] == 2
@@ -0,0 +1,22 @@
+import pytest
+
+from kyc_matcher import compare_field, normalize_percentage
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("1", 1.0),
+    ("1%", 1.0),
+    ("0.5", 50.0),
+    ("0,25", 25.0),
+    ("0.5%", 0.5),
+    ("25", 25.0),
+    ("100 %", 100.0),
+])
+def test_normalize_percentage(value, expected):
+    assert normalize_percentage(value) == expected
+
+
+def test_whole_number_percentage_matches_with_and_without_sign():
+    assert compare_field("ownership_percentage", "1%", "1")["status"] == "match"
+    assert compare_field("ownership_percentage", "25%", "0.25")["status"] == "match"
+    assert compare_field("ownership_percentage", "1%", "0.5")["status"] == "mismatch"
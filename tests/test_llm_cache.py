@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from llm_cache import LLMResponseCache, prompt_key
+
+DESCRIPTION = "Match the data of case {case_id} with client {client_identifier}. Extracted data: {upstream}"
+
+
+class StubLLM:
+    """Returns a numbered response per call, so a cached response is told apart from a fresh one."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return f"response {self.calls}"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(str(tmp_path / "llm_cache.db"))
+
+
+def ask(cache, llm, **inputs):
+    return cache.get_or_call("KYC Analyst", DESCRIPTION, inputs, "gpt-4o", llm)
+
+
+def test_same_prompt_is_answered_from_the_cache(cache):
+    llm = StubLLM()
+    first = ask(cache, llm, case_id="CASE-1", client_identifier="C1", upstream='{"a": 1}')
+    second = ask(cache, llm, case_id="CASE-1", client_identifier="C1", upstream='{"a": 1}')
+
+    assert first == second == "response 1"
+    assert llm.calls == 1
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_key_ignores_formatting_and_unused_inputs(cache):
+    llm = StubLLM()
+    ask(cache, llm, case_id="CASE-1", client_identifier="C1", upstream='{"a": 1}', attempts=1)
+    ask(cache, llm, case_id="CASE-1", client_identifier=" C1 ", upstream='{"a":  1}', attempts=2)
+    assert llm.calls == 1
+
+
+def test_key_changes_with_inputs_model_and_agent():
+    inputs = {"case_id": "CASE-1"}
+    key = prompt_key("KYC Analyst", DESCRIPTION, inputs, "gpt-4o")
+    assert key != prompt_key("KYC Analyst", DESCRIPTION, {"case_id": "CASE-2"}, "gpt-4o")
+    assert key != prompt_key("KYC Analyst", DESCRIPTION, inputs, "gpt-4o-mini")
+    assert key != prompt_key("Screener", DESCRIPTION, inputs, "gpt-4o")
+
+
+def test_key_inputs_are_part_of_the_key(cache):
+    llm = StubLLM()
+    for document_hash in ("aaa", "aaa", "bbb"):
+        cache.get_or_call("Researcher", "Extract {path}", {"path": "doc.pdf"}, "gpt-4o", llm,
+                          key_inputs={"document_hash": document_hash})
+    assert llm.calls == 2
+
+
+def test_rejected_responses_are_not_cached(cache):
+    llm = StubLLM()
+    for _ in range(2):
+        cache.get_or_call_prompt("KYC Analyst", "prompt", "gpt-4o", llm, validate=lambda response: False)
+    assert llm.calls == 2
+    assert cache.stats()['entries'] == 0
+
+
+def test_stored_responses_the_validator_rejects_are_misses(cache):
+    llm = StubLLM()
+    cache.get_or_call_prompt("KYC Analyst", "prompt", "gpt-4o", llm)
+    response = cache.get_or_call_prompt("KYC Analyst", "prompt", "gpt-4o", llm, validate=lambda response: response != "response 1")
+
+    assert response == "response 2"
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (0, 2)
+
+
+def test_expired_responses_are_asked_again(tmp_path, clock):
+    cache = LLMResponseCache(str(tmp_path / "llm_cache.db"), ttl_seconds=2)
+    llm = StubLLM()
+    assert cache.get_or_call_prompt("KYC Analyst", "prompt", "gpt-4o", llm) == "response 1"
+    assert cache.get_or_call_prompt("KYC Analyst", "prompt", "gpt-4o", llm) == "response 1"
+    assert cache.get_or_call_prompt("KYC Analyst", "prompt", "gpt-4o", llm) == "response 2"
+
+
+def test_evicts_least_recently_used_responses_over_the_size_limit(tmp_path, clock):
+    entry_size = len(json.dumps("response 1"))
+    cache = LLMResponseCache(str(tmp_path / "llm_cache.db"), max_bytes=entry_size * 2)
+    llm = StubLLM()
+    for prompt in ("first", "second", "first", "third"):
+        cache.get_or_call_prompt("KYC Analyst", prompt, "gpt-4o", llm)
+
+    assert llm.calls == 3
+    assert cache.get(prompt_key("KYC Analyst", "second", {}, "gpt-4o")) is None
+    assert cache.get(prompt_key("KYC Analyst", "first", {}, "gpt-4o")) == "response 1"
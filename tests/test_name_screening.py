@@ -0,0 +1,51 @@
+import csv
+import os
+
+import batch_screening
+import name_screening
+from extraction_cache import file_hash
+
+
+def write_list(path, names, mtime):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["entry_id", "name", "list_type"])
+        for number, name in enumerate(names, 1):
+            writer.writerow([f"E{number}", name, "Sanctions"])
+    # Explicit modification times, so a rewrite within the clock resolution is still seen as a change
+    os.utime(path, ns=(mtime, mtime))
+    return str(path)
+
+
+def test_index_follows_the_list_path_and_content(tmp_path):
+    first = write_list(tmp_path / "first.csv", ["Acme Holdings Ltd"], 1_000_000_000)
+    second = write_list(tmp_path / "second.csv", ["Globex Corporation"], 1_000_000_000)
+
+    assert name_screening.get_screening_index(first).search("ACME Holdings")
+    assert name_screening.get_screening_index(second).search("Globex Corp")
+    assert name_screening.get_screening_index(first) is name_screening.get_screening_index(first)
+
+    write_list(tmp_path / "first.csv", ["Initech LLC"], 2_000_000_000)
+    index = name_screening.get_screening_index(first)
+    assert index.search("Initech") and not index.search("ACME Holdings")
+    assert index.version == file_hash(first)
+
+
+def test_rescreen_in_the_same_process_uses_the_new_list(tmp_path):
+    names = ["Acme Holdings Ltd", "Globex Corp"]
+    list_path = write_list(tmp_path / "list.csv", ["ACME Holdings"], 1_000_000_000)
+    results = batch_screening.screen_names(names, list_path, workers=1)
+    assert [name for name in names if results[name]] == ["Acme Holdings Ltd"]
+
+    write_list(tmp_path / "list.csv", ["Globex Corporation"], 2_000_000_000)
+    results = batch_screening.screen_names(names, list_path, workers=1)
+    assert [name for name in names if results[name]] == ["Globex Corp"]
+
+
+def test_cached_expansions_are_bounded(monkeypatch):
+    monkeypatch.setattr(name_screening, "MAX_CACHED_EXPANSIONS", 3)
+    index = name_screening.ScreeningIndex()
+    index.add("E1", "Acme Holdings Ltd")
+    for name in ["alpha", "bravo", "charlie", "delta", "echo"]:
+        index.search(name)
+    assert len(index._expansions) <= 3
@@ -0,0 +1,93 @@
+import sqlite3
+
+import pytest
+
+import dashboard_data
+import db_migrations
+import pipeline_metrics
+from pipeline_metrics import MetricsRecorder, StageSpan
+from synthetic_data import create_database
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = create_database(str(tmp_path))
+    with sqlite3.connect(db_path) as conn:
+        db_migrations.apply_migrations(conn)
+    return db_path
+
+
+def record_runs(recorder, stage, wall_times, **measures):
+    for position, wall_seconds in enumerate(wall_times):
+        span = StageSpan(stage, f"CASE-{position}")
+        span.wall_seconds = wall_seconds
+        span.add(**measures)
+        recorder.record(span)
+
+
+def test_recorder_and_dashboard_share_the_database():
+    assert MetricsRecorder().db_path == dashboard_data.db_name
+
+
+def test_span_records_wall_time_and_measures(db_path):
+    recorder = MetricsRecorder(db_path)
+    with recorder.span("research", "CASE-1", queue_wait_seconds=0.5):
+        pipeline_metrics.add(prompt_tokens=100, completion_tokens=20)
+        with pipeline_metrics.remote_call():
+            pass
+    with pytest.raises(RuntimeError):
+        with recorder.span("analysis", "CASE-1"):
+            raise RuntimeError("agent failed")
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT stage, status, wall_seconds, queue_wait_seconds, remote_seconds, prompt_tokens, completion_tokens "
+            "FROM StageMetrics ORDER BY id"
+        ).fetchall()
+
+    (stage, status, wall, queue_wait, remote, prompt, completion), failed = rows
+    assert (stage, status, queue_wait, prompt, completion) == ("research", "completed", 0.5, 100, 20)
+    assert 0 <= remote <= wall
+    assert failed[:2] == ("analysis", "failed")
+
+
+def test_add_outside_a_span_does_nothing():
+    pipeline_metrics.add(prompt_tokens=100)
+
+
+def test_latency_summary_percentiles(db_path):
+    recorder = MetricsRecorder(db_path)
+    record_runs(recorder, "research", [float(seconds) for seconds in range(1, 21)], remote_seconds=0.5, prompt_tokens=10)
+    record_runs(recorder, "outreach", [0.1, 0.2])
+
+    with sqlite3.connect(db_path) as conn:
+        summary = pipeline_metrics.stage_latency_summary(conn)
+
+    assert [row['stage'] for row in summary] == ["research", "outreach"]
+    research = summary[0]
+    assert (research['runs'], research['failed'], research['p50_seconds'], research['p95_seconds']) == (20, 0, 10.0, 19.0)
+    assert research['remote_share'] == round(20 * 0.5 / 210, 3)
+    assert research['tokens'] == 200
+    assert (summary[1]['p50_seconds'], summary[1]['p95_seconds']) == (0.1, 0.2)
+
+
+def test_metrics_exposition(db_path):
+    recorder = MetricsRecorder(db_path)
+    record_runs(recorder, "research", [0.05, 3.0], prompt_tokens=7, bytes_processed=1024)
+
+    text = dashboard_data.fetch_prometheus_metrics(db_path)
+
+    lines = text.splitlines()
+    assert "# TYPE kyc_stage_duration_seconds histogram" in lines
+    assert 'kyc_stage_duration_seconds_bucket{stage="research",status="completed",le="0.1"} 1' in lines
+    assert 'kyc_stage_duration_seconds_bucket{stage="research",status="completed",le="5"} 2' in lines
+    assert 'kyc_stage_duration_seconds_bucket{stage="research",status="completed",le="+Inf"} 2' in lines
+    assert 'kyc_stage_duration_seconds_sum{stage="research",status="completed"} 3.05' in lines
+    assert 'kyc_stage_duration_seconds_count{stage="research",status="completed"} 2' in lines
+    assert "# TYPE kyc_stage_prompt_tokens_total counter" in lines
+    assert 'kyc_stage_prompt_tokens_total{stage="research",status="completed"} 14' in lines
+    assert 'kyc_stage_bytes_processed_total{stage="research",status="completed"} 2048' in lines
+
+
+def test_metrics_exposition_without_the_metrics_table(tmp_path):
+    assert dashboard_data.fetch_prometheus_metrics(str(tmp_path / "empty.db")) == ""
@@ -0,0 +1,85 @@
+import sqlite3
+
+import pytest
+
+import db_migrations
+from refresh_delta import detect_changes, fingerprint, refresh_fingerprints
+from synthetic_data import create_database
+
+ENTITY = {"client_identifier": "C1", "member_type": "Entity", "entity_legal_name": "Acme Holdings Ltd",
+          "phone_number": "+44 20 7946 0000", "address_line_1": "1 High Street"}
+MEMBER = {"client_identifier": "C1", "member_type": "Individual", "entity_legal_name": "Acme Holdings Ltd",
+          "member_first_name": "Jane", "member_last_name": "Doe", "ownership_percentage": "25"}
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(create_database(str(tmp_path)))
+    db_migrations.apply_migrations(conn)
+    yield conn
+    conn.close()
+
+
+def insert(conn, table, *rows):
+    with conn:
+        for row in rows:
+            conn.execute(f"INSERT INTO {table} ({', '.join(row)}) VALUES ({', '.join('?' for _ in row)})", list(row.values()))
+
+
+def test_fingerprint_ignores_blanks_and_whitespace():
+    assert fingerprint("Acme  Holdings", None) == fingerprint(" Acme Holdings ", "")
+    assert fingerprint("Acme", "") != fingerprint("", "Acme")
+
+
+def test_unchanged_client_is_skipped(conn):
+    insert(conn, "OnboardingData", ENTITY, MEMBER)
+    insert(conn, "KycRefreshData", dict(ENTITY, phone_number="+44 20  7946 0000"), MEMBER)
+    assert detect_changes(conn) == {}
+
+
+def test_changed_field_is_reported_with_both_values(conn):
+    insert(conn, "OnboardingData", ENTITY, MEMBER)
+    insert(conn, "KycRefreshData", dict(ENTITY, address_line_1="2 Station Road"), MEMBER)
+
+    assert detect_changes(conn) == {"C1": [{
+        'member': {"client_identifier": "C1", "member_type": "Entity", "member_legal_name": None,
+                   "member_first_name": None, "member_middle_name": None, "member_last_name": None},
+        'change': 'changed',
+        'fields': {"address_line_1": ("1 High Street", "2 Station Road")},
+    }]}
+
+
+def test_added_client_is_reported(conn):
+    insert(conn, "OnboardingData", ENTITY)
+    insert(conn, "KycRefreshData", ENTITY, dict(ENTITY, client_identifier="C2", entity_legal_name="Globex Corp"))
+
+    changes = detect_changes(conn)
+
+    assert list(changes) == ["C2"]
+    assert changes["C2"][0]['change'] == 'added'
+    assert changes["C2"][0]['fields']["entity_legal_name"] == (None, "Globex Corp")
+
+
+def test_member_missing_from_the_refresh_is_removed(conn):
+    insert(conn, "OnboardingData", ENTITY, MEMBER, dict(ENTITY, client_identifier="C9"))
+    insert(conn, "KycRefreshData", ENTITY)
+
+    changes = detect_changes(conn)
+
+    # Clients that are not part of the refresh at all (C9) are not compared
+    assert list(changes) == ["C1"]
+    (removed,) = changes["C1"]
+    assert removed['change'] == 'removed'
+    assert removed['member']["member_first_name"] == "Jane"
+    assert removed['fields']["ownership_percentage"] == ("25", None)
+
+
+def test_profile_update_clears_the_stored_fingerprint(conn):
+    insert(conn, "OnboardingData", ENTITY)
+    assert refresh_fingerprints(conn, "OnboardingData") == 1
+    assert refresh_fingerprints(conn, "OnboardingData") == 0
+
+    with conn:
+        conn.execute("UPDATE OnboardingData SET phone_number = '+44 20 7946 9999' WHERE client_identifier = 'C1'")
+    assert conn.execute("SELECT row_fingerprint FROM OnboardingData").fetchone()[0] is None
+    assert refresh_fingerprints(conn, "OnboardingData") == 1
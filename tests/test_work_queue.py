@@ -0,0 +1,81 @@
+import os
+import sqlite3
+
+import pytest
+
+from synthetic_data import create_database
+import work_queue
+from work_queue import WorkQueue
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = create_database(str(tmp_path))
+    rows = [
+        ("CASE-1", "C1", "C1_Annual_Report.pdf", "Entity"),
+        ("CASE-1", "C1", "C1_Annual_Report.pdf", "Individual"),
+        ("CASE-1", "C1", "C1_Annual_Report.pdf", "Individual"),
+        ("CASE-2", "C2", "C2_Certificate.pdf", "Entity"),
+    ]
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO KycRefreshData (outreach_agent_status, client_identifier, document_name, member_type) "
+            "VALUES (?, ?, ?, ?)",
+            rows,
+        )
+    return db_path
+
+
+def test_one_job_per_case_id(db_path, tmp_path):
+    queue = WorkQueue(db_path, document_dir=str(tmp_path / "documents"))
+    assert queue.enqueue() == 2
+    assert queue.counts() == {"pending": 2}
+
+    cases = queue.claim("worker-1", limit=5)
+    assert [(case["id"], case["case_id"]) for case in cases] == [(1, "CASE-1"), (4, "CASE-2")]
+    assert cases[0]["path"] == os.path.join(str(tmp_path / "documents"), "C1_Annual_Report.pdf")
+    assert queue.claim("worker-2") == []
+
+    assert queue.set_stage_status("CASE-1", "worker-1", "research", "completed")
+    assert not queue.complete("CASE-1", "worker-2")
+    assert queue.complete("CASE-1", "worker-1")
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute(
+            "SELECT queue_status, research_agent_status, COUNT(*) FROM KycRefreshData "
+            "WHERE outreach_agent_status = 'CASE-1' GROUP BY 1, 2"
+        ).fetchall() == [("completed", "completed", 3)]
+    assert queue.counts() == {"completed": 1, "leased": 1}
+
+
+def test_requeued_case_restarts_from_the_first_stage(db_path):
+    queue = WorkQueue(db_path)
+    queue.enqueue()
+    case = queue.claim("worker-1")[0]
+    queue.fail(case["case_id"], "worker-1", "timeout")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO StageOutputs (refresh_id, stage, output) VALUES (?, 'research', '{}')", (case["id"],))
+
+    assert queue.enqueue(["CASE-1"]) == 1
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM StageOutputs").fetchone()[0] == 0
+    assert queue.claim("worker-1")[0]["attempts"] == 1
+
+
+def test_expired_leases_are_claimed_before_pending_cases(db_path):
+    queue = WorkQueue(db_path, lease_seconds=-1)
+    queue.enqueue()
+    assert [case["case_id"] for case in queue.claim("worker-1")] == ["CASE-1"]
+
+    # worker-1's lease already expired, so CASE-1 is reclaimed ahead of the pending CASE-2
+    assert [(case["case_id"], case["attempts"]) for case in queue.claim("worker-2", limit=2)] == [("CASE-1", 2), ("CASE-2", 1)]
+    assert not queue.complete("CASE-1", "worker-1")
+
+
+def test_claim_queries_read_the_queue_indexes(db_path):
+    queue = WorkQueue(db_path)
+    with sqlite3.connect(db_path) as conn:
+        for sql, params in ((work_queue.PENDING_CASES_QUERY, (64, 1)), (work_queue.EXPIRED_CASES_QUERY, (0, 3, 64, 1))):
+            details = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            assert any("USING COVERING INDEX idx_kyc_refresh_queue" in detail for detail in details)
+            assert not any(detail.startswith("SCAN KycRefreshData") for detail in details)
+    assert queue.counts() == {}
@@ -1,4 +1,60 @@
+import importlib
+import json
+import sqlite3
+
+from crewai.tools import tool
 from crewai_tools import VisionTool
 
+import kyc_matcher
+from name_screening import get_screening_index
+
+extraction = importlib.import_module("Extract_text_from_PDF 1")
+
 ##initializing the Vision Tool
-vision_tool = VisionTool()
\ No newline at end of file
+vision_tool = VisionTool()
+
+
+@tool("PDF Extraction Tool")
+def Pdf_Extraction_tool(pdf_path: str) -> str:
+    """
+    Extracts a client PDF with Azure AI Document Intelligence, through the shared extraction session and the
+    analysis cache. Returns the document's key-value pairs, tables and text content as JSON.
+    """
+    extracted_data = extraction.extract_data_from_pdf(pdf_path, session=extraction.get_default_session())
+    return json.dumps({field: extracted_data[field] for field in ('key_value_pairs', 'tables', 'content')})
+
+
+@tool("Name Screening Tool")
+def Name_Screening_tool(name: str) -> str:
+    """Screens a client or member name against the sanctions/PEP screening list. Returns the fuzzy matches (entry_id, name, list_type, score) as JSON."""
+    return json.dumps(get_screening_index().search(name))
+
+
+@tool("Profile Search Tool")
+def Profile_Search_tool(client_identifier: str) -> str:
+    """Returns the onboarding records (entity and members) of a client from the KYC database as JSON."""
+    with sqlite3.connect(kyc_matcher.db_name) as conn:
+        return json.dumps(kyc_matcher.find_onboarding_records(conn, client_identifier), default=str)
+
+
+@tool("Match KYC Data Tool")
+def Match_KYC_Data_tool(client_identifier: str, key_value_pairs: str) -> str:
+    """
+    Compares the key-value pairs extracted from a client document (JSON list of {"key", "value"}) with the
+    client's onboarding record, field by field. Returns a JSON report of matches, mismatches, ambiguous fields
+    and unmapped keys; only the ambiguous and unmapped entries need review.
+    """
+    with sqlite3.connect(kyc_matcher.db_name) as conn:
+        report = kyc_matcher.match_client_document(conn, client_identifier, json.loads(key_value_pairs))
+    if report is None:
+        return json.dumps({'error': f"No onboarding record for client {client_identifier}"})
+    return json.dumps(report, default=str)
+
+
+@tool("Validator Tool")
+def Validator_tool(field: str, document_value: str, database_value: str) -> str:
+    """
+    Checks whether a document value and the value on file for a KYC field are the same once dates, phone numbers,
+    addresses, percentages and names are normalized. Returns a JSON result with status match, mismatch or ambiguous.
+    """
+    return json.dumps(kyc_matcher.compare_field(field, document_value, database_value), default=str)
@@ -0,0 +1,356 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from crew_runner import CrewRunner
+from dashboard_data import db_name
+from db_migrations import apply_migrations
+from pipeline_metrics import MetricsRecorder, StageSpan
+
+# Seconds a claimed case stays leased to its worker; the worker renews the lease while it runs
+LEASE_SECONDS = 600
+
+# Number of times a case is tried before it is marked failed
+MAX_ATTEMPTS = 3
+
+# Seconds an idle worker waits before polling the queue again
+POLL_INTERVAL = 5
+
+# Folder holding the client documents named in KycRefreshData.document_name
+DOCUMENT_DIR = "Data/documents"
+
+# Stage name -> KycRefreshData column recording the stage status.
+# outreach_agent_status holds the case ID shown on the dashboard, so the outreach stage has no status column.
+STAGE_STATUS_COLUMNS = {
+    "research": "research_agent_status",
+    "analysis": "analyst_agent_status",
+    "screening": "screening_agent_status",
+}
+
+# Fields of a claimed case passed to the crew, taken from the first row of the case (MIN(id) selects
+# the other columns from that row). Its id keys the case's saved stage outputs.
+CASE_QUERY = (
+    "SELECT MIN(id) AS id, outreach_agent_status AS case_id, client_identifier, document_name, attempts, queued_at "
+    "FROM KycRefreshData WHERE outreach_agent_status = ?"
+)
+
+# Rows read per claimed case when looking for claimable cases. A claim reads the first rows of the queue
+# in index order instead of sorting every claimable row, while it holds the database write lock.
+CLAIM_SCAN_ROWS = 64
+
+# Oldest pending cases (by their first row), from the (queue_status, id) queue index
+PENDING_CASES_QUERY = (
+    "SELECT outreach_agent_status FROM (SELECT id, outreach_agent_status FROM KycRefreshData "
+    "WHERE queue_status = 'pending' AND outreach_agent_status IS NOT NULL ORDER BY id LIMIT ?) "
+    "GROUP BY outreach_agent_status ORDER BY MIN(id) LIMIT ?"
+)
+
+# Leased cases whose lease expired and that have attempts left, from the (queue_status, lease_expires_at) index
+EXPIRED_CASES_QUERY = (
+    "SELECT outreach_agent_status FROM (SELECT id, outreach_agent_status FROM KycRefreshData "
+    "WHERE queue_status = 'leased' AND lease_expires_at < ? AND attempts < ? AND outreach_agent_status IS NOT NULL "
+    "ORDER BY lease_expires_at LIMIT ?) GROUP BY outreach_agent_status ORDER BY MIN(id) LIMIT ?"
+)
+
+# Assignments resetting a case queued again from the start
+REQUEUE_ASSIGNMENTS = (
+    "queue_status = 'pending', attempts = 0, last_error = NULL, queued_at = ?, "
+    f"{', '.join(f'{column} = NULL' for column in STAGE_STATUS_COLUMNS.values())}"
+)
+
+
+class WorkQueue:
+    """
+    Durable queue of refresh cases with leases. A case is the set of KycRefreshData rows sharing a case ID
+    (outreach_agent_status), its entity and members; every row of a case carries the same queue state.
+
+    queue_status moves from 'pending' to 'leased' when a worker claims the case, then to
+    'completed', back to 'pending' after a failed attempt, or to 'failed' after MAX_ATTEMPTS.
+    A claim is a single IMMEDIATE transaction, so two workers never claim the same case,
+    and a lease that is not renewed expires so another worker can reclaim the case after a crash.
+    Every update made on behalf of a worker checks that the worker still holds the lease.
+    """
+
+    def __init__(self, db_path=db_name, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS, document_dir=DOCUMENT_DIR):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.document_dir = document_dir
+        with self._connect() as conn:
+            apply_migrations(conn)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def enqueue(self, case_ids=None):
+        """
+        Queues cases: the given case IDs, or every case with a row that was never queued and is not refreshed yet.
+        Cases queued by ID are processed from the start: their saved stage outputs are discarded.
+
+        Returns:
+            Number of cases queued
+        """
+        now = time.time()
+        queued = 0
+        requeue = case_ids is not None
+        with self._connect() as conn:
+            if requeue:
+                assignments = REQUEUE_ASSIGNMENTS
+            else:
+                case_ids = [row[0] for row in conn.execute(
+                    "SELECT DISTINCT outreach_agent_status FROM KycRefreshData "
+                    "WHERE outreach_agent_status IS NOT NULL AND queue_status IS NULL AND refresh_status IS NULL"
+                )]
+                assignments = "queue_status = 'pending', attempts = 0, queued_at = ?"
+            for case_id in case_ids:
+                # A leased case keeps running; the rows of a case are queued together
+                cursor = conn.execute(
+                    f"UPDATE KycRefreshData SET {assignments} "
+                    "WHERE outreach_agent_status = ? AND NOT EXISTS (SELECT 1 FROM KycRefreshData "
+                    "WHERE outreach_agent_status = ? AND queue_status = 'leased')",
+                    (now, case_id, case_id),
+                )
+                queued += cursor.rowcount > 0
+            if requeue:
+                conn.executemany(
+                    "DELETE FROM StageOutputs WHERE refresh_id IN "
+                    "(SELECT id FROM KycRefreshData WHERE outreach_agent_status = ? AND queue_status = 'pending')",
+                    [(case_id,) for case_id in case_ids],
+                )
+        return queued
+
+    def claim(self, worker_id, limit=1):
+        """
+        Leases up to limit pending cases, or cases whose lease expired, to a worker.
+
+        Returns:
+            List of case dictionaries (id, case_id, client_identifier, document_name, path, attempts, queued_at)
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            # Cases whose worker crashed are taken first, then the oldest pending cases
+            case_ids = [row[0] for row in conn.execute(
+                EXPIRED_CASES_QUERY, (now, self.max_attempts, limit * CLAIM_SCAN_ROWS, limit)
+            )]
+            if len(case_ids) < limit:
+                case_ids += [row[0] for row in conn.execute(
+                    PENDING_CASES_QUERY, (limit * CLAIM_SCAN_ROWS, limit - len(case_ids))
+                )]
+            conn.executemany(
+                "UPDATE KycRefreshData SET queue_status = 'leased', lease_owner = ?, lease_expires_at = ?, "
+                "attempts = attempts + 1 WHERE outreach_agent_status = ?",
+                [(worker_id, now + self.lease_seconds, case_id) for case_id in case_ids],
+            )
+            conn.execute("COMMIT")
+            conn.row_factory = sqlite3.Row
+            return [self._case(dict(conn.execute(CASE_QUERY, (case_id,)).fetchone())) for case_id in case_ids]
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _case(self, case):
+        # document_name is a file name; the crew reads the document from the document folder
+        document_name = case['document_name']
+        case['path'] = os.path.join(self.document_dir, document_name) if document_name else None
+        return case
+
+    def _update_leased(self, case_id, worker_id, assignments, params=()):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE KycRefreshData SET {assignments} "
+                "WHERE outreach_agent_status = ? AND queue_status = 'leased' AND lease_owner = ?",
+                tuple(params) + (case_id, worker_id),
+            )
+            return cursor.rowcount > 0
+
+    def renew(self, case_id, worker_id):
+        """Extends a worker's lease on a case. Returns False if the worker lost the lease."""
+        return self._update_leased(case_id, worker_id, "lease_expires_at = ?", [time.time() + self.lease_seconds])
+
+    def set_stage_status(self, case_id, worker_id, stage, status):
+        """Records the status of a crew stage in its *_agent_status column. Returns False if the worker lost the lease."""
+        column = STAGE_STATUS_COLUMNS.get(stage)
+        if column is None:
+            return self.renew(case_id, worker_id)
+        return self._update_leased(
+            case_id, worker_id, f"{column} = ?, lease_expires_at = ?", [status, time.time() + self.lease_seconds]
+        )
+
+    def complete(self, case_id, worker_id):
+        """Marks a case completed. Returns False if the worker lost the lease, in which case its result is discarded."""
+        return self._update_leased(
+            case_id, worker_id,
+            "queue_status = 'completed', lease_owner = NULL, lease_expires_at = NULL, last_error = NULL, "
+            "KycRefresh_updated_date = ?",
+            [datetime.now().date().isoformat()],
+        )
+
+    def fail(self, case_id, worker_id, error):
+        """Releases a case after a failed attempt: back to pending, or failed after max_attempts."""
+        return self._update_leased(
+            case_id, worker_id,
+            "queue_status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_owner = NULL, lease_expires_at = NULL, last_error = ?, queued_at = ?",
+            [self.max_attempts, str(error), time.time()],
+        )
+
+    def reclaim_stale(self):
+        """
+        Releases cases whose lease expired (their worker crashed): back to pending,
+        or failed once they used up their attempts.
+
+        Returns:
+            Number of rows released
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE KycRefreshData SET queue_status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "lease_owner = NULL, lease_expires_at = NULL, last_error = 'Lease expired', queued_at = ? "
+                "WHERE queue_status = 'leased' AND lease_expires_at < ?",
+                (self.max_attempts, time.time(), time.time()),
+            )
+            return cursor.rowcount
+
+    def counts(self):
+        """Returns the number of cases per queue status."""
+        with self._connect() as conn:
+            return dict(conn.execute(
+                "SELECT queue_status, COUNT(DISTINCT outreach_agent_status) FROM KycRefreshData "
+                "WHERE queue_status IS NOT NULL GROUP BY queue_status"
+            ).fetchall())
+
+
+class StageCheckpoints:
+    """
+    Stage outputs of refresh cases, stored in StageOutputs by stage name and the id of the case's first
+    KycRefreshData row (the case 'id').
+
+    A retried case resumes at its first incomplete stage: the extraction and matching outputs
+    of an earlier attempt are reused instead of paying for the OCR and LLM calls again.
+    """
+
+    def __init__(self, db_path=db_name, worker_id=None):
+        self.db_path = db_path
+        # When set, outputs are only saved while this worker holds the case lease
+        self.worker_id = worker_id
+
+    def load(self, case):
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            rows = conn.execute("SELECT stage, output FROM StageOutputs WHERE refresh_id = ?", (case['id'],)).fetchall()
+        return {stage: json.loads(output) for stage, output in rows}
+
+    def save(self, case, stage, output):
+        query = "INSERT OR REPLACE INTO StageOutputs (refresh_id, stage, output, completed_at) SELECT ?, ?, ?, ?"
+        params = [case['id'], stage, json.dumps(output, default=str), time.time()]
+        if self.worker_id is not None:
+            query += " WHERE EXISTS (SELECT 1 FROM KycRefreshData WHERE id = ? AND queue_status = 'leased' AND lease_owner = ?)"
+            params += [case['id'], self.worker_id]
+        with sqlite3.connect(self.db_path, timeout=30) as conn:
+            conn.execute(query, params)
+
+
+class _LeaseKeeper(threading.Thread):
+    """Renews a worker's lease on a case until stopped."""
+
+    def __init__(self, queue, case_id, worker_id):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.case_id = case_id
+        self.worker_id = worker_id
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.queue.lease_seconds / 3):
+            if not self.queue.renew(self.case_id, self.worker_id):
+                return
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_worker(queue, graph, worker_id, max_concurrency=4, poll_interval=POLL_INTERVAL, stop_when_empty=True, stop_event=None):
+    """
+    Claims cases one at a time and runs the crew graph on each until the queue is empty
+    (or, with stop_when_empty=False, until stop_event is set).
+
+    Returns:
+        Number of cases completed by this worker
+    """
+    stop_event = stop_event or threading.Event()
+
+    def on_stage(case, stage, status):
+        queue.set_stage_status(case['case_id'], worker_id, stage, status)
+
+    metrics = MetricsRecorder(queue.db_path)
+    runner = CrewRunner(
+        graph, max_concurrency, on_stage=on_stage, checkpoints=StageCheckpoints(queue.db_path, worker_id), metrics=metrics
+    )
+    completed = 0
+    while not stop_event.is_set():
+        cases = queue.claim(worker_id)
+        if not cases:
+            if stop_when_empty:
+                break
+            stop_event.wait(poll_interval)
+            continue
+        case = cases[0]
+        # Time the case waited in the queue since it was (re)queued
+        metrics.record(StageSpan("queue", case['case_id'], time.time() - (case['queued_at'] or time.time())))
+        lease_keeper = _LeaseKeeper(queue, case['case_id'], worker_id)
+        lease_keeper.start()
+        try:
+            asyncio.run(runner.run_case(case))
+        except Exception as e:
+            lease_keeper.stop()
+            queue.fail(case['case_id'], worker_id, e)
+            print(f"Worker {worker_id}: case {case['case_id']} failed (attempt {case['attempts']}): {e}")
+            continue
+        lease_keeper.stop()
+        if queue.complete(case['case_id'], worker_id):
+            completed += 1
+        else:
+            print(f"Worker {worker_id}: lost the lease on case {case['case_id']}, result discarded")
+    return completed
+
+
+def run_worker_pool(graph, db_path=db_name, worker_count=4, max_concurrency=4, stop_when_empty=True, stop_event=None,
+                    document_dir=DOCUMENT_DIR):
+    """
+    Runs worker_count worker threads on the queue. More processes or machines sharing the
+    database can run their own pools; leases keep them from processing the same case.
+
+    Returns:
+        Number of cases completed
+    """
+    queue = WorkQueue(db_path, document_dir=document_dir)
+    released = queue.reclaim_stale()
+    if released:
+        print(f"Released {released} case(s) with expired leases")
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    results = [0] * worker_count
+
+    def work(n):
+        results[n] = run_worker(queue, graph, f"{prefix}-{n}", max_concurrency, stop_when_empty=stop_when_empty, stop_event=stop_event)
+
+    threads = [threading.Thread(target=work, args=(n,), name=f"kyc-worker-{n}") for n in range(worker_count)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start_time
+    print(f"Completed {sum(results)} case(s) in {elapsed:.1f}s with {worker_count} worker(s); queue: {queue.counts()}")
+    return sum(results)